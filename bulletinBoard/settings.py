@@ -45,10 +45,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'posts.metrics.MetricsMiddleware',
+    'posts.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,7 +60,8 @@ ROOT_URLCONF = 'bulletinBoard.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates timing renders for the template metric.
+        'BACKEND': 'posts.metrics.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,12 +82,23 @@ WSGI_APPLICATION = 'bulletinBoard.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# posts.db.mysql is the django mysql backend plus connection pooling and
+# health checks. CONN_MAX_AGE keeps a thread's connection open for that many
+# seconds (0 closes it after every request). With POOL_SIZE > 0 closed
+# connections go back to a process wide pool shared by all threads and are
+# retired after POOL_MAX_LIFETIME seconds; use it with CONN_MAX_AGE 0 when
+# threads are short lived. CONN_HEALTH_CHECKS pings a reused connection
+# before its first query of a request.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'posts.db.mysql',
         'OPTIONS': {
             'read_default_file': str(BASE_DIR / 'bulletinboard.cnf'),
         },
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', '0')),
+        'POOL_MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
     }
 }
 
@@ -125,6 +140,37 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles/')
+# Pages load one css and one js bundle of ASSET_BUNDLES on top of "base".
+# With ASSET_BUNDLES_ENABLED off every source file is linked on its own;
+# on, `manage.py build_assets` and `manage.py collectstatic` must have run
+# so templates link content hashed bundles served with immutable caching.
+ASSET_BUNDLES_ENABLED = os.getenv('ASSET_BUNDLES_ENABLED', 'False') == 'True'
+ASSET_BUNDLES_OUTPUT = os.path.join(BASE_DIR, 'posts', 'static', 'bundles')
+ASSET_BUNDLES = {
+    'base': {
+        'css': ['vendor/bootstrap/css/bootstrap.min.css', 'css/styles.css'],
+        'js': ['vendor/jquery/jquery.min.js', 'vendor/bootstrap/js/bootstrap.min.js'],
+    },
+    'post_list': {
+        'css': ['css/post_list.css', 'css/post_detail.css', 'css/delete_dialog.css'],
+        'js': ['js/post_list.js'],
+    },
+    'users_list': {
+        'css': ['css/user_list.css', 'css/user_detail.css', 'css/delete_dialog.css'],
+        'js': ['js/user_list.js'],
+    },
+    'posts_form': {'css': ['css/posts_form.css']},
+    'users_form': {'css': ['css/user_form.css']},
+    'user_profile': {'css': ['css/user_profile.css']},
+    'user_update': {'css': ['css/user_update.css']},
+    'csv_import': {'js': ['js/csv_import.js']},
+    'login': {'css': ['css/login.css']},
+    'password_reset': {'css': ['css/password-reset.css']},
+    'password_reset_confirm': {'css': ['css/password-reset-confirm.css']},
+}
+if ASSET_BUNDLES_ENABLED:
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
 MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 AUTH_USER_MODEL = 'posts.User'
 
@@ -134,10 +180,144 @@ AUTH_USER_MODEL = 'posts.User'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = '/accounts/login'
+# One query checks email, soft delete and password at login and loads
+# request.user on later requests; views reuse request.user.
+AUTHENTICATION_BACKENDS = ['posts.backends.EmailBackend']
+# With LAST_LOGIN_DEFERRED, login times are buffered in memory and written
+# by a background thread every LAST_LOGIN_FLUSH_INTERVAL seconds, or once
+# LAST_LOGIN_MAX_PENDING are pending, in one UPDATE per LAST_LOGIN_BATCH_SIZE
+# users. A crashed process loses at most one interval of login times.
+LAST_LOGIN_DEFERRED = os.getenv('LAST_LOGIN_DEFERRED', 'False') == 'True'
+LAST_LOGIN_FLUSH_INTERVAL = 5
+LAST_LOGIN_MAX_PENDING = 1000
+LAST_LOGIN_BATCH_SIZE = 500
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_AUTHENTICATION_METHOD='email'
 MEDIA_ROOT= os.path.join(BASE_DIR, 'media/')
 MEDIA_URL= "/media/"
+# Profile uploads are re-encoded without metadata, bounded to
+# PROFILE_IMAGE_MAX_SIDE, and resized into media/profiles/ for every
+# PROFILE_IMAGE_SIZES entry (longest side in px), plus WebP copies.
+# Images over PROFILE_IMAGE_MAX_PIXELS are rejected before decoding.
+PROFILE_IMAGE_SIZES = {'thumb': 200, 'medium': 300}
+PROFILE_IMAGE_MAX_SIDE = 2048
+PROFILE_IMAGE_MAX_PIXELS = 25000000
+PROFILE_IMAGE_QUALITY = 85
+PROFILE_IMAGE_WEBP = True
+# Media is served by posts.storage.serve with ETag, Last-Modified and Range
+# support. Content hashed names are cached for a year, other files for
+# MEDIA_CACHE_MAX_AGE seconds. MEDIA_SENDFILE "x-accel-redirect" hands the
+# transfer to nginx (an internal location at MEDIA_ACCEL_REDIRECT_PREFIX
+# aliased to MEDIA_ROOT), "x-sendfile" to apache or lighttpd.
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Post list pagination: "page" (page numbers with total count) or
+# "cursor" (keyset pagination, no COUNT(*) and no OFFSET scan).
+POST_LIST_PAGINATION = os.getenv('POST_LIST_PAGINATION', 'page')
+# Keyset ordering for cursor mode, e.g. ('id',) or ('created_at', 'id').
+POST_LIST_CURSOR_ORDERING = ('id',)
+# Per-view SQL budgets keyed by URL name, checked by QueryBudgetMiddleware.
+# "queries" is the maximum query count of one request, "db_ms" the optional
+# maximum database time. Requests over budget are logged, or raise
+# QueryBudgetExceeded when QUERY_BUDGET_RAISE is on and the method is safe
+# (GET, HEAD), so a committed write never turns into a server error. The
+# csv-import budget covers the upload page; an import runs in batches and
+# is not counted. Budgets count the session table queries of the default
+# database session engine.
+QUERY_BUDGETS = {
+    'default': {'queries': 10},
+    'index': {'queries': 5},
+    'user-list': {'queries': 5},
+    'post-detail': {'queries': 3},
+    'user-detail': {'queries': 3},
+    'post-detail-batch': {'queries': 3},
+    'user-detail-batch': {'queries': 3},
+    'user-profile': {'queries': 3},
+    'post-create': {'queries': 6},
+    'post-update': {'queries': 7},
+    'post-delete': {'queries': 7},
+    'user-create': {'queries': 6},
+    'user-update': {'queries': 7},
+    'user-delete': {'queries': 6},
+    # plus one query per CSV_EXPORT_CHUNK_SIZE rows of the streamed body.
+    'post-list-download': {'queries': 2},
+    'csv-import': {'queries': 10},
+    'csv-import-job': {'queries': 4},
+    'user_login': {'queries': 9},
+    'create_account': {'queries': 10},
+    'password_change': {'queries': 5},
+    'media': {'queries': 0},
+    'metrics': {'queries': 0},
+}
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+# Keep the SQL of every query on request.query_stats.sql, for debugging.
+QUERY_STATS_KEEP_SQL = DEBUG
+# Seconds a create/update confirm page stays valid. Its state travels in a
+# signed form field instead of the session.
+CONFIRM_TOKEN_MAX_AGE = 3600
+# Request, database, template and business metrics served at /metrics in
+# Prometheus text format, behind "Authorization: Bearer <METRICS_TOKEN>".
+# Without METRICS_TOKEN the endpoint answers 404 unless DEBUG is on. Run every worker with the same empty
+# PROMETHEUS_MULTIPROC_DIR so /metrics adds up all processes.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Admins profile one request with the "X-Profile: 1" header or "?_profile=1".
+# cProfile files go to REQUEST_PROFILE_DIR, the newest REQUEST_PROFILE_KEEP
+# are kept and listed at /admin/request-profiles/.
+REQUEST_PROFILING_ENABLED = os.getenv('REQUEST_PROFILING_ENABLED', 'True') == 'True'
+REQUEST_PROFILE_DIR = os.path.join(BASE_DIR, 'request_profiles')
+REQUEST_PROFILE_KEEP = 50
+REQUEST_PROFILE_HEADER = 'HTTP_X_PROFILE'
+REQUEST_PROFILE_PARAM = '_profile'
+# Rows fetched per query by the streaming post list csv export.
+CSV_EXPORT_CHUNK_SIZE = 2000
+# Rows per bulk_create batch of the csv post import.
+CSV_IMPORT_BATCH_SIZE = 1000
+# Uploads of at least this size are imported by a background job.
+CSV_IMPORT_BACKGROUND_MIN_BYTES = 256 * 1024
+# "thread" runs jobs in an in-process pool of CSV_IMPORT_WORKERS threads,
+# "queue" leaves them for `manage.py run_import_jobs`, "sync" runs inline.
+CSV_IMPORT_JOB_BACKEND = os.getenv('CSV_IMPORT_JOB_BACKEND', 'thread')
+CSV_IMPORT_WORKERS = 2
+# run_import_jobs puts running jobs without a heartbeat (written with every
+# batch) for this many seconds back to pending, their process died. Run it
+# from cron with --once for the "thread" backend too, it picks up jobs left
+# pending by a restarted web process.
+CSV_IMPORT_JOB_TIMEOUT = 600
+# ASYNC_VIEWS routes the read views (post and user lists, details, profile)
+# to posts.async_views when served through bulletinBoard/asgi.py. It is off
+# by default, bench_asgi measured them under uvicorn slower than the sync
+# views under gunicorn; turn it on where it measures faster. Their ORM and
+# template work runs on ASYNC_DB_WORKERS threads per process, each keeping
+# its own database connection; keep DB_CONN_MAX_AGE or DB_POOL_SIZE on.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', '8'))
+# LocMem is per process; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# memcached so every process sees the same list generations and sessions.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'bulletinboard'),
+    }
+}
+CACHE_IS_SHARED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+# Cache of post and user list pages, invalidated by generation counters.
+# A write on one process must reach every other, so it is on by default
+# only with a shared cache and a system check refuses it on a per-process one.
+LIST_CACHE_ALIAS = 'default'
+LIST_CACHE_ENABLED = os.getenv('LIST_CACHE_ENABLED', str(CACHE_IS_SHARED)) == 'True'
+LIST_CACHE_TIMEOUT = 300
+# With a shared cache, sessions are read from the SESSION_CACHE_ALIAS cache
+# with the database as fallback and written only when their data changed
+# (posts.sessions). On a per-process cache a process could keep serving a
+# session another one logged out, so the database engine stays the default
+# and a system check refuses posts.sessions there. Expired rows are deleted
+# by `manage.py purge_sessions` in batches of SESSION_PURGE_BATCH_SIZE.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'posts.sessions' if CACHE_IS_SHARED else 'django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = 'default'
+SESSION_PURGE_BATCH_SIZE = 1000
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -14,15 +14,24 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 from posts.urls import views
+from posts import assets, metrics, profiling, storage
 
 urlpatterns = [
+    path('admin/request-profiles/', profiling.profile_list, name='request-profiles'),
+    path('admin/request-profiles/<str:name>', profiling.profile_download, name='request-profile-download'),
     path('admin/', admin.site.urls),
     path('', include('posts.urls')),
     path('', RedirectView.as_view(url='posts/')),
-    path('accounts/', include('django.contrib.auth.urls'))
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) + static(settings.MEDIA_URL, document_root= settings.MEDIA_ROOT)
+    path('accounts/', include('django.contrib.auth.urls')),
+    re_path(r'^media/(?P<path>.*)$', storage.serve, name='media'),
+    path('metrics', metrics.metrics_view, name='metrics')
+] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+if settings.ASSET_BUNDLES_ENABLED:
+    # content hashed static files are served with far future immutable caching.
+    urlpatterns.insert(0, re_path(r'^static/(?P<path>.*)$', assets.serve))
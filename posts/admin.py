@@ -30,6 +30,19 @@ class Password_ResetAdmin(admin.ModelAdmin):
 
     fields = ["email", "token"]
 
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    define admin of soft deleted models.
+    Lists live rows only, like the site does.
+    """
+
+    def get_queryset(self, request):
+        queryset = self.model.alive.all()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
 # Register the models.
-admin.site.register(Post)
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(Post, SoftDeleteAdmin)
+admin.site.register(User, SoftDeleteAdmin)
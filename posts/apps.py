@@ -8,3 +8,13 @@ class PostsConfig(AppConfig):
     """
     default_auto_field = "django.db.models.BigAutoField"
     name = "posts"
+
+    def ready(self):
+        """
+        connect list cache invalidation, last_login and query wrapper signals,
+        register system checks.
+        """
+        from posts import async_db, checks, last_login, list_cache  # noqa: F401
+        list_cache.connect_signals()
+        last_login.connect_signals()
+        async_db.connect_signals()
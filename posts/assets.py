@@ -0,0 +1,191 @@
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.views import static
+
+BUNDLE_DIR = "bundles"
+KINDS = ("css", "js")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# strings and comments are matched first so minification never reaches into them.
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)""", re.S)
+CSS_SPACE_RE = re.compile(r"\s+")
+CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+
+
+def is_enabled():
+    return getattr(settings, "ASSET_BUNDLES_ENABLED", False)
+
+
+def get_bundle(name):
+    """
+    read bundle definition from settings.ASSET_BUNDLES.
+    Param name bundle name.
+    Return dict of "css" and "js" static paths.
+    """
+    bundles = getattr(settings, "ASSET_BUNDLES", {})
+    if name not in bundles:
+        raise ImproperlyConfigured("Unknown asset bundle '{}'".format(name))
+    return bundles[name]
+
+
+def bundle_path(name, kind):
+    return "{}/{}.{}".format(BUNDLE_DIR, name, kind)
+
+
+def bundle_urls(name, kind):
+    """
+    static urls to load for one kind of a bundle.
+    The built bundle when bundles are enabled, else every source file.
+    Param name bundle name, kind "css" or "js".
+    Return list of urls.
+    """
+    paths = get_bundle(name).get(kind, [])
+    if not paths:
+        return []
+    if is_enabled():
+        paths = [bundle_path(name, kind)]
+    return [staticfiles_storage.url(path) for path in paths]
+
+
+def rewrite_css_urls(text, source):
+    """
+    make relative url() of a css file point at the same file from the bundle directory.
+    Param text css, source static path of the css file.
+    Return css.
+    """
+    source_dir = posixpath.dirname(source)
+
+    def rewrite(match):
+        url = match.group(2).strip()
+        if url.startswith(("/", "#", "data:", "http:", "https:")):
+            return match.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+        target = posixpath.normpath(posixpath.join(source_dir, path))
+        return 'url("{}{}")'.format(posixpath.relpath(target, BUNDLE_DIR), suffix)
+
+    return CSS_URL_RE.sub(rewrite, text)
+
+
+def minify_css(text):
+    """
+    drop comments and whitespace of a css file outside strings.
+    Param text css.
+    Return minified css.
+    """
+    parts = []
+    for index, part in enumerate(CSS_TOKEN_RE.split(text)):
+        if index % 2:
+            # license comments "/*! ... */" stay, like other minifiers keep them.
+            if not part.startswith("/*") or part.startswith("/*!"):
+                parts.append(part)
+            continue
+        part = CSS_SPACE_RE.sub(" ", part)
+        parts.append(CSS_PUNCTUATION_RE.sub(lambda match: match.group(1) or match.group(2), part))
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """
+    conservative js minification: whole-line comments, indentation and blank
+    lines go. Code lines are kept as written, telling a regex literal from a
+    division needs a js parser, and line breaks stay so automatic semicolon
+    insertion is not affected. Sources must not hold multi-line template literals.
+    Param text js.
+    Return minified js.
+    """
+    lines = []
+    in_comment = False
+    for line in text.splitlines():
+        line = line.strip()
+        if in_comment:
+            in_comment = not line.endswith("*/")
+            continue
+        if line.startswith("/*") and "*/" not in line[2:-2]:
+            in_comment = not line.endswith("*/") or len(line) < 4
+            continue
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def read_source(path):
+    """
+    read a static source file through the staticfiles finders.
+    Param path static path.
+    Return file text.
+    """
+    absolute_path = finders.find(path)
+    if not absolute_path:
+        raise ImproperlyConfigured("Asset '{}' was not found by the static files finders".format(path))
+    with open(absolute_path, encoding="utf-8") as source:
+        return source.read()
+
+
+def build_bundle(name, kind):
+    """
+    concatenate and minify the sources of one kind of a bundle.
+    Param name bundle name, kind "css" or "js".
+    Return bundle text.
+    """
+    parts = []
+    for path in get_bundle(name).get(kind, []):
+        text = read_source(path)
+        if kind == "css":
+            parts.append(minify_css(rewrite_css_urls(text, path)))
+        elif path.endswith(".min.js"):
+            # vendor builds are minified already and keep their license banner.
+            parts.append(text.strip().rstrip(";") + ";")
+        else:
+            parts.append(minify_js(text))
+    return "\n".join(parts) + "\n"
+
+
+def build_bundles(output_dir):
+    """
+    write every bundle of settings.ASSET_BUNDLES into output_dir.
+    Param output_dir directory collected as static "bundles/".
+    Return list of written static paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for name in getattr(settings, "ASSET_BUNDLES", {}):
+        for kind in KINDS:
+            if not get_bundle(name).get(kind):
+                continue
+            path = bundle_path(name, kind)
+            with open(os.path.join(output_dir, posixpath.basename(path)), "w", encoding="utf-8") as bundle:
+                bundle.write(build_bundle(name, kind))
+            written.append(path)
+    return written
+
+
+def is_hashed(path):
+    """
+    check a static path is a content hashed name of the manifest storage.
+    Param path static path.
+    Return True when the file can be cached forever.
+    """
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None)
+    if not hashed_files:
+        return False
+    return path in hashed_files.values()
+
+
+def serve(request, path):
+    """
+    serve collected static files with far future cache headers for hashed names.
+    Param path static path below STATIC_ROOT.
+    Return file response.
+    """
+    response = static.serve(request, path, document_root=settings.STATIC_ROOT)
+    if response.status_code in (200, 304):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if is_hashed(path) else REVALIDATE_CACHE_CONTROL
+    return response
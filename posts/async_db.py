@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from posts.db.pool import reset_health_checks
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# execute wrappers of the current request. Under ASGI its queries run on
+# executor threads, not on the thread of the middleware installing them.
+request_wrappers = contextvars.ContextVar("request_wrappers", default=())
+# context manager factories entered around every run() call of the request.
+call_hooks = contextvars.ContextVar("call_hooks", default=())
+
+
+def get_executor():
+    """
+    lazily create the pool running ORM work of async views. Its size bounds
+    the threads, and so the database connections, of the process.
+    Return ThreadPoolExecutor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "ASYNC_DB_WORKERS", 8),
+                thread_name_prefix="async-db")
+        return _executor
+
+
+def call(func, args, kwargs):
+    """
+    executor entry point. Connections stay with their worker thread and are
+    checked and closed like around a request.
+    """
+    close_old_connections()
+    reset_health_checks()
+    try:
+        with contextlib.ExitStack() as stack:
+            for hook in call_hooks.get():
+                stack.enter_context(hook())
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run(func, *args, **kwargs):
+    """
+    run blocking ORM, cache or template work of an async view on the executor,
+    with the context variables of the request.
+    Param func callable and its arguments.
+    Return func result.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(context.run, call, func, args, kwargs))
+
+
+@contextlib.contextmanager
+def push(var, item):
+    token = var.set(var.get() + (item,))
+    try:
+        yield
+    finally:
+        var.reset(token)
+
+
+def execute_wrapper(wrapper):
+    """
+    connection.execute_wrapper for the current request on any thread its
+    queries run on, the executor or the thread of a sync view under ASGI.
+    Param wrapper execute wrapper.
+    Return context manager.
+    """
+    return push(request_wrappers, wrapper)
+
+
+def call_hook(hook):
+    """
+    enter a context manager around every run() call of the current request.
+    Param hook callable returning a context manager, called on the worker thread.
+    Return context manager.
+    """
+    return push(call_hooks, hook)
+
+
+def dispatch(execute, sql, params, many, context):
+    """execute wrapper of every connection, calling the wrappers of the current request."""
+    for wrapper in reversed(request_wrappers.get()):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatch(connection, **kwargs):
+    # first in the list, connection.execute_wrapper() pops the last one.
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch)
+
+
+def connect_signals():
+    from django.db.backends.signals import connection_created
+    connection_created.connect(install_dispatch, dispatch_uid="async_db_install_dispatch")
+
+
+class AsyncCapableMiddleware:
+    """
+    base of middleware running in the WSGI and ASGI handler without a thread
+    switch. Subclasses implement call(request) and async acall(request).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # the ASGI handler awaits the instance, as for django's MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
@@ -0,0 +1,94 @@
+import functools
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+
+from posts.async_db import run
+from posts.serializers import detail_response, post_details, user_details
+from posts.views import find_detail, post_list_context, user_list_context, user_profile_context
+
+
+def load_user(request):
+    """
+    evaluate the lazy request.user, reading session and user row, so the
+    event loop reads it without queries.
+    Param request view request.
+    Return request user.
+    """
+    request.user.is_authenticated
+    return request.user
+
+
+def login_required(view):
+    """
+    login_required of async views, loading request.user on the executor.
+    Param view async view.
+    Return async view redirecting anonymous users to settings.LOGIN_URL.
+    """
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        user = await run(load_user, request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view(request, *args, **kwargs)
+    return wrapped
+
+
+def render_page(request, template_name, build, *args):
+    """
+    build a page context and render it in one executor call; context
+    processors and lazy template values may query too.
+    Param request view request, template_name template, build context builder and its arguments.
+    Return HttpResponse.
+    """
+    return render(request, template_name, build(*args))
+
+
+@login_required
+async def index(request):
+    """
+    async view of the post list page.
+    Return post list view.
+    """
+    return await run(render_page, request, "posts/post_list.html", post_list_context, request)
+
+
+@login_required
+async def userList(request):
+    """
+    async view of the user list page.
+    Return user list view.
+    """
+    return await run(render_page, request, "posts/users_list.html", user_list_context, request)
+
+
+@login_required
+async def post_detail(request):
+    """
+    async view of post detail.
+    Param request post id.
+    Return post detail json.
+    """
+    detail = await run(find_detail, post_details, request.GET.get("post_id", ""), "Post does not exist")
+    return detail_response(request, detail)
+
+
+@login_required
+async def user_detail(request):
+    """
+    async view of user detail.
+    Param request user id.
+    Return user detail json.
+    """
+    detail = await run(find_detail, user_details, request.GET.get("user_id", ""), "User does not exist")
+    return detail_response(request, detail)
+
+
+@login_required
+async def user_profile(request):
+    """
+    async view of the profile page.
+    Return user profile view.
+    """
+    return await run(render_page, request, "posts/user_profile.html", user_profile_context, request.user)
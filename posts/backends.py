@@ -0,0 +1,47 @@
+from django.contrib.auth.backends import ModelBackend
+
+from posts.models import User
+
+UNKNOWN_EMAIL = "unknown_email"
+WRONG_PASSWORD = "wrong_password"
+
+
+class EmailBackend(ModelBackend):
+    """
+    authenticate by email and password with one user query, refusing soft
+    deleted users, and restore only alive users from the session.
+    The reason of a failed login is left in request.login_failure,
+    UNKNOWN_EMAIL for a missing or deleted user, WRONG_PASSWORD otherwise.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = email or username
+        if email is None or password is None:
+            return None
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            user = None
+        if user is None or user.is_deleted:
+            # hash anyway, so unknown emails are not told apart by response time.
+            User().set_password(password)
+            failure = UNKNOWN_EMAIL
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        else:
+            failure = WRONG_PASSWORD
+        if request is not None:
+            request.login_failure = failure
+        return None
+
+    def get_user(self, user_id):
+        """
+        load the user of a session once per request, as request.user.
+        Param user_id session user id.
+        Return alive active User, None otherwise.
+        """
+        try:
+            user = User.alive.get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def process_local_cache(alias):
+    """
+    backend class name of a cache private to one process.
+    Param alias CACHES alias.
+    Return class name, or "" for a shared cache.
+    """
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return ""
+    return backend.rsplit(".", 1)[-1]
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    """
+    refuse the cache-first session engine on a cache private to one process,
+    where a logout in one worker leaves the session valid in the others.
+    Return list of check errors.
+    """
+    if settings.SESSION_ENGINE != "posts.sessions":
+        return []
+    alias = getattr(settings, "SESSION_CACHE_ALIAS", "default")
+    backend = process_local_cache(alias)
+    if not backend:
+        return []
+    return [Error(
+        "SESSION_ENGINE 'posts.sessions' needs a cache shared by every process, "
+        "the '{}' cache is {}.".format(alias, backend),
+        hint="Point CACHE_BACKEND at memcached, or use the "
+             "'django.contrib.sessions.backends.db' engine.",
+        id="posts.E001",
+    )]
+
+
+@register(Tags.caches)
+def check_list_cache(app_configs, **kwargs):
+    """
+    refuse the list page cache on a cache private to one process, where a
+    write invalidates the lists of the worker that handled it only.
+    Return list of check errors.
+    """
+    if not getattr(settings, "LIST_CACHE_ENABLED", False):
+        return []
+    alias = getattr(settings, "LIST_CACHE_ALIAS", "default")
+    backend = process_local_cache(alias)
+    if not backend:
+        return []
+    return [Error(
+        "LIST_CACHE_ENABLED needs a cache shared by every process, "
+        "the '{}' cache is {}.".format(alias, backend),
+        hint="Point CACHE_BACKEND at memcached, or set LIST_CACHE_ENABLED=False.",
+        id="posts.E002",
+    )]
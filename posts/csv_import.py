@@ -0,0 +1,154 @@
+import csv
+import io
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts.models import Post
+from posts.search import index_queryset
+
+CSV_COLUMNS = 3
+TITLE_MAX_LENGTH = Post._meta.get_field("title").max_length
+DESCRIPTION_MAX_LENGTH = Post._meta.get_field("description").max_length
+
+
+class CsvImportError(Exception):
+    """
+    Raised for an upload which can not be imported.
+    Param message user facing message, line csv line number, detail row problem.
+    """
+
+    def __init__(self, message, line=None, detail=""):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.detail = detail
+
+    def detail_message(self):
+        if self.line is None:
+            return self.detail
+        return "Line {}: {}".format(self.line, self.detail)
+
+
+class CsvImportResult:
+    """
+    summary of a finished import.
+    Param rows imported row count, seconds elapsed time.
+    """
+
+    def __init__(self, rows, seconds):
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        if self.seconds <= 0:
+            return float(self.rows)
+        return self.rows / self.seconds
+
+    def __str__(self):
+        return "Imported {} posts in {:.2f} s ({:.0f} rows/s).".format(
+            self.rows, self.seconds, self.rows_per_second)
+
+
+def read_rows(binary_file):
+    """
+    decode and split a csv upload lazily.
+    Param binary_file file object opened in binary mode.
+    Return csv reader over the file.
+    """
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    return csv.reader(text_file, delimiter=",")
+
+
+def validate_row(row, line):
+    """
+    check one csv row.
+    Param row list of column values, line csv line number.
+    Return (title, description, status).
+    """
+    if len(row) != CSV_COLUMNS:
+        raise CsvImportError("Post upload csv must have 3 columns", line,
+                             "expected {} columns, got {}".format(CSV_COLUMNS, len(row)))
+    title, description, status = row
+    if not title:
+        raise CsvImportError("Post upload csv has invalid row", line, "title is empty")
+    if len(title) > TITLE_MAX_LENGTH:
+        raise CsvImportError("Post upload csv has invalid row", line,
+                             "title is longer than {} characters".format(TITLE_MAX_LENGTH))
+    if len(description) > DESCRIPTION_MAX_LENGTH:
+        raise CsvImportError("Post upload csv has invalid row", line,
+                             "description is longer than {} characters".format(DESCRIPTION_MAX_LENGTH))
+    try:
+        status = int(status)
+    except ValueError:
+        raise CsvImportError("Post upload csv has invalid row", line,
+                             "status '{}' is not a number".format(status))
+    return title, description, status
+
+
+def import_posts(binary_file, user, batch_size=1000, progress=None):
+    """
+    stream csv rows into post table with bulk_create batches in one transaction,
+    then add the new posts to the search index once.
+    A bad row rolls back every batch so no half imported table is left.
+    Param binary_file csv upload in binary mode, user importing User,
+    batch_size rows per insert, progress optional callback(rows).
+    Return CsvImportResult.
+    """
+    start = time.perf_counter()
+    now = timezone.now()
+    reader = read_rows(binary_file)
+    total = 0
+    try:
+        with transaction.atomic():
+            header = next(reader, None)
+            if header is None:
+                raise CsvImportError("Post upload csv must have 3 columns", 1, "file is empty")
+            if len(header) != CSV_COLUMNS:
+                raise CsvImportError("Post upload csv must have 3 columns", 1,
+                                     "expected {} columns, got {}".format(CSV_COLUMNS, len(header)))
+            last_id = Post.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+            batch = []
+            for row in reader:
+                title, description, status = validate_row(row, reader.line_num)
+                batch.append(Post(
+                    title=title,
+                    description=description,
+                    status=status,
+                    user=user,
+                    created_user_id=user.id,
+                    updated_user_id=user.id,
+                    created_at=now,
+                    updated_at=now
+                ))
+                if len(batch) >= batch_size:
+                    total += insert_batch(batch)
+                    batch = []
+                    if progress:
+                        progress(total)
+            if batch:
+                total += insert_batch(batch)
+                if progress:
+                    progress(total)
+            # bulk_create does not return primary keys on MySQL, read the new rows back.
+            # The range also holds posts the user created meanwhile, so their
+            # terms are replaced rather than added twice.
+            index_queryset(Post.objects.filter(id__gt=last_id, created_user_id=user.id))
+    except UnicodeDecodeError:
+        raise CsvImportError("Please choose csv format", None, "file is not utf-8 text")
+    except csv.Error as error:
+        raise CsvImportError("Please choose csv format", reader.line_num, str(error))
+    return CsvImportResult(total, time.perf_counter() - start)
+
+
+def insert_batch(batch):
+    """
+    insert one batch of posts.
+    Param batch list of unsaved Post.
+    Return inserted row count.
+    """
+    Post.objects.bulk_create(batch)
+    return len(batch)
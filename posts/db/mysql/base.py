@@ -0,0 +1,10 @@
+from django.db.backends.mysql import base
+
+from posts.db.pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    """
+    mysql backend with connection pooling and per request health checks,
+    configured by "POOL_SIZE", "POOL_MAX_LIFETIME" and "CONN_HEALTH_CHECKS".
+    """
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+
+from django.core.signals import request_started
+from django.db import connections
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    process wide stack of idle DB-API connections of one database alias.
+    Param size maximum idle connections kept, max_lifetime seconds before a
+    connection is retired or None to keep it.
+    """
+
+    def __init__(self, size, max_lifetime=None):
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.idle = deque()
+        self.lock = threading.Lock()
+
+    def expired(self, created_at):
+        return self.max_lifetime is not None and time.monotonic() - created_at >= self.max_lifetime
+
+    def acquire(self):
+        """
+        take the most recently used idle connection which is not too old.
+        Return (connection, created_at) or None.
+        """
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, created_at = self.idle.pop()
+            if not self.expired(created_at):
+                return connection, created_at
+            close_quietly(connection)
+
+    def release(self, connection, created_at):
+        """
+        keep a connection for reuse, or close it when the pool is full or it is too old.
+        Param connection DB-API connection, created_at time.monotonic() of connect.
+        """
+        with self.lock:
+            if len(self.idle) < self.size and not self.expired(created_at):
+                self.idle.append((connection, created_at))
+                return
+        close_quietly(connection)
+
+    def clear(self):
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection, created_at in idle:
+            close_quietly(connection)
+
+
+def get_pool(alias, settings_dict):
+    """
+    pool of a database alias, settings_dict "POOL_SIZE" and "POOL_MAX_LIFETIME".
+    Return ConnectionPool or None when pooling is off.
+    """
+    size = settings_dict.get("POOL_SIZE") or 0
+    if size <= 0:
+        return None
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(size, settings_dict.get("POOL_MAX_LIFETIME"))
+        return pool
+
+
+def clear_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.clear()
+
+
+class PooledConnectionMixin:
+    """
+    database wrapper mixin adding to a django backend
+    - "POOL_SIZE": idle connections returned by close() are kept in a process
+      wide pool and reused by any thread, retired after "POOL_MAX_LIFETIME" seconds.
+    - "CONN_HEALTH_CHECKS": a persistent connection is pinged before its first
+      use in each request and replaced when the server dropped it.
+    """
+    health_check_done = False
+    pool_created_at = None
+
+    def connection_usable(self, connection):
+        previous, self.connection = self.connection, connection
+        try:
+            return self.is_usable()
+        finally:
+            self.connection = previous
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+        while pool is not None:
+            pooled = pool.acquire()
+            if pooled is None:
+                break
+            connection, created_at = pooled
+            # an idle connection may have been dropped by the server meanwhile.
+            if self.connection_usable(connection):
+                self.pool_created_at = created_at
+                self.health_check_done = True
+                return connection
+            close_quietly(connection)
+        self.pool_created_at = time.monotonic()
+        self.health_check_done = True
+        return super().get_new_connection(conn_params)
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and not self.in_atomic_block and self.settings_dict.get("CONN_HEALTH_CHECKS")):
+            self.health_check_done = True
+            if not self.is_usable():
+                # keep the broken connection out of the pool.
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
+
+    def _close(self):
+        pool = get_pool(self.alias, self.settings_dict)
+        if (pool is None or self.errors_occurred or self.in_atomic_block
+                or self.autocommit != self.settings_dict["AUTOCOMMIT"]):
+            return super()._close()
+        pool.release(self.connection, self.pool_created_at)
+
+
+def reset_health_checks(**kwargs):
+    for connection in connections.all():
+        connection.health_check_done = False
+
+
+request_started.connect(reset_health_checks, dispatch_uid="posts_db_reset_health_checks")
@@ -3,6 +3,19 @@ from django.utils.translation import ugettext_lazy as _
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
 from posts.models import User
+from posts.images import ProfileImageError, check_upload
+
+def check_profile(form):
+    """
+    reject a profile upload which is not a safe image.
+    Param form user form with cleaned data.
+    """
+    profile = form.cleaned_data.get("profile")
+    if profile:
+        try:
+            check_upload(profile)
+        except ProfileImageError as error:
+            form.add_error("profile", str(error))
 
 class SeachPostForm(forms.Form):
     """
@@ -94,6 +107,7 @@ class UserForm(forms.Form):
                 self.add_error(None, "Password Confirmation must be match.")
         if not self.cleaned_data.get("address"):
             self.add_error("address", "Address can't be blank")
+        check_profile(self)
 
 class UserEditForm(forms.Form):
     """
@@ -149,6 +163,7 @@ class UserEditForm(forms.Form):
             self.add_error("email", "E-Mail can't be blank")
         if not self.cleaned_data.get("address"):
             self.add_error("address", "Address can't be blank")
+        check_profile(self)
 
 class SignUpForm(forms.Form):
     """
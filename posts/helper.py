@@ -1,41 +1,58 @@
 from django.conf import settings
+from django.core import signing
+from posts.images import process_profile
+from posts.storage import media_storage
 import os
 
-def check_route(current_route, previousRoute, request):
-    """
-    check route for confirm and create page.
-    Param current_route
-    """
-    if previousRoute is not None:
-        splittedRoute = previousRoute.split("/")
-        if (splittedRoute[-2] == "create"):
-            if (splittedRoute[-3] != current_route):
-                request.session["create_update_confirm_page_flag"] = False
-        elif (splittedRoute[-2] == "update"):
-            if (splittedRoute[-4] != current_route):
-                print('session false')
-                request.session["create_update_confirm_page_flag"] = False
+CONFIRM_TOKEN_SALT = "posts.confirm"
+
+def make_confirm_token(request, form_name, **state):
+    """
+    sign the state of a form confirm step, sent back in a hidden field.
+    It replaces session flags, so form pages write no session and several
+    tabs confirm independently.
+    Param request view request, form_name form and object, e.g. "post-update:3",
+    state pending values such as status or profile.
+    Return signed token.
+    """
+    state.update({"form": form_name, "user": request.user.id})
+    return signing.dumps(state, salt=CONFIRM_TOKEN_SALT)
+
+def read_confirm_token(request, form_name):
+    """
+    read the confirm step state posted with a form.
+    Param request view request, form_name form and object of make_confirm_token.
+    Return state dict, None when missing, tampered, expired or of another form or user.
+    """
+    token = request.POST.get("confirm_token")
+    if not token:
+        return None
+    try:
+        state = signing.loads(token, salt=CONFIRM_TOKEN_SALT,
+                              max_age=getattr(settings, "CONFIRM_TOKEN_MAX_AGE", 3600))
+    except signing.BadSignature:
+        return None
+    if state.get("form") != form_name or state.get("user") != request.user.id:
+        return None
+    return state
 
 def save_temp(f):
     """
-    save temp file in temp folder.
+    save temp file in temp folder under its content hash.
     Param f request file.
     Return file name.
     """
-    with open("media/temp/"+f.name, "wb+") as destination:
-        for chunk in f.chunks():
-            destination.write(chunk)
-        return f.name
+    return os.path.basename(media_storage.save("temp/" + f.name, f))
 
 def handle_uploaded_file(file_name):
     """
-    save file to media folder from temp folder.
+    save file to media folder from temp folder with its resized derivatives.
+    A file already in media folder has the same content and is kept.
     Param file_name
     """
-    with open("media/temp/" + file_name, "rb") as tmp:
-        img_str = tmp.read()
-        with open("media/"+file_name, "wb+") as upload:
-            upload.write(img_str)
+    if file_name and media_storage.exists(file_name):
+        return
+    process_profile(os.path.join(settings.MEDIA_ROOT, "temp", file_name), file_name)
 
 def remove_temp(f):
     """
@@ -43,4 +60,8 @@ def remove_temp(f):
     f filename, root_dir Project Root Directory.
     """
     if (f):
-        os.unlink(str(settings.BASE_DIR)+"\\media\\temp\\" + f)
\ No newline at end of file
+        try:
+            os.unlink(os.path.join(settings.MEDIA_ROOT, "temp", f))
+        except FileNotFoundError:
+            # another upload of the same content was promoted first.
+            pass
\ No newline at end of file
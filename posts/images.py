@@ -0,0 +1,156 @@
+import os
+import warnings
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from posts.storage import atomic_path
+
+DEFAULT_PROFILE = "user_default.png"
+DERIVATIVE_DIR = "profiles"
+FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+ALPHA_EXTENSIONS = (".png", ".gif")
+
+
+class ProfileImageError(Exception):
+    """Raised for a profile upload which is not a safe image."""
+
+
+def get_sizes():
+    return getattr(settings, "PROFILE_IMAGE_SIZES", {"thumb": 200, "medium": 300})
+
+
+def webp_enabled():
+    return getattr(settings, "PROFILE_IMAGE_WEBP", True) and features.check("webp")
+
+
+def open_image(source):
+    """
+    open an image, reading only its header, and reject decompression bombs
+    before any pixel data is decoded.
+    Param source path or file object.
+    Return PIL Image.
+    """
+    max_pixels = getattr(settings, "PROFILE_IMAGE_MAX_PIXELS", 25000000)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", Image.DecompressionBombWarning)
+        try:
+            image = Image.open(source)
+        except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+            raise ProfileImageError("Profile image is too large")
+        except (UnidentifiedImageError, OSError):
+            raise ProfileImageError("Profile must be a jpeg, png, gif or webp image")
+    if image.format not in FORMATS:
+        raise ProfileImageError("Profile must be a jpeg, png, gif or webp image")
+    if image.width * image.height > max_pixels:
+        raise ProfileImageError("Profile image is too large")
+    return image
+
+
+def check_upload(uploaded_file):
+    """
+    check an uploaded profile before it is stored.
+    Param uploaded_file django UploadedFile.
+    """
+    try:
+        image = open_image(uploaded_file)
+        try:
+            image.verify()
+        except Exception:
+            raise ProfileImageError("Profile image is broken")
+    finally:
+        uploaded_file.seek(0)
+
+
+def profile_name(profile):
+    """
+    media file name of a stored profile value.
+    Stored values are "name.png", the "/user_default.png" default or, from
+    older profile edits, "/media/name.png".
+    Param profile FileField value or string.
+    Return file name below MEDIA_ROOT.
+    """
+    return os.path.basename(str(profile or "")) or DEFAULT_PROFILE
+
+
+def derivative_extension(name):
+    return "png" if os.path.splitext(name)[1].lower() in ALPHA_EXTENSIONS else "jpg"
+
+
+def derivative_name(name, size, extension):
+    return "{}/{}_{}.{}".format(DERIVATIVE_DIR, os.path.splitext(name)[0], size, extension)
+
+
+def profile_url(profile, size=None, webp=False):
+    """
+    url of a profile image in a derivative size.
+    Profiles uploaded before derivatives existed fall back to the original.
+    Param profile FileField value or string, size key of PROFILE_IMAGE_SIZES or None
+    for the original, webp True for the WebP derivative.
+    Return url, "" for a missing WebP derivative.
+    """
+    name = profile_name(profile)
+    if size:
+        derivative = derivative_name(name, size, "webp" if webp else derivative_extension(name))
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, derivative)):
+            return settings.MEDIA_URL + derivative
+        if webp:
+            return ""
+    return settings.MEDIA_URL + name
+
+
+def clean_pixels(image, extension):
+    """
+    apply exif orientation and drop every metadata chunk of a decoded image.
+    Param image PIL Image, extension target file extension.
+    Return new PIL Image.
+    """
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha and extension == "jpg":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    image.info = {}
+    return image
+
+
+def save_image(image, path, image_format):
+    options = {"optimize": True}
+    if image_format in ("JPEG", "WEBP"):
+        options["quality"] = getattr(settings, "PROFILE_IMAGE_QUALITY", 85)
+    with atomic_path(path) as temp_path:
+        image.save(temp_path, image_format, **options)
+
+
+def process_profile(source_path, name):
+    """
+    store a profile image without metadata, bounded to PROFILE_IMAGE_MAX_SIDE,
+    with its PROFILE_IMAGE_SIZES derivatives and optional WebP copies.
+    Param source_path uploaded image, name file name below MEDIA_ROOT.
+    Return list of written paths relative to MEDIA_ROOT.
+    """
+    max_side = getattr(settings, "PROFILE_IMAGE_MAX_SIDE", 2048)
+    with open_image(source_path) as source:
+        image_format = source.format
+        source.load()
+        extension = derivative_extension(name)
+        image = clean_pixels(source, extension)
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    original = image.copy()
+    original.thumbnail((max_side, max_side), Image.LANCZOS)
+    save_image(original, os.path.join(settings.MEDIA_ROOT, name), image_format)
+    written = [name]
+    for size, bound in get_sizes().items():
+        resized = image.copy()
+        resized.thumbnail((bound, bound), Image.LANCZOS)
+        path = derivative_name(name, size, extension)
+        save_image(resized, os.path.join(settings.MEDIA_ROOT, path), "PNG" if extension == "png" else "JPEG")
+        written.append(path)
+        if webp_enabled():
+            path = derivative_name(name, size, "webp")
+            save_image(resized, os.path.join(settings.MEDIA_ROOT, path), "WEBP")
+            written.append(path)
+    return written
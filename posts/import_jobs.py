@@ -0,0 +1,252 @@
+import datetime
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, connections, router, transaction
+from django.utils import timezone
+
+from posts import list_cache, metrics
+from posts.csv_import import CsvImportError, import_posts
+from posts.models import CsvImportJob, User
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobLost(Exception):
+    """Raised when a running job was requeued and claimed by another worker."""
+
+
+class ProgressWriter:
+    """
+    write rows_processed and the heartbeat of a running job through a
+    connection of its own, so pollers and run_import_jobs in any process see
+    them while the import transaction is open.
+    SQLite allows one writer at a time and the import holds it, there only
+    the claim sets the heartbeat and the count is written when the job finishes.
+    Param job_id CsvImportJob id, claimed_at claim_job time, nothing is
+    written once the job was requeued.
+    """
+
+    def __init__(self, job_id, claimed_at):
+        self.job_id = job_id
+        self.claimed_at = claimed_at
+        self.connection = None
+        alias = router.db_for_write(CsvImportJob)
+        if connections[alias].vendor != "sqlite":
+            self.connection = connections.create_connection(alias)
+
+    def __call__(self, rows):
+        if self.connection is None:
+            return
+        meta = CsvImportJob._meta
+        quote = self.connection.ops.quote_name
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("UPDATE {} SET {} = %s, {} = %s WHERE {} = %s AND {} = %s".format(
+                    quote(meta.db_table), quote(meta.get_field("rows_processed").column),
+                    quote(meta.get_field("heartbeat_at").column), quote(meta.pk.column),
+                    quote(meta.get_field("started_at").column)),
+                    [rows, self.connection.ops.adapt_datetimefield_value(timezone.now()), self.job_id,
+                     self.connection.ops.adapt_datetimefield_value(self.claimed_at)])
+        except Exception:
+            logger.warning("csv import job %s progress not written", self.job_id, exc_info=True)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def store_upload(uploaded_file):
+    """
+    store an upload in the import directory under a name of its own, so a
+    finished job deletes its file without another job still needing it.
+    Param uploaded_file django UploadedFile.
+    Return stored file path.
+    """
+    return default_storage.path(default_storage.save("imports/upload.csv", uploaded_file))
+
+
+def release_upload(job):
+    """
+    delete the stored file of a finished job.
+    Param job CsvImportJob.
+    """
+    try:
+        os.unlink(job.file_path)
+    except OSError:
+        pass
+
+
+def get_executor():
+    """
+    lazily create the in-process worker pool.
+    Return ThreadPoolExecutor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "CSV_IMPORT_WORKERS", 2),
+                thread_name_prefix="csv-import")
+        return _executor
+
+
+def create_job(uploaded_file, user):
+    """
+    store the upload, create its job and hand it to the configured backend.
+    Param uploaded_file django UploadedFile, user importing User.
+    Return CsvImportJob.
+    """
+    job = CsvImportJob.objects.create(
+        user=user,
+        file_path=store_upload(uploaded_file),
+        file_name=uploaded_file.name[:255]
+    )
+    backend = getattr(settings, "CSV_IMPORT_JOB_BACKEND", "thread")
+    if backend == "sync":
+        run_job(job.id)
+    elif backend == "thread":
+        get_executor().submit(run_job_in_thread, job.id)
+    # "queue" leaves the job pending for manage.py run_import_jobs.
+    return job
+
+
+def claim_job(job_id):
+    """
+    atomically move a pending job to running so only one worker takes it.
+    Param job_id CsvImportJob id.
+    Return claim time, None when another worker has the job.
+    """
+    now = timezone.now()
+    if CsvImportJob.objects.filter(pk=job_id, status=CsvImportJob.STATUS_PENDING).update(
+            status=CsvImportJob.STATUS_RUNNING, started_at=now, heartbeat_at=now) == 1:
+        return now
+    return None
+
+
+def finish_job(job_id, claimed_at, status, rows=0, error_message="", error_detail=""):
+    """
+    store the outcome of a job this worker still owns.
+    Param job_id CsvImportJob id, claimed_at claim_job time, status final
+    status, rows imported rows, error_message and error_detail of a failure.
+    Raise JobLost when the job was requeued in the meantime.
+    """
+    if not CsvImportJob.objects.filter(
+        pk=job_id, status=CsvImportJob.STATUS_RUNNING, started_at=claimed_at
+    ).update(
+        status=status,
+        rows_processed=rows,
+        error_message=error_message,
+        error_detail=error_detail,
+        finished_at=timezone.now()
+    ):
+        raise JobLost("csv import job {} was requeued".format(job_id))
+
+
+def run_job(job_id):
+    """
+    import the csv file of a pending job. The success status is written in
+    the import transaction, so a worker dying after the commit never leaves
+    an imported job to be requeued, and a requeued job's first worker rolls
+    its import back.
+    Param job_id CsvImportJob id.
+    """
+    claimed_at = claim_job(job_id)
+    if claimed_at is None:
+        return
+    job = CsvImportJob.objects.get(pk=job_id)
+    user = User.objects.get(pk=job.user_id)
+    progress = ProgressWriter(job_id, claimed_at)
+    owned = True
+    try:
+        with open(job.file_path, "rb") as csv_file, transaction.atomic():
+            result = import_posts(
+                csv_file, user, getattr(settings, "CSV_IMPORT_BATCH_SIZE", 1000), progress)
+            finish_job(job_id, claimed_at, CsvImportJob.STATUS_SUCCESS, result.rows)
+        # bulk_create sends no post_save signals.
+        list_cache.invalidate_posts()
+        metrics.record_csv_import(result.rows, "job")
+    except JobLost:
+        # the new owner imports the file, keep it.
+        logger.warning("csv import job %s was requeued, import rolled back", job_id)
+        return
+    except CsvImportError as error:
+        owned = fail_job(job_id, claimed_at, error.message, error.detail_message())
+    except Exception as error:
+        logger.exception("csv import job %s failed", job_id)
+        owned = fail_job(job_id, claimed_at, "Import failed", str(error))
+    finally:
+        progress.close()
+    if owned:
+        release_upload(job)
+
+
+def fail_job(job_id, claimed_at, error_message, error_detail):
+    """
+    mark a job this worker still owns as failed.
+    Return False when the job was requeued in the meantime.
+    """
+    try:
+        finish_job(job_id, claimed_at, CsvImportJob.STATUS_FAILED,
+                   error_message=error_message[:255], error_detail=error_detail[:255])
+    except JobLost:
+        logger.warning("csv import job %s was requeued", job_id)
+        return False
+    return True
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    put running jobs without a heartbeat for timeout seconds back to pending,
+    their worker died and the import transaction was rolled back.
+    Param timeout seconds, default settings.CSV_IMPORT_JOB_TIMEOUT.
+    Return requeued job count.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "CSV_IMPORT_JOB_TIMEOUT", 600)
+    return CsvImportJob.objects.filter(
+        status=CsvImportJob.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - datetime.timedelta(seconds=timeout)
+    ).update(status=CsvImportJob.STATUS_PENDING, started_at=None, heartbeat_at=None, rows_processed=0)
+
+
+def run_job_in_thread(job_id):
+    """
+    worker pool entry point, owns its database connection.
+    Param job_id CsvImportJob id.
+    """
+    close_old_connections()
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception("csv import job %s crashed", job_id)
+    finally:
+        connection.close()
+
+
+def job_progress(job):
+    """
+    build progress data of a job for polling.
+    Param job CsvImportJob.
+    Return dict.
+    """
+    rows = job.rows_processed
+    seconds = job.seconds()
+    return {
+        "id": job.id,
+        "file_name": job.file_name,
+        "status": job.status,
+        "finished": job.is_finished(),
+        "rows_processed": rows,
+        "seconds": round(seconds, 2),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else 0,
+        "error_message": job.error_message,
+        "error_detail": job.error_detail
+    }
@@ -0,0 +1,113 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.db import close_old_connections, connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_pending = {}
+_pending_lock = threading.Lock()
+_flusher = None
+_flusher_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def is_deferred():
+    return getattr(settings, "LAST_LOGIN_DEFERRED", False)
+
+
+def record_login(sender, request, user, **kwargs):
+    """
+    user_logged_in receiver replacing django's update_last_login.
+    Deferred, the login time is kept in memory and written by the flusher;
+    otherwise the user row is updated in the login request as before.
+    Param user logged in User.
+    """
+    if not is_deferred():
+        update_last_login(sender, user, **kwargs)
+        return
+    user.last_login = timezone.now()
+    with _pending_lock:
+        _pending[user.pk] = user.last_login
+        full = len(_pending) >= getattr(settings, "LAST_LOGIN_MAX_PENDING", 1000)
+    if not start_flusher():
+        if full:
+            flush()
+    elif full:
+        _wake.set()
+
+
+def connect_signals():
+    """
+    put record_login in place of django's update_last_login, whichever app
+    is ready first: the receiver takes over its dispatch_uid.
+    """
+    from django.contrib.auth.signals import user_logged_in
+    user_logged_in.disconnect(dispatch_uid="update_last_login")
+    user_logged_in.connect(record_login, dispatch_uid="update_last_login")
+
+
+def flush():
+    """
+    write buffered login times, one UPDATE ... CASE per
+    settings.LAST_LOGIN_BATCH_SIZE users.
+    Return written user count.
+    """
+    from posts.models import User
+    with _pending_lock:
+        pending = list(_pending.items())
+        _pending.clear()
+    batch_size = getattr(settings, "LAST_LOGIN_BATCH_SIZE", 500)
+    written = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            written += User.objects.filter(pk__in=[pk for pk, when in batch]).update(last_login=Case(
+                *[When(pk=pk, then=Value(when)) for pk, when in batch], output_field=DateTimeField()))
+        except Exception:
+            logger.exception("last_login flush of %s users failed", len(batch))
+            # keep the times for the next flush unless a newer login replaced them.
+            with _pending_lock:
+                for pk, when in batch:
+                    _pending.setdefault(pk, when)
+    return written
+
+
+def run_flusher():
+    """flusher thread loop, owns its database connection."""
+    while True:
+        _wake.wait(getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 5))
+        _wake.clear()
+        close_old_connections()
+        try:
+            flush()
+        finally:
+            connection.close()
+
+
+def start_flusher():
+    """
+    lazily start the flusher thread of this process, after a fork too.
+    A LAST_LOGIN_FLUSH_INTERVAL of 0 starts none, the buffer is then written
+    when LAST_LOGIN_MAX_PENDING logins are pending and at exit.
+    Return True when a flusher runs.
+    """
+    global _flusher
+    if not getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 5):
+        return False
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=run_flusher, name="last-login-flusher", daemon=True)
+            _flusher.start()
+    return True
+
+
+@atexit.register
+def flush_at_exit():
+    if _pending:
+        flush()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import Page
+from django.db.models.signals import post_delete, post_save
+
+POSTS = "posts"
+USERS = "users"
+
+
+def get_cache():
+    """
+    cache backend of the list cache, settings.LIST_CACHE_ALIAS of CACHES.
+    Return django cache.
+    """
+    return caches[getattr(settings, "LIST_CACHE_ALIAS", "default")]
+
+
+def is_enabled():
+    return getattr(settings, "LIST_CACHE_ENABLED", False)
+
+
+def generation_key(kind):
+    return "list-cache:gen:{}".format(kind)
+
+
+def get_generation(kind):
+    """
+    current generation counter of a list.
+    Param kind POSTS or USERS.
+    Return int.
+    """
+    cache = get_cache()
+    generation = cache.get(generation_key(kind))
+    if generation is None:
+        cache.add(generation_key(kind), 1, None)
+        generation = cache.get(generation_key(kind), 1)
+    return generation
+
+
+def invalidate(*kinds):
+    """
+    drop every cached page of the lists in O(1) by moving their generation on.
+    Param kinds POSTS and/or USERS.
+    """
+    cache = get_cache()
+    for kind in kinds:
+        try:
+            cache.incr(generation_key(kind))
+        except ValueError:
+            cache.add(generation_key(kind), 2, None)
+
+
+def invalidate_posts():
+    invalidate(POSTS)
+
+
+def invalidate_users():
+    # the post list shows the poster email, so user changes reach it too.
+    invalidate(USERS, POSTS)
+
+
+def page_key(kind, user, search, page):
+    """
+    cache key of one list page.
+    Param kind POSTS or USERS, user logged in User, search dict of search terms, page page number or cursor.
+    Return cache key.
+    """
+    scope = "admin" if user.type != "1" else "user{}".format(user.id)
+    terms = hashlib.md5(json.dumps(search, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    page = hashlib.md5(str(page or "").encode("utf-8")).hexdigest()
+    return "list-cache:{}:{}:{}:{}:{}".format(kind, get_generation(kind), scope, terms, page)
+
+
+def get_or_set(key, build):
+    """
+    read a cached page or build and store it.
+    Param key page_key, build callable returning the picklable page data.
+    Return page data.
+    """
+    if not is_enabled():
+        return build()
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, getattr(settings, "LIST_CACHE_TIMEOUT", 300))
+    return data
+
+
+def cached_page(key, paginator, number):
+    """
+    page of a django Paginator served from the list cache.
+    Param key page_key, paginator Paginator, number requested page number.
+    Return Page bound to paginator.
+    """
+    def build():
+        page = paginator.get_page(number)
+        return {"rows": list(page.object_list), "count": paginator.count, "number": page.number}
+
+    data = get_or_set(key, build)
+    # a cached count keeps the paginator from running COUNT(*) again.
+    paginator.count = data["count"]
+    return Page(data["rows"], data["number"], paginator)
+
+
+def post_changed(sender, **kwargs):
+    invalidate_posts()
+
+
+def user_changed(sender, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_users()
+
+
+def connect_signals():
+    """
+    invalidate the lists on every model write, including admin and shell writes.
+    """
+    from posts.models import Post, User
+    post_save.connect(post_changed, sender=Post, dispatch_uid="list_cache_post_save")
+    post_delete.connect(post_changed, sender=Post, dispatch_uid="list_cache_post_delete")
+    post_save.connect(user_changed, sender=User, dispatch_uid="list_cache_user_save")
+    post_delete.connect(user_changed, sender=User, dispatch_uid="list_cache_user_delete")
@@ -0,0 +1,192 @@
+import datetime
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from posts import list_cache
+from posts.models import Post, User
+from posts.query_budget import QueryStats
+from posts.views import LIST_PAGE_SIZE
+
+SCENARIOS = ("index", "index_search", "index_deep_page", "user_list",
+             "post_detail", "download_post_list_csv", "csv_import")
+
+
+def percentile(values, fraction):
+    """
+    nearest rank percentile.
+    Param values sorted list, fraction 0.5 for the median.
+    Return value.
+    """
+    return values[max(math.ceil(len(values) * fraction) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """
+    time the main views at the current database size through the test client
+    and write a JSON report of latency percentiles, query counts and peak
+    memory per scenario, to be compared across commits with --compare.
+    Run seed_bulletinboard first. The csv import scenario is rolled back.
+    Param --requests timed requests per scenario, --warmup untimed requests,
+    --scenario names to run, --warm-cache keep the list cache between
+    requests, --import-rows rows per csv import, --output report file,
+    --compare earlier report file.
+    """
+    help = "Benchmark the post and user views and write a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                            help="Scenario to run, repeat for several. Default all.")
+        parser.add_argument("--warm-cache", action="store_true",
+                            help="Keep cached list pages between requests.")
+        parser.add_argument("--import-rows", type=int, default=200)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--compare", help="JSON report of an earlier run to compare with.")
+
+    def scenarios(self, options):
+        """
+        build the requests of every scenario.
+        Return dict of scenario name to a callable sending one request.
+        """
+        admin = User.alive.filter(type="0").order_by("id").first()
+        if admin is None or not Post.alive.exists():
+            raise CommandError("Benchmark needs an admin user and posts, run seed_bulletinboard first.")
+        # a host the site accepts, "localhost" is only allowed by DEBUG.
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        client = Client(HTTP_HOST=host)
+        client.force_login(admin)
+        post_ids = list(Post.alive.order_by("id").values_list("id", flat=True)[:1000])
+        last_page = max(Post.alive.count() // LIST_PAGE_SIZE, 1)
+        keyword = Post.alive.order_by("id").values_list("title", flat=True)[0].split()[0]
+        rows = "\n".join("bench title {0},bench description {0},1".format(i)
+                         for i in range(options["import_rows"]))
+        csv_data = ("title,description,status\n" + rows + "\n").encode("utf-8")
+        state = {"post": 0}
+
+        def post_detail():
+            state["post"] += 1
+            return client.get(reverse("post-detail"), {"post_id": post_ids[state["post"] % len(post_ids)]})
+
+        def csv_import():
+            upload = io.BytesIO(csv_data)
+            upload.name = "bench.csv"
+            # imported rows would change the data set of later runs.
+            with transaction.atomic():
+                response = client.post(reverse("csv-import"), {"csv_file": upload})
+                transaction.set_rollback(True)
+            return response
+
+        return {
+            "index": lambda: client.get(reverse("index")),
+            "index_search": lambda: client.post(reverse("index"), {"keyword": keyword}),
+            "index_deep_page": lambda: client.get(reverse("index"), {"page": last_page}),
+            "user_list": lambda: client.get(reverse("user-list")),
+            "post_detail": post_detail,
+            "download_post_list_csv": lambda: client.get(reverse("post-list-download")),
+            "csv_import": csv_import,
+        }
+
+    def send(self, send, warm_cache):
+        """
+        send one request and read the whole response.
+        Return (seconds, QueryStats).
+        """
+        if not warm_cache:
+            list_cache.invalidate_posts()
+            list_cache.invalidate_users()
+        stats = QueryStats()
+        start = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = send()
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    pass
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise CommandError("Request failed with status {}".format(response.status_code))
+        return elapsed, stats
+
+    def measure(self, send, options):
+        for i in range(options["warmup"]):
+            self.send(send, options["warm_cache"])
+        timings = []
+        queries = []
+        for i in range(options["requests"]):
+            elapsed, stats = self.send(send, options["warm_cache"])
+            timings.append(elapsed * 1000)
+            queries.append(stats.count)
+        # tracemalloc slows every allocation down, so memory gets its own request.
+        tracemalloc.start()
+        try:
+            self.send(send, options["warm_cache"])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        return {
+            "requests": len(timings),
+            "mean_ms": round(statistics.mean(timings), 3),
+            "p50_ms": round(percentile(timings, 0.5), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "queries": max(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+    def revision(self):
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, report, path):
+        with open(path, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stderr.write("compared with {} ({})".format(path, baseline.get("revision")))
+        for name, result in report["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if not before:
+                continue
+            self.stderr.write("{:<24} p50 {:+7.1f}%  p95 {:+7.1f}%  queries {:+d}".format(
+                name, (result["p50_ms"] / before["p50_ms"] - 1) * 100,
+                (result["p95_ms"] / before["p95_ms"] - 1) * 100, result["queries"] - before["queries"]))
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be at least 1.")
+        scenarios = self.scenarios(options)
+        report = {
+            "revision": self.revision(),
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "rows": {"users": User.all_with_deleted.count(), "posts": Post.all_with_deleted.count()},
+            "warm_cache": options["warm_cache"],
+            "scenarios": {},
+        }
+        for name in options["scenario"] or SCENARIOS:
+            result = self.measure(scenarios[name], options)
+            report["scenarios"][name] = result
+            self.stderr.write("{:<24} p50 {:8.2f} ms  p95 {:8.2f} ms  {:3d} queries  {:9.1f} KB".format(
+                name, result["p50_ms"], result["p95_ms"], result["queries"], result["peak_memory_kb"]))
+        data = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.write(data + "\n")
+        else:
+            self.stdout.write(data)
+        if options["compare"]:
+            self.compare(report, options["compare"])
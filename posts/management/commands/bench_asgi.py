@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from posts.management.commands.bench import percentile
+from posts.models import Post, User
+
+SERVERS = {
+    # sync views in threads of a gthread worker.
+    "wsgi": ["gunicorn", "bulletinBoard.wsgi:application", "--worker-class", "gthread",
+             "--workers", "{workers}", "--threads", "{threads}", "--bind", "127.0.0.1:{port}",
+             "--log-level", "warning"],
+    # async read views on the event loop, ORM on ASYNC_DB_WORKERS threads.
+    "asgi": ["uvicorn", "bulletinBoard.asgi:application", "--workers", "{workers}",
+             "--host", "127.0.0.1", "--port", "{port}", "--no-access-log", "--log-level", "warning"],
+}
+
+
+async def read_response(reader):
+    """
+    read one HTTP/1.1 response with a Content-Length or chunked body.
+    Return (status, keep alive).
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, requests, deadline, warmup_until, timings, errors):
+    """
+    one keep-alive connection sending requests back to back until deadline.
+    Param requests iterator of request bytes, timings and errors lists of
+    measured requests after warmup_until.
+    """
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                start = time.perf_counter()
+            writer.write(next(requests))
+            status, keep_alive = await read_response(reader)
+            elapsed = time.perf_counter() - start
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if start >= warmup_until:
+                errors.append("connection")
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        if start >= warmup_until:
+            if status >= 400:
+                errors.append(status)
+            else:
+                timings.append(elapsed * 1000)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+class Command(BaseCommand):
+    """
+    load test the read views (post and user lists, details and profile) on a
+    local gunicorn WSGI server and a local uvicorn ASGI server, with many
+    concurrent keep-alive connections of a logged in user, and report
+    throughput and tail latency of both.
+    The client is one asyncio loop, give the servers fewer cores than the machine.
+    Param --server wsgi or asgi, repeat for both (default), --concurrency
+    connections, --duration seconds measured, --warmup seconds before,
+    --workers server processes, --threads gthread threads of the WSGI worker,
+    --port server port, --output JSON report file.
+    """
+    help = "Load test the read views on local WSGI and ASGI servers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", action="append", choices=sorted(SERVERS))
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=15)
+        parser.add_argument("--warmup", type=float, default=3)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=getattr(settings, "ASYNC_DB_WORKERS", 8))
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def login_cookie(self, user):
+        # a database session, the servers do not share this process's cache.
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return "{}={}".format(settings.SESSION_COOKIE_NAME, session.session_key)
+
+    def request_cycle(self):
+        """
+        requests rotating over the read views.
+        Return iterator of raw HTTP/1.1 requests.
+        """
+        user = User.alive.filter(type="0").order_by("id").first()
+        if user is None or not Post.alive.exists():
+            raise CommandError("Load test needs an admin user and posts, run seed_bulletinboard first.")
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        cookie = self.login_cookie(user)
+        post_ids = list(Post.alive.order_by("id").values_list("id", flat=True)[:100])
+        user_ids = list(User.alive.order_by("id").values_list("id", flat=True)[:100])
+        paths = [reverse("index"), reverse("user-list"), reverse("user-profile")]
+        paths += ["{}?post_id={}".format(reverse("post-detail"), pk) for pk in post_ids[:10]]
+        paths += ["{}?user_id={}".format(reverse("user-detail"), pk) for pk in user_ids[:10]]
+        requests = [
+            "GET {} HTTP/1.1\r\nHost: {}\r\nCookie: {}\r\n\r\n".format(path, host, cookie).encode("latin-1")
+            for path in paths
+        ]
+        return itertools.cycle(requests)
+
+    def start_server(self, name, options):
+        command = [part.format(**options) for part in SERVERS[name]]
+        env = dict(os.environ, ASYNC_VIEWS=str(name == "asgi"), DJANGO_SETTINGS_MODULE=os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "bulletinBoard.settings"))
+        try:
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        except FileNotFoundError:
+            raise CommandError("{} is not installed, pip install -r requirements.txt".format(command[0]))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("{} exited with {}".format(command[0], process.returncode))
+            try:
+                socket.create_connection(("127.0.0.1", options["port"]), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError("{} did not start listening on port {}".format(command[0], options["port"]))
+
+    async def load(self, options, requests):
+        timings = []
+        errors = []
+        start = time.perf_counter()
+        warmup_until = start + options["warmup"]
+        deadline = warmup_until + options["duration"]
+        await asyncio.gather(*[
+            client(options["port"], requests, deadline, warmup_until, timings, errors)
+            for i in range(options["concurrency"])
+        ])
+        return timings, errors
+
+    def measure(self, name, options, requests):
+        process = self.start_server(name, options)
+        try:
+            timings, errors = asyncio.run(self.load(options, requests))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        if not timings:
+            raise CommandError("{} answered no request, errors: {}".format(name, errors[:5]))
+        timings.sort()
+        return {
+            "requests": len(timings),
+            "errors": len(errors),
+            "requests_per_second": round(len(timings) / options["duration"], 1),
+            "mean_ms": round(statistics.mean(timings), 2),
+            "p50_ms": round(percentile(timings, 0.5), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "p99_ms": round(percentile(timings, 0.99), 2),
+            "max_ms": round(timings[-1], 2),
+        }
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["duration"] <= 0:
+            raise CommandError("--concurrency and --duration must be positive.")
+        requests = self.request_cycle()
+        report = {
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+            "workers": options["workers"],
+            "python": sys.version.split()[0],
+            "servers": {},
+        }
+        for name in options["server"] or ["wsgi", "asgi"]:
+            result = self.measure(name, options, requests)
+            report["servers"][name] = result
+            self.stderr.write("{:<5} {:8.1f} req/s  p50 {:8.2f} ms  p95 {:8.2f} ms  p99 {:8.2f} ms  {} errors".format(
+                name, result["requests_per_second"], result["p50_ms"], result["p95_ms"],
+                result["p99_ms"], result["errors"]))
+        data = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.write(data + "\n")
+        else:
+            self.stdout.write(data)
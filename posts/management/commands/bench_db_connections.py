@@ -0,0 +1,85 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from posts.db.pool import clear_pools
+from posts.models import Post, User
+
+MODES = [
+    ("new connection per request", {"CONN_MAX_AGE": 0, "POOL_SIZE": 0}),
+    ("persistent connection", {"CONN_MAX_AGE": 60, "POOL_SIZE": 0}),
+    ("pooled connection", {"CONN_MAX_AGE": 0, "POOL_SIZE": 4}),
+]
+
+
+class Command(BaseCommand):
+    """
+    measure per request latency of the post detail view with new, persistent
+    and pooled database connections.
+    Requests run through the WSGI handler so connections are closed and reused
+    exactly as in production.
+    Param --requests timed requests per mode, --warmup untimed requests per mode.
+    """
+    help = "Benchmark post detail latency with new, persistent and pooled database connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--warmup", type=int, default=20)
+
+    def login_cookie(self, user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return "{}={}".format(settings.SESSION_COOKIE_NAME, session.session_key)
+
+    def request(self, handler, path, params, cookie):
+        environ = RequestFactory().get(path, params, HTTP_HOST="localhost", HTTP_COOKIE=cookie).environ
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: None)
+        body = b"".join(response)
+        # like a WSGI server, close() fires request_finished and releases the connection.
+        response.close()
+        elapsed = time.perf_counter() - start
+        if not body:
+            raise CommandError("{} returned an empty response".format(path))
+        return elapsed
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(type="0").order_by("id").first() or User.objects.order_by("id").first()
+        post = Post.objects.order_by("id").first()
+        if user is None or post is None:
+            raise CommandError("Benchmark needs at least one user and one post.")
+        cookie = self.login_cookie(user)
+        handler = WSGIHandler()
+        path = reverse("post-detail")
+        params = {"post_id": post.id}
+        settings_dict = connections["default"].settings_dict
+        original = {key: settings_dict.get(key) for key in ("CONN_MAX_AGE", "POOL_SIZE")}
+        self.stdout.write("{} requests of {} on {}".format(
+            options["requests"], path, settings_dict["ENGINE"]))
+        try:
+            for label, values in MODES:
+                connections["default"].close()
+                clear_pools()
+                settings_dict.update(values)
+                for i in range(options["warmup"]):
+                    self.request(handler, path, params, cookie)
+                timings = sorted(self.request(handler, path, params, cookie) * 1000
+                                 for i in range(options["requests"]))
+                self.stdout.write("{:<28} mean {:7.2f} ms  p50 {:7.2f} ms  p95 {:7.2f} ms".format(
+                    label, statistics.mean(timings), timings[len(timings) // 2],
+                    timings[int(len(timings) * 0.95) - 1]))
+        finally:
+            connections["default"].close()
+            clear_pools()
+            settings_dict.update(original)
@@ -0,0 +1,102 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+ENGINES = [
+    ("database", "django.contrib.sessions.backends.db"),
+    ("cached database", "django.contrib.sessions.backends.cached_db"),
+    ("cached, write on change", "posts.sessions"),
+]
+
+
+class SessionQueries:
+    """execute wrapper counting SQL statements on the session table."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if "django_session" in sql:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """
+    measure the session overhead of a logged in request to the post detail
+    view with the database, cached database and posts.sessions engines, once
+    as is and once with SESSION_SAVE_EVERY_REQUEST, which saves an unchanged
+    session on every request.
+    Requests run through the WSGI handler with session and auth middleware.
+    Param --requests timed requests per mode, --warmup untimed requests per mode.
+    """
+    help = "Benchmark per request session latency and queries of the session engines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--warmup", type=int, default=20)
+
+    def login_cookie(self, engine, user):
+        session = import_module(engine).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session["login_username"] = user.name
+        session.save()
+        return "{}={}".format(settings.SESSION_COOKIE_NAME, session.session_key)
+
+    def request(self, handler, path, params, cookie):
+        """
+        send one request.
+        Return (seconds, session table queries).
+        """
+        environ = RequestFactory().get(path, params, HTTP_HOST="localhost", HTTP_COOKIE=cookie).environ
+        queries = SessionQueries()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = handler(environ, lambda status, headers: None)
+            body = b"".join(response)
+            response.close()
+        elapsed = time.perf_counter() - start
+        if not body:
+            raise CommandError("{} returned an empty response".format(path))
+        return elapsed, queries.count
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be at least 1.")
+        user = User.alive.filter(type="0").order_by("id").first() or User.alive.order_by("id").first()
+        post = Post.alive.order_by("id").first()
+        if user is None or post is None:
+            raise CommandError("Benchmark needs at least one user and one post.")
+        path = reverse("post-detail")
+        params = {"post_id": post.id}
+        self.stdout.write("{} requests of {} on {}".format(
+            options["requests"], path, connection.settings_dict["ENGINE"]))
+        for save_every_request in (False, True):
+            for label, engine in ENGINES:
+                with override_settings(SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=save_every_request):
+                    # SessionMiddleware picks the engine up when the handler is built.
+                    handler = WSGIHandler()
+                    cookie = self.login_cookie(engine, user)
+                    for i in range(options["warmup"]):
+                        self.request(handler, path, params, cookie)
+                    results = [self.request(handler, path, params, cookie) for i in range(options["requests"])]
+                timings = sorted(elapsed * 1000 for elapsed, queries in results)
+                self.stdout.write("{:<24} {:<19} mean {:7.2f} ms  p50 {:7.2f} ms  p95 {:7.2f} ms  "
+                                  "{:4.2f} session queries".format(
+                                      label, "save every request" if save_every_request else "",
+                                      statistics.mean(timings), timings[len(timings) // 2],
+                                      timings[max(int(len(timings) * 0.95) - 1, 0)],
+                                      statistics.mean(queries for elapsed, queries in results)))
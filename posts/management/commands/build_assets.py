@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.assets import build_bundles
+
+
+class Command(BaseCommand):
+    """
+    concatenate and minify settings.ASSET_BUNDLES into settings.ASSET_BUNDLES_OUTPUT.
+    Run collectstatic afterwards to fingerprint the bundles.
+    """
+    help = "Build the minified css and js bundles of every page."
+
+    def handle(self, *args, **options):
+        written = build_bundles(settings.ASSET_BUNDLES_OUTPUT)
+        for path in written:
+            self.stdout.write(path)
+        self.stdout.write(self.style.SUCCESS("Built {} bundles.".format(len(written))))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.sessions import SessionStore
+
+
+class Command(BaseCommand):
+    """
+    delete expired rows of the session table in batches, to be run from cron.
+    Cached copies expire in the cache on their own.
+    Param --batch-size rows per delete, --sleep seconds between batches.
+    """
+    help = "Delete expired sessions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=getattr(settings, "SESSION_PURGE_BATCH_SIZE", 1000))
+        parser.add_argument("--sleep", type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        deleted = SessionStore.clear_expired(batch_size=options["batch_size"], pause=options["sleep"])
+        self.stdout.write("Deleted {} expired sessions.".format(deleted))
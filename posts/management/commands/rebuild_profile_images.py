@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.images import ProfileImageError, process_profile, profile_name
+from posts.models import User
+
+
+class Command(BaseCommand):
+    """
+    create profile derivatives for images uploaded before they existed.
+    """
+    help = "Re-encode stored profile images and build their resized derivatives."
+
+    def handle(self, *args, **options):
+        names = {profile_name(profile) for profile in User.objects.values_list("profile", flat=True)}
+        total = 0
+        for name in sorted(names):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if not os.path.exists(path):
+                continue
+            try:
+                process_profile(path, name)
+            except ProfileImageError as error:
+                self.stderr.write("{}: {}".format(name, error))
+                continue
+            total += 1
+        self.stdout.write(self.style.SUCCESS("Processed {} profile images.".format(total)))
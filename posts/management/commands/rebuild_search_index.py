@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post, PostSearchTerm
+from posts.search import index_posts
+
+
+class Command(BaseCommand):
+    """
+    rebuild post keyword search index from post table.
+    Param --batch-size posts indexed per batch.
+    """
+    help = "Rebuild the inverted index used by post keyword search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        PostSearchTerm.objects.all().delete()
+        posts = Post.alive.only("id", "title", "description", "is_deleted").order_by("id")
+        batch = []
+        total = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) >= batch_size:
+                index_posts(batch)
+                total += len(batch)
+                batch = []
+        index_posts(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS("Indexed {} posts.".format(total)))
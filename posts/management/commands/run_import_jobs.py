@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.import_jobs import requeue_stale_jobs, run_job_in_thread
+from posts.models import CsvImportJob
+
+
+class Command(BaseCommand):
+    """
+    worker process for csv import jobs left pending by the "queue" backend, or
+    by a restarted web process of the "thread" backend. Running jobs without a
+    heartbeat for --timeout seconds are requeued first, their process died.
+    Param --workers concurrent imports, --poll seconds between scans, --once exit
+    when idle, --timeout seconds, default settings.CSV_IMPORT_JOB_TIMEOUT.
+    """
+    help = "Process pending csv import jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--poll", type=float, default=2.0)
+        parser.add_argument("--once", action="store_true",
+                            help="Process the pending jobs and exit.")
+        parser.add_argument("--timeout", type=int, default=None,
+                            help="Requeue running jobs without a heartbeat for this many seconds.")
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                requeued = requeue_stale_jobs(options["timeout"])
+                if requeued:
+                    self.stdout.write("Requeued {} stale jobs.".format(requeued))
+                pending = list(CsvImportJob.objects.filter(
+                    status=CsvImportJob.STATUS_PENDING).order_by("id").values_list("id", flat=True))
+                # run_job claims each job atomically, so several workers can share the queue.
+                list(executor.map(run_job_in_thread, pending))
+                if pending:
+                    self.stdout.write("Processed {} jobs.".format(len(pending)))
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
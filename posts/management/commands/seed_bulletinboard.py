@@ -0,0 +1,142 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import list_cache
+from posts.csv_import import DESCRIPTION_MAX_LENGTH
+from posts.models import Post, User
+from posts.search import index_posts
+
+WORDS = (
+    "board notice meeting project release report schedule update team office "
+    "holiday training review budget design server database backup security "
+    "network customer support sales market event party lunch travel policy "
+    "deadline feedback question answer issue change plan summary welcome"
+).split()
+# share of posts written by the busiest tenth of the users.
+ACTIVE_USER_SHARE = 0.6
+HISTORY_DAYS = 730
+
+
+class Command(BaseCommand):
+    """
+    fill the database with synthetic users and posts for benchmarks.
+    Roles, soft deleted rows, post authors and description lengths follow
+    configurable, realistic distributions; the same --seed gives the same data.
+    Param --users, --posts row counts, --admin-ratio share of admin users,
+    --deleted-ratio share of soft deleted rows, --description-length median
+    description length, --password password of every seeded user.
+    """
+    help = "Generate synthetic users and posts for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--admin-ratio", type=float, default=0.05)
+        parser.add_argument("--deleted-ratio", type=float, default=0.1)
+        parser.add_argument("--description-length", type=int, default=80)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def created_date(self, rng, today):
+        # recent rows are more common than old ones.
+        return today - datetime.timedelta(days=min(int(rng.expovariate(1 / 120)), HISTORY_DAYS))
+
+    def description(self, rng, median_length):
+        length = min(max(int(rng.lognormvariate(0, 0.8) * median_length), 1), DESCRIPTION_MAX_LENGTH)
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(rng.choice(WORDS))
+        return " ".join(words)[:length].strip() or rng.choice(WORDS)
+
+    def seed_users(self, rng, options, today):
+        start = User.all_with_deleted.aggregate(last_id=Max("id"))["last_id"] or 0
+        # hashing is slow on purpose, every seeded user shares one hash.
+        password = make_password(options["password"])
+        users = []
+        for i in range(start + 1, start + options["users"] + 1):
+            created_at = self.created_date(rng, today)
+            user = User(
+                name="seed user {}".format(i),
+                email="seeduser{}@example.com".format(i),
+                password=password,
+                type="0" if rng.random() < options["admin_ratio"] else "1",
+                phone="09{:09d}".format(rng.randrange(10 ** 9)),
+                address=rng.choice(("Yangon", "Mandalay", "Naypyidaw", "Bago")),
+                created_at=created_at,
+                updated_at=created_at
+            )
+            if rng.random() < options["deleted_ratio"]:
+                user.is_deleted = True
+                user.deleted_at = today
+            users.append(user)
+        User.objects.bulk_create(users, batch_size=options["batch_size"])
+        # bulk_create does not return primary keys on MySQL, read the new rows back.
+        users = list(User.all_with_deleted.filter(id__gt=start).order_by("id"))
+        self.assign_creators(rng, options, users)
+        return [(user.id, user.type) for user in users]
+
+    def assign_creators(self, rng, options, users):
+        # user lists are scoped by created_user_id, spread the seeded users
+        # over the seeded admins instead of leaving them all to user 1.
+        admins = [user.id for user in users if user.type == "0"] or list(
+            User.alive.filter(type="0").values_list("id", flat=True)) or [1]
+        for user in users:
+            user.created_user_id = user.updated_user_id = rng.choice(admins)
+            if user.is_deleted:
+                user.deleted_user_id = rng.choice(admins)
+        User.all_with_deleted.bulk_update(
+            users, ["created_user_id", "updated_user_id", "deleted_user_id"], batch_size=options["batch_size"])
+
+    def seed_posts(self, rng, options, today, users):
+        admins = [user_id for user_id, user_type in users if user_type == "0"] or [users[0][0]]
+        # the users created first are the long standing, active authors.
+        active = users[:max(len(users) // 10, 1)]
+        start = Post.all_with_deleted.aggregate(last_id=Max("id"))["last_id"] or 0
+        batch = []
+        for i in range(start + 1, start + options["posts"] + 1):
+            user_id = rng.choice(active if rng.random() < ACTIVE_USER_SHARE else users)[0]
+            created_at = self.created_date(rng, today)
+            post = Post(
+                title="{} {} {}".format(rng.choice(WORDS), rng.choice(WORDS), i).capitalize(),
+                description=self.description(rng, options["description_length"]),
+                status=0 if rng.random() < 0.2 else 1,
+                user_id=user_id,
+                created_user_id=user_id,
+                updated_user_id=user_id,
+                created_at=created_at,
+                updated_at=created_at
+            )
+            if rng.random() < options["deleted_ratio"]:
+                post.is_deleted = True
+                post.deleted_user_id = rng.choice(admins)
+                post.deleted_at = today
+            batch.append(post)
+            if len(batch) >= options["batch_size"]:
+                self.insert_posts(batch)
+                batch = []
+        self.insert_posts(batch)
+
+    def insert_posts(self, batch):
+        if not batch:
+            return
+        last_id = Post.all_with_deleted.aggregate(last_id=Max("id"))["last_id"] or 0
+        Post.objects.bulk_create(batch)
+        index_posts(Post.objects.filter(id__gt=last_id).only("id", "title", "description", "is_deleted"))
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["posts"] < 0:
+            raise CommandError("--users must be at least 1 and --posts at least 0.")
+        rng = random.Random(options["seed"])
+        today = timezone.now().date()
+        users = self.seed_users(rng, options, today)
+        self.seed_posts(rng, options, today, users)
+        list_cache.invalidate_posts()
+        list_cache.invalidate_users()
+        self.stdout.write(self.style.SUCCESS("Seeded {} users and {} posts.".format(
+            options["users"], options["posts"])))
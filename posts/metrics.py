@@ -0,0 +1,208 @@
+import contextvars
+import os
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+from posts import async_db
+from posts.async_db import AsyncCapableMiddleware
+from posts.query_budget import QueryStats, observe_stream
+
+# With PROMETHEUS_MULTIPROC_DIR set before start up, prometheus_client keeps
+# every value in per process mmap files of that directory and /metrics sums
+# them, so all WSGI workers of a node report together.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    "bulletinboard_request_latency_seconds", "Request latency by view.",
+    ["view", "method"], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter(
+    "bulletinboard_requests_total", "Requests by view and status code.",
+    ["view", "method", "status"])
+DB_QUERIES = Histogram(
+    "bulletinboard_db_queries", "SQL queries per request by view.",
+    ["view"], buckets=QUERY_BUCKETS)
+DB_TIME = Histogram(
+    "bulletinboard_db_seconds", "Database time per request by view.",
+    ["view"], buckets=LATENCY_BUCKETS)
+TEMPLATE_TIME = Histogram(
+    "bulletinboard_template_seconds", "Template render time per request by view.",
+    ["view"], buckets=LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    "bulletinboard_response_bytes", "Response body size by view, streamed responses without length excluded.",
+    ["view"], buckets=SIZE_BUCKETS)
+EVENTS = Counter(
+    "bulletinboard_events_total", "Business events of the write paths.",
+    ["event"])
+CSV_IMPORT_ROWS = Counter(
+    "bulletinboard_csv_import_rows_total", "Posts imported from csv uploads.",
+    ["mode"])
+
+# template render time of the request running in this thread or task.
+template_seconds = contextvars.ContextVar("template_seconds", default=None)
+
+
+def is_enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+def record_event(event):
+    """
+    count one business event, e.g. "post_created".
+    Param event event name.
+    """
+    if is_enabled():
+        EVENTS.labels(event=event).inc()
+
+
+def record_csv_import(rows, mode):
+    """
+    count imported csv rows.
+    Param rows imported row count, mode "request" or "job".
+    """
+    if is_enabled():
+        CSV_IMPORT_ROWS.labels(mode=mode).inc(rows)
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.view_name or "unnamed"
+
+
+def response_size(response):
+    """
+    body size of a response.
+    Return bytes, None for a streamed response without Content-Length.
+    """
+    if response.has_header("Content-Length"):
+        return int(response["Content-Length"])
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    record latency, status, SQL query count and time, template render time
+    and response size of every request, labelled by url name.
+    """
+
+    def call(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+        stats = QueryStats()
+        token = template_seconds.set([0.0])
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+            elapsed = time.perf_counter() - start
+            rendering = template_seconds.get()[0]
+        finally:
+            template_seconds.reset(token)
+        return self.record(request, response, stats, elapsed, rendering,
+                           lambda: connection.execute_wrapper(stats))
+
+    async def acall(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+        stats = QueryStats()
+        token = template_seconds.set([0.0])
+        start = time.perf_counter()
+        try:
+            with async_db.execute_wrapper(stats):
+                response = await self.get_response(request)
+            elapsed = time.perf_counter() - start
+            rendering = template_seconds.get()[0]
+        finally:
+            template_seconds.reset(token)
+        return self.record(request, response, stats, elapsed, rendering,
+                           lambda: async_db.execute_wrapper(stats))
+
+    def record(self, request, response, stats, elapsed, rendering, wrap):
+        """
+        record the request, the queries of a streamed body when it is closed.
+        Param wrap callable returning the execute wrapper context of stats.
+        """
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view=view, method=request.method).observe(elapsed)
+        REQUESTS.labels(view=view, method=request.method, status=str(response.status_code)).inc()
+        TEMPLATE_TIME.labels(view=view).observe(rendering)
+        size = response_size(response)
+        if size is not None:
+            RESPONSE_SIZE.labels(view=view).observe(size)
+        if not observe_stream(response, wrap, lambda: self.record_queries(view, stats)):
+            self.record_queries(view, stats)
+        return response
+
+    def record_queries(self, view, stats):
+        DB_QUERIES.labels(view=view).observe(stats.count)
+        DB_TIME.labels(view=view).observe(stats.db_time)
+
+
+class Template(django_backend.Template):
+    """django template adding its render time to the current request."""
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            total = template_seconds.get()
+            if total is not None:
+                total[0] += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    django template backend timing top level renders for MetricsMiddleware.
+    Included and extended templates are part of the top level render.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def get_registry():
+    """
+    registry to expose, merging every worker process in multiprocess mode.
+    Return CollectorRegistry.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ or "prometheus_multiproc_dir" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    expose metrics in Prometheus text format.
+    Requires "Authorization: Bearer <METRICS_TOKEN>"; without a METRICS_TOKEN
+    the endpoint only exists when DEBUG is on.
+    Return metrics text.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token and not settings.DEBUG:
+        raise Http404("Metrics are not exposed")
+    if token and not constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), "Bearer " + token):
+        return HttpResponseForbidden("Metrics token required")
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.10 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_csvimportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['deleted_user_id', 'deleted_at', 'id'], name='post_live_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_user_id', 'deleted_user_id', 'deleted_at', 'id'], name='post_creator_live_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['deleted_user_id', 'deleted_at', 'id'], name='user_live_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_user_id', 'deleted_user_id', 'deleted_at', 'id'], name='user_creator_live_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['deleted_user_id', 'deleted_at', 'created_at'], name='user_live_created_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.10 on 2026-10-18 10:52
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_deleted(apps, schema_editor):
+    """set is_deleted of rows soft deleted before the flag existed."""
+    deleted = Q(deleted_user_id__isnull=False) | Q(deleted_at__isnull=False)
+    for model_name in ("Post", "User"):
+        apps.get_model("posts", model_name).objects.filter(deleted).update(is_deleted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_live_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_creator_live_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_live_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_creator_live_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_live_created_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_deleted, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_deleted', 'id'], name='post_alive_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_user_id', 'is_deleted', 'id'], name='post_creator_alive_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_deleted', 'id'], name='user_alive_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_user_id', 'is_deleted', 'id'], name='user_creator_alive_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_deleted', 'created_at'], name='user_alive_created_idx'),
+        ),
+    ]
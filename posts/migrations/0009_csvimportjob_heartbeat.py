@@ -0,0 +1,18 @@
+# Generated by Django 3.2.10 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
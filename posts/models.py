@@ -1,11 +1,59 @@
 from email.policy import default
 from django.utils import timezone
 from django.db import models
+from django.db.models import Value
 from django.urls import reverse
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser
 )
 
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet of models soft deleted through their is_deleted flag."""
+
+    # a bare boolean compiles to "NOT is_deleted" on sqlite, which cannot seek
+    # the index, Value() keeps the "is_deleted = 0" comparison on every backend.
+    def alive(self):
+        return self.filter(is_deleted=Value(False))
+
+    def deleted(self):
+        return self.filter(is_deleted=Value(True))
+
+
+class AliveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager returning rows which are not soft deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
+
+class SoftDeleteModel(models.Model):
+    """
+    abstract model for soft deleted rows.
+    deleted_user_id and deleted_at record who deleted a row and when,
+    is_deleted is the one indexed column live row queries filter on.
+    """
+    deleted_user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateField(null=True, blank=True)
+    is_deleted = models.BooleanField(default=False)
+
+    objects = models.Manager()
+    alive = AliveManager()
+    all_with_deleted = models.Manager.from_queryset(SoftDeleteQuerySet)()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self, user_id):
+        """
+        mark the row deleted and save it.
+        Param user_id id of the deleting user.
+        """
+        self.deleted_user_id = user_id
+        self.deleted_at = timezone.now()
+        self.is_deleted = True
+        self.save(update_fields=["deleted_user_id", "deleted_at", "is_deleted"])
+
+
 class UserManager(BaseUserManager):
     """
     Creates and saves a User with the given email and password.
@@ -49,7 +97,7 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
-class User(AbstractBaseUser):
+class User(SoftDeleteModel, AbstractBaseUser):
     """Model representing User."""
     username = None
     name =models.CharField(max_length=255)
@@ -77,15 +125,22 @@ class User(AbstractBaseUser):
     dob = models.DateField(null=True, blank=True)
     created_user_id = models.IntegerField(default=1)
     updated_user_id = models.IntegerField(default=1)
-    deleted_user_id = models.IntegerField(null=True, blank=True)
     created_at = models.DateField(default=timezone.now)
     updated_at = models.DateField(default=timezone.now)
-    deleted_at = models.DateField(null=True, blank=True)
 
     is_staff = models.BooleanField(default=True)
     is_superuser = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        # list queries filter live rows, optionally by creator or created_at
+        # range, ordered by id.
+        indexes = [
+            models.Index(fields=["is_deleted", "id"], name="user_alive_id_idx"),
+            models.Index(fields=["created_user_id", "is_deleted", "id"], name="user_creator_alive_id_idx"),
+            models.Index(fields=["is_deleted", "created_at"], name="user_alive_created_idx"),
+        ]
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = [] # Email & Password are required by default.
     objects = UserManager()
@@ -104,7 +159,7 @@ class User(AbstractBaseUser):
         # Simplest possible answer: Yes, always
         return True
 
-class Post(models.Model):
+class Post(SoftDeleteModel):
     """Model representing Post."""
     title = models.CharField(max_length=255)
     description = models.CharField(max_length=255)
@@ -112,14 +167,76 @@ class Post(models.Model):
     created_user_id = models.IntegerField(default=1)
     updated_user_id = models.IntegerField(default=1)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    deleted_user_id = models.IntegerField(null=True, blank=True)
     created_at = models.DateField(default=timezone.now)
     updated_at = models.DateField(default=timezone.now)
-    deleted_at = models.DateField(null=True, blank=True)
+
+    class Meta:
+        # post list filters live rows, optionally by creator, ordered by id.
+        indexes = [
+            models.Index(fields=["is_deleted", "id"], name="post_alive_id_idx"),
+            models.Index(fields=["created_user_id", "is_deleted", "id"], name="post_creator_alive_id_idx"),
+        ]
 
     """String for representing the Model object."""
     def __str__(self):
         return self.title
     """Returns the url to access post list page."""
     def get_absolute_url(self):
-        return reverse("index")
\ No newline at end of file
+        return reverse("index")
+
+class PostSearchTerm(models.Model):
+    """Model representing one inverted index entry of post keyword search."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="search_terms")
+    weight = models.IntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "post"], name="posts_search_term_idx"),
+        ]
+
+    """String for representing the Model object."""
+    def __str__(self):
+        return self.term
+
+
+class CsvImportJob(models.Model):
+    """Model representing a background csv post import."""
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCESS = "success"
+    STATUS_FAILED = "failed"
+    STATUS = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCESS, "Success"),
+        (STATUS_FAILED, "Failed")
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="csv_import_jobs")
+    file_path = models.CharField(max_length=255)
+    file_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default=STATUS_PENDING, db_index=True)
+    rows_processed = models.IntegerField(default=0)
+    error_message = models.CharField(max_length=255, blank=True)
+    error_detail = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # written with every progress update, a stale one means the worker died.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    """String for representing the Model object."""
+    def __str__(self):
+        return "{} ({})".format(self.file_name, self.status)
+
+    def is_finished(self):
+        """Returns True when the job will not change any more."""
+        return self.status in (self.STATUS_SUCCESS, self.STATUS_FAILED)
+
+    def seconds(self):
+        """Returns running time of the job in seconds."""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
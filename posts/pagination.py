@@ -0,0 +1,127 @@
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = "posts.pagination.cursor"
+
+
+class CursorPage:
+    """
+    one page of a keyset paginated queryset.
+    Param object_list rows of the page, next_token and previous_token opaque cursors.
+    """
+
+    def __init__(self, object_list, next_token=None, previous_token=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+
+class CursorPaginator:
+    """
+    keyset (cursor) paginator which never counts the whole table.
+    Param queryset filtered rows, per_page page size, ordering unique key fields.
+    """
+
+    def __init__(self, queryset, per_page, ordering=("id",)):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        if self.ordering[-1] != "id":
+            # the primary key breaks ties so the key is always unique.
+            self.ordering += ("id",)
+
+    def encode(self, obj, direction):
+        """
+        build opaque cursor token for a row.
+        Param obj boundary row, direction "n" for next or "p" for previous.
+        Return signed token string.
+        """
+        values = []
+        for name in self.ordering:
+            field = self.queryset.model._meta.get_field(name)
+            values.append(field.value_to_string(obj))
+        return signing.dumps({"k": values, "d": direction}, salt=CURSOR_SALT, compress=True)
+
+    def decode(self, token):
+        """
+        read cursor token.
+        Param token opaque cursor from request.
+        Return (key values, direction) or None for a missing or tampered token.
+        """
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            raw_values = data["k"]
+            direction = data["d"]
+            if len(raw_values) != len(self.ordering) or direction not in ("n", "p"):
+                return None
+            values = [
+                self.queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.ordering, raw_values)
+            ]
+        except Exception:
+            return None
+        return values, direction
+
+    def _seek(self, values, direction):
+        """
+        build row-value comparison (a, b) > (x, y) for the ordering keys.
+        Param values cursor key values, direction "n" or "p".
+        Return Q object.
+        """
+        lookup = "gt" if direction == "n" else "lt"
+        query = Q()
+        for i, name in enumerate(self.ordering):
+            branch = Q(**{"{}__{}".format(name, lookup): values[i]})
+            for prev_name, prev_value in zip(self.ordering[:i], values[:i]):
+                branch &= Q(**{prev_name: prev_value})
+            query |= branch
+        return query
+
+    def get_page(self, token=None):
+        """
+        fetch the page after or before the cursor.
+        Param token opaque cursor, None for the first page.
+        Return CursorPage.
+        """
+        cursor = self.decode(token)
+        ascending = list(self.ordering)
+        descending = ["-" + name for name in self.ordering]
+        if cursor is None:
+            rows = list(self.queryset.order_by(*ascending)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_next, has_previous = has_more, False
+        else:
+            values, direction = cursor
+            seek = self._seek(values, direction)
+            if direction == "n":
+                rows = list(self.queryset.filter(seek).order_by(*ascending)[:self.per_page + 1])
+                has_more = len(rows) > self.per_page
+                rows = rows[:self.per_page]
+                has_next, has_previous = has_more, True
+            else:
+                rows = list(self.queryset.filter(seek).order_by(*descending)[:self.per_page + 1])
+                has_more = len(rows) > self.per_page
+                rows = rows[:self.per_page]
+                rows.reverse()
+                has_next, has_previous = True, has_more
+        next_token = self.encode(rows[-1], "n") if rows and has_next else None
+        previous_token = self.encode(rows[0], "p") if rows and has_previous else None
+        return CursorPage(rows, next_token, previous_token)
@@ -0,0 +1,200 @@
+import contextlib
+import cProfile
+import datetime
+import os
+import pstats
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.utils import timezone
+
+from posts import async_db
+from posts.async_db import AsyncCapableMiddleware
+from posts.storage import atomic_path
+
+PROFILE_NAME_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9]{6}-[a-z0-9_-]{1,60}-[0-9]+ms\.prof$")
+# cProfile hooks the interpreter, one profiled request at a time per process.
+profile_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, "REQUEST_PROFILING_ENABLED", True)
+
+
+def profile_dir():
+    return getattr(settings, "REQUEST_PROFILE_DIR", os.path.join(settings.BASE_DIR, "request_profiles"))
+
+
+def is_requested(request):
+    """
+    check the request asks to be profiled by header or query flag.
+    Reads no session or user, so unprofiled requests cost two lookups.
+    Param request http request.
+    Return True when requested.
+    """
+    header = getattr(settings, "REQUEST_PROFILE_HEADER", "HTTP_X_PROFILE")
+    param = getattr(settings, "REQUEST_PROFILE_PARAM", "_profile")
+    return request.META.get(header) == "1" or request.GET.get(param) == "1"
+
+
+def can_profile(user):
+    """
+    check the user may profile requests and read profiles.
+    Param user request user.
+    Return True for active staff admins.
+    """
+    return user.is_authenticated and user.is_active and user.is_staff and user.type == "0"
+
+
+def profile_name(request, elapsed):
+    """
+    file name of a captured profile, sorting by capture time.
+    Param request http request, elapsed request seconds.
+    Return file name.
+    """
+    match = getattr(request, "resolver_match", None)
+    label = match.url_name if match and match.url_name else request.path
+    label = re.sub(r"[^a-z0-9_-]+", "-", label.lower()).strip("-")[:60] or "root"
+    return "{}-{}-{}ms.prof".format(
+        timezone.now().strftime("%Y%m%d-%H%M%S-%f"), label, int(elapsed * 1000))
+
+
+def list_profiles():
+    """
+    captured profiles, newest first.
+    Return list of dicts with name, size and modified time.
+    """
+    try:
+        names = [name for name in os.listdir(profile_dir()) if PROFILE_NAME_RE.match(name)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(names, reverse=True):
+        try:
+            file_stat = os.stat(os.path.join(profile_dir(), name))
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            "name": name,
+            "size": file_stat.st_size,
+            "modified": datetime.datetime.fromtimestamp(file_stat.st_mtime, tz=datetime.timezone.utc),
+        })
+    return profiles
+
+
+def rotate():
+    """remove the oldest profiles beyond settings.REQUEST_PROFILE_KEEP."""
+    keep = getattr(settings, "REQUEST_PROFILE_KEEP", 50)
+    for profile in list_profiles()[keep:]:
+        try:
+            os.unlink(os.path.join(profile_dir(), profile["name"]))
+        except FileNotFoundError:
+            pass
+
+
+def save_profile(profilers, name):
+    """
+    write a profile in pstats format, readable by pstats, snakeviz or gprof2dot.
+    Param profilers stopped cProfile.Profile list merged into one file, name file name.
+    """
+    with atomic_path(os.path.join(profile_dir(), name)) as temp_path:
+        pstats.Stats(*profilers).dump_stats(temp_path)
+    rotate()
+
+
+@contextlib.contextmanager
+def profiled(profilers):
+    """
+    profile the block on the current thread.
+    Param profilers list the stopped profiler is appended to.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    capture a cProfile profile of one request, view, ORM and template
+    rendering included, when an admin sends "X-Profile: 1" or "?_profile=1".
+    The profile name is returned in the X-Profile-Name header.
+    Under ASGI the profile holds the work async views run on the async_db
+    executor; the event loop thread is shared with other requests.
+    """
+
+    def call(self, request):
+        if not is_enabled() or not is_requested(request) or not can_profile(request.user):
+            return self.get_response(request)
+        if not profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        profilers = []
+        try:
+            start = time.perf_counter()
+            try:
+                with profiled(profilers):
+                    response = self.get_response(request)
+            finally:
+                elapsed = time.perf_counter() - start
+        finally:
+            profile_lock.release()
+        return self.save(request, response, profilers, elapsed)
+
+    async def acall(self, request):
+        if not is_enabled() or not is_requested(request):
+            return await self.get_response(request)
+        if not await async_db.run(can_profile, request.user) or not profile_lock.acquire(blocking=False):
+            return await self.get_response(request)
+        profilers = []
+        try:
+            start = time.perf_counter()
+            try:
+                with async_db.call_hook(lambda: profiled(profilers)):
+                    response = await self.get_response(request)
+            finally:
+                elapsed = time.perf_counter() - start
+        finally:
+            profile_lock.release()
+        return self.save(request, response, profilers, elapsed)
+
+    def save(self, request, response, profilers, elapsed):
+        name = profile_name(request, elapsed)
+        save_profile(profilers, name)
+        response["X-Profile-Name"] = name
+        return response
+
+
+def profile_list(request):
+    """
+    admin page listing captured request profiles.
+    Return profile list page.
+    """
+    if not can_profile(request.user):
+        raise Http404("Page not found")
+    context = dict(admin.site.each_context(request), title="Request profiles",
+                   profiles=list_profiles(), enabled=is_enabled())
+    return render(request, "admin/request_profiles.html", context)
+
+
+def profile_download(request, name):
+    """
+    download one captured profile.
+    Param name profile file name.
+    Return file attachment.
+    """
+    if not can_profile(request.user) or not PROFILE_NAME_RE.match(name):
+        raise Http404("Profile not found")
+    try:
+        profile_file = open(os.path.join(profile_dir(), name), "rb")
+    except FileNotFoundError:
+        raise Http404("Profile not found")
+    return FileResponse(profile_file, as_attachment=True, filename=name,
+                        content_type="application/octet-stream")
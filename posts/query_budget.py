@@ -0,0 +1,171 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from posts import async_db
+from posts.async_db import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view runs more SQL than its budget allows."""
+
+
+class QueryStats:
+    """
+    count queries and total database time of one request.
+    Use as connection.execute_wrapper.
+    Param keep_sql also keep every SQL string, for debugging and tests.
+    """
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.db_time = 0.0
+        self.keep_sql = keep_sql
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            if self.keep_sql:
+                self.sql.append(sql)
+
+    @property
+    def db_time_ms(self):
+        return self.db_time * 1000
+
+
+class ObservedStream:
+    """
+    streaming response body run inside wrap() chunk by chunk, so queries of
+    a lazily read body are counted, calling on_close once when the body is
+    exhausted or the response closed.
+    Param content body iterator, wrap callable returning a context manager,
+    on_close callable.
+    """
+
+    def __init__(self, content, wrap, on_close):
+        self.content = iter(content)
+        self.wrap = wrap
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            with self.wrap():
+                return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        close = getattr(self.content, "close", None)
+        if close is not None:
+            close()
+        self.on_close()
+
+
+def observe_stream(response, wrap, on_close):
+    """
+    wrap the body of a streaming response in an ObservedStream. File
+    responses are left alone, they read no database and keep sendfile.
+    Param response view response, wrap and on_close see ObservedStream.
+    Return True when the body is observed, on_close then runs at its end.
+    """
+    if not response.streaming or getattr(response, "file_to_stream", None) is not None:
+        return False
+    response.streaming_content = ObservedStream(response.streaming_content, wrap, on_close)
+    return True
+
+
+def get_budget(url_name):
+    """
+    read budget of a view from settings.QUERY_BUDGETS.
+    Param url_name resolved url name.
+    Return dict with "queries" and optional "db_ms", or None.
+    """
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    budget = budgets.get(url_name, budgets.get("default"))
+    if isinstance(budget, int):
+        budget = {"queries": budget}
+    return budget
+
+
+def check_budget(url_name, stats, extra=0):
+    """
+    compare request stats with the view budget.
+    Param url_name resolved url name, stats QueryStats, extra queries the
+    view allowed itself on top, e.g. one per chunk of a streamed body.
+    Return list of violation messages.
+    """
+    budget = get_budget(url_name)
+    if not budget:
+        return []
+    errors = []
+    if budget.get("queries") is not None and stats.count > budget["queries"] + extra:
+        errors.append("{} ran {} queries, budget is {}".format(
+            url_name, stats.count, budget["queries"] + extra))
+    if budget.get("db_ms") is not None and stats.db_time_ms > budget["db_ms"]:
+        errors.append("{} spent {:.1f} ms in database, budget is {} ms".format(
+            url_name, stats.db_time_ms, budget["db_ms"]))
+    return errors
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """
+    count SQL queries and database time per request and log or raise
+    when the view budget in settings.QUERY_BUDGETS is exceeded.
+    Only safe methods raise, the writes of others are committed by then.
+    A view sets request.query_budget_exempt for work growing with its input,
+    or adds allowed queries to request.query_budget_extra.
+    """
+
+    def call(self, request):
+        stats = QueryStats(getattr(settings, "QUERY_STATS_KEEP_SQL", False))
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self.check(request, response, stats, lambda: connection.execute_wrapper(stats))
+
+    async def acall(self, request):
+        stats = QueryStats(getattr(settings, "QUERY_STATS_KEEP_SQL", False))
+        with async_db.execute_wrapper(stats):
+            response = await self.get_response(request)
+        return self.check(request, response, stats, lambda: async_db.execute_wrapper(stats))
+
+    def check(self, request, response, stats, wrap):
+        request.query_stats = stats
+        if observe_stream(response, wrap, lambda: self.check_stats(request, stats, False)):
+            return response
+        self.check_stats(request, stats, getattr(settings, "QUERY_BUDGET_RAISE", False))
+        return response
+
+    def check_stats(self, request, stats, raise_errors):
+        """
+        log or raise the budget violations of a finished request. A streamed
+        body is checked when it is closed, its status is sent by then.
+        Param raise_errors raise QueryBudgetExceeded for safe methods.
+        """
+        match = getattr(request, "resolver_match", None)
+        if match is None or not match.url_name or getattr(request, "query_budget_exempt", False):
+            return
+        errors = check_budget(match.url_name, stats, getattr(request, "query_budget_extra", 0))
+        if errors:
+            if raise_errors and request.method in SAFE_METHODS:
+                raise QueryBudgetExceeded("; ".join(errors))
+            for error in errors:
+                logger.warning(error)
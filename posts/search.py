@@ -0,0 +1,112 @@
+import re
+
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from posts.models import PostSearchTerm
+
+TERM_MAX_LENGTH = 64
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """
+    split text to lower case search terms.
+    Param text title, description or keyword.
+    Return list of terms.
+    """
+    if not text:
+        return []
+    return [word[:TERM_MAX_LENGTH] for word in WORD_RE.findall(str(text).lower())]
+
+
+def build_terms(post):
+    """
+    build weighted inverted index rows for one post.
+    Param post saved Post object.
+    Return list of unsaved PostSearchTerm.
+    """
+    weights = {}
+    for term in tokenize(post.title):
+        weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+    for term in tokenize(post.description):
+        weights[term] = weights.get(term, 0) + DESCRIPTION_WEIGHT
+    return [PostSearchTerm(term=term, post_id=post.id, weight=weight)
+            for term, weight in weights.items()]
+
+
+def index_posts(posts):
+    """
+    replace search terms of the posts, deleted posts are dropped from index.
+    Param posts iterable of saved Post objects.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+    PostSearchTerm.objects.filter(post_id__in=[post.id for post in posts]).delete()
+    terms = []
+    for post in posts:
+        if not post.is_deleted:
+            terms.extend(build_terms(post))
+    PostSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def index_queryset(queryset, batch_size=1000):
+    """
+    replace search terms of every post of a queryset with one delete and
+    streamed inserts, for posts read back by range which may include posts
+    indexed already.
+    Param queryset Post queryset, batch_size terms per insert.
+    Return indexed post count.
+    """
+    PostSearchTerm.objects.filter(post__in=queryset.values("id")).delete()
+    count = 0
+    terms = []
+    for post in queryset.only("id", "title", "description", "is_deleted").iterator():
+        count += 1
+        if not post.is_deleted:
+            terms.extend(build_terms(post))
+        if len(terms) >= batch_size:
+            PostSearchTerm.objects.bulk_create(terms[:batch_size])
+            terms = terms[batch_size:]
+    if terms:
+        PostSearchTerm.objects.bulk_create(terms, batch_size=batch_size)
+    return count
+
+
+def index_post(post):
+    """
+    replace search terms of one post.
+    Param post saved Post object.
+    """
+    index_posts([post])
+
+
+def remove_post(post):
+    """
+    remove post from search index.
+    Param post Post object.
+    """
+    PostSearchTerm.objects.filter(post_id=post.id).delete()
+
+
+def search_posts(queryset, keyword):
+    """
+    filter and rank posts by keyword through the inverted index.
+    Every keyword term must prefix match a title or description word.
+    Param queryset scoped post queryset, keyword search string.
+    Return queryset ordered by rank, annotated with search_rank.
+    """
+    terms = tokenize(keyword)
+    if not terms:
+        return queryset.none()
+    any_term = Q()
+    for term in terms:
+        queryset = queryset.filter(id__in=PostSearchTerm.objects.filter(
+            term__startswith=term).values("post_id"))
+        any_term |= Q(term__startswith=term)
+    rank = PostSearchTerm.objects.filter(any_term, post_id=OuterRef("pk")).values(
+        "post_id").annotate(rank=Sum("weight")).values("rank")
+    return queryset.annotate(search_rank=Coalesce(Subquery(rank), 0)).order_by("-search_rank", "id")
@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, OuterRef, Subquery
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from posts.images import profile_url
+from posts.models import Post, User
+
+POST_FIELDS = ["title", "description", "status", "user", "created_user_id", "updated_user_id",
+               "deleted_user_id", "created_at", "updated_at", "deleted_at"]
+USER_FIELDS = ["last_login", "name", "email", "profile", "type", "phone", "address", "dob",
+               "created_user_id", "updated_user_id", "deleted_user_id", "created_at",
+               "updated_at", "deleted_at"]
+
+
+def user_column(column, user_id_field):
+    """
+    correlated subquery for one column of a user referenced by id.
+    Param column User column, user_id_field outer integer field.
+    Return Subquery.
+    """
+    return Subquery(User.objects.filter(pk=OuterRef(user_id_field)).values(column)[:1])
+
+
+def build_detail(model_label, row, fields, extra):
+    """
+    build the detail dict in django serializer layout.
+    Param model_label "app.model", row values dict, fields serialized fields, extra top level keys.
+    Return dict.
+    """
+    data = {
+        "model": model_label,
+        "pk": row["id"],
+        "fields": {name: row[name] for name in fields}
+    }
+    data.update(extra)
+    return data
+
+
+def post_details(post_ids):
+    """
+    read post details with creator email and updater name in one query.
+    Param post_ids list of post ids.
+    Return dict of post id to detail dict.
+    """
+    rows = Post.alive.filter(pk__in=post_ids).annotate(
+        created_user_name=F("user__email"),
+        updated_user_name=user_column("name", "updated_user_id")
+    ).values("id", "created_user_name", "updated_user_name", *POST_FIELDS)
+    details = {}
+    for row in rows:
+        details[row["id"]] = build_detail("posts.post", row, POST_FIELDS, {
+            "created_user_name": row["created_user_name"] or "",
+            "updated_user_name": row["updated_user_name"] or ""
+        })
+    return details
+
+
+def user_details(user_ids):
+    """
+    read user details with creator and updater emails in one query.
+    Param user_ids list of user ids.
+    Return dict of user id to detail dict.
+    """
+    rows = User.alive.filter(pk__in=user_ids).annotate(
+        created_user_name=user_column("email", "created_user_id"),
+        updated_user_name=user_column("email", "updated_user_id")
+    ).values("id", "created_user_name", "updated_user_name", *USER_FIELDS)
+    details = {}
+    for row in rows:
+        details[row["id"]] = build_detail("posts.user", row, USER_FIELDS, {
+            "created_user_name": row["created_user_name"] or "",
+            "updated_user_name": row["updated_user_name"] or "",
+            "profile": profile_url(row["profile"], "thumb")
+        })
+    return details
+
+
+def encode(data):
+    """
+    encode detail data once.
+    Param data dict or list.
+    Return json string.
+    """
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def detail_response(request, data):
+    """
+    encode data and answer with 304 when the client etag is current.
+    updated_at is a date, so no Last-Modified: If-Modified-Since would hide
+    edits made later the same day.
+    Param request view request, data response data.
+    Return HttpResponse.
+    """
+    body = encode(data)
+    etag = quote_etag(hashlib.md5(body.encode("utf-8")).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body)
+    response["ETag"] = etag
+    # detail data changes without updated_at changing (user names), always revalidate.
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.utils import timezone
+
+KEY_PREFIX = "posts.sessions"
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    session engine reading from the SESSION_CACHE_ALIAS cache, falling back to
+    the database on a miss, and writing cache and database only when the
+    session data differs from what was loaded.
+    Setting a key to the value it already has, e.g. login_username, marks a
+    session modified but writes nothing. Expiry is not extended by unchanged
+    requests, even with SESSION_SAVE_EVERY_REQUEST.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._loaded_data = None
+        super().__init__(session_key)
+
+    def serialize(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        data = super().load()
+        self._loaded_data = self.serialize(data)
+        return data
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and self._loaded_data is not None:
+            if self.serialize(self._get_session()) == self._loaded_data:
+                return
+        super().save(must_create)
+        self._loaded_data = self.serialize(self._get_session(no_load=True))
+
+    @classmethod
+    def clear_expired(cls, batch_size=None, pause=0):
+        """
+        delete expired sessions in batches, so no single statement locks the
+        whole table. Rows expiring while it runs are left for the next run.
+        Param batch_size rows per delete, default settings.SESSION_PURGE_BATCH_SIZE,
+        pause seconds to sleep between batches.
+        Return deleted row count.
+        """
+        batch_size = batch_size or getattr(settings, "SESSION_PURGE_BATCH_SIZE", 1000)
+        model = cls.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(model.objects.filter(expire_date__lt=now)
+                        .values_list("session_key", flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
@@ -0,0 +1,24 @@
+function pollImportJob(url) {
+  $.ajax({
+    type: 'GET',
+    url: url,
+    success: function (response) {
+      const data = JSON.parse(response);
+      const jobBox = $("#import-job");
+      if (data.status === 'success') {
+        jobBox.removeClass('alert-info').addClass('alert-success');
+        $("#import-job-status").html('Imported ' + data.rows_processed + ' posts in ' + data.seconds +
+          ' s (' + data.rows_per_second + ' rows/s). <a href="' + jobBox.data('posts-url') + '">Go to posts</a>');
+      } else if (data.status === 'failed') {
+        jobBox.removeClass('alert-info').addClass('alert-danger');
+        $("#import-job-status").text(data.error_message + (data.error_detail ? ' ' + data.error_detail : ''));
+      } else {
+        $("#import-job-status").text('Importing ' + data.file_name + ' ... ' + data.rows_processed + ' rows');
+        setTimeout(function () { pollImportJob(url); }, 1000);
+      }
+    },
+    error: function (response) {
+      alert(response["responseJSON"]["error"]);
+    }
+  })
+}
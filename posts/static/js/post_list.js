@@ -1,50 +1,29 @@
-function goToDetail(post) {
+const postDetails = {};
+
+function prefetchPostDetails() {
+  const ids = $("[data-post-id]").map(function () {
+    return $(this).data("post-id");
+  }).get();
+  if (ids.length === 0) {
+    return;
+  }
   $.ajax({
     type: 'GET',
-    url: "/post/detail",
+    url: "/post/details/",
     data: {
-      'post_id': post
+      'ids': ids.join(',')
     },
     success: function (response) {
-      const data = JSON.parse(response);
-      let status = data.fields.status === 1 ? 'Active' : 'Not Active';
-      $("#title").html(data.fields.title);
-      $("#description").html(data.fields.description);
-      $("#status").html(status);
-      $("#created_date").html(data.fields.created_at);
-      $("#created_user").html(data.created_user_name);
-      $("#updated_date").html(data.fields.updated_at);
-      $("#updated_user").html(data.updated_user_name);
-    },
-    error: function (response) {
-      alert(response["responseJSON"]["error"]);
+      $.extend(postDetails, JSON.parse(response));
     }
   })
 }
 
-function downloadCSV(postList) {
-  $.ajax({
-    type: 'GET',
-    url: "/post/list/download",
-    data: {},
-    success: function (response) {
-      let hiddenElement = document.createElement('a');
-      const today = new Date();
-      const date = today.getFullYear().toString() + (today.getMonth() + 1).toString() + today.getDate().toString() +
-        today.getHours().toString() + today.getMinutes().toString() + today.getSeconds().toString();
-      hiddenElement.href = 'data:text/csv;charset=utf-8,' + encodeURI(response);
-      hiddenElement.target = '_blank';
-      hiddenElement.download = 'post_list' + date + '_' + '.csv';
-      hiddenElement.click();
-    },
-    error: function (response) {
-      alert(response["responseJSON"]["error"]);
-    }
-  })
-
-}
-
-function showPostDeleteDialog(post) {
+function withPostDetail(post, callback) {
+  if (postDetails[post]) {
+    callback(postDetails[post]);
+    return;
+  }
   $.ajax({
     type: 'GET',
     url: "/post/detail/",
@@ -52,12 +31,8 @@ function showPostDeleteDialog(post) {
       'post_id': post
     },
     success: function (response) {
-      const data = JSON.parse(response);
-      let status = data.fields.status === "1" ? 'Active' : 'Not Active';
-      $("#post-delete-id").html(post);
-      $("#post-delete-title").html(data.fields.title);
-      $("#post-delete-description").html(data.fields.description);
-      $("#post-delete-status").html(status);
+      postDetails[post] = JSON.parse(response);
+      callback(postDetails[post]);
     },
     error: function (response) {
       alert(response["responseJSON"]["error"]);
@@ -65,6 +40,29 @@ function showPostDeleteDialog(post) {
   })
 }
 
+function goToDetail(post) {
+  withPostDetail(post, function (data) {
+    let status = data.fields.status === 1 ? 'Active' : 'Not Active';
+    $("#title").html(data.fields.title);
+    $("#description").html(data.fields.description);
+    $("#status").html(status);
+    $("#created_date").html(data.fields.created_at);
+    $("#created_user").html(data.created_user_name);
+    $("#updated_date").html(data.fields.updated_at);
+    $("#updated_user").html(data.updated_user_name);
+  });
+}
+
+function showPostDeleteDialog(post) {
+  withPostDetail(post, function (data) {
+    let status = data.fields.status === 1 ? 'Active' : 'Not Active';
+    $("#post-delete-id").html(post);
+    $("#post-delete-title").html(data.fields.title);
+    $("#post-delete-description").html(data.fields.description);
+    $("#post-delete-status").html(status);
+  });
+}
+
 function postDelete() {
   const id = $("#post-delete-id").html();
   $.ajax({
@@ -81,4 +79,4 @@ function postDelete() {
       alert(response["responseJSON"]["error"]);
     }
   })
-}
\ No newline at end of file
+}
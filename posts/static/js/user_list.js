@@ -1,38 +1,29 @@
-function goToDetail(user) {
+const userDetails = {};
+
+function prefetchUserDetails() {
+  const ids = $("[data-user-id]").map(function () {
+    return $(this).data("user-id");
+  }).get();
+  if (ids.length === 0) {
+    return;
+  }
   $.ajax({
     type: 'GET',
-    url: "/user/detail",
+    url: "/user/details/",
     data: {
-      'user_id': user
+      'ids': ids.join(',')
     },
     success: function (response) {
-      const data = JSON.parse(response);
-      const type = data?.fields?.type === 'a' ? 'Admin' : 'User';
-      
-      filename = ''
-      if (data?.profile) {
-        lastFileName = data.profile.split('/');
-        filename = lastFileName[lastFileName.length - 1];
-      } else {
-        filename = 'user_default.png';
-      }
-      filename ? $("#user-detail-profile").attr("src", '/media/' + filename) : '';
-      data?.fields?.name ? $("#user-detail-name").html(data.fields.name) : '';
-      $("#type").html(type);
-      data?.fields?.email ? $("#user-detail-email").html(data.fields.email) : '';
-      data?.fields?.phone ? $("#phone").html(data.fields.phone) : '';
-      data?.fields?.created_at ? $("#created_date").html(data.fields.created_at) : '';
-      data?.created_user_name ? $("#created_user").html(data.created_user_name) : '';
-      data?.fields?.updated_at ? $("#updated_date").html(data.fields.updated_at) : '';
-      data?.updated_user_name ? $("#updated_user").html(data.updated_user_name) : '';
-    },
-    error: function (response) {
-      alert(response["responseJSON"]["error"]);
+      $.extend(userDetails, JSON.parse(response));
     }
   })
 }
 
-function showUserDeleteDialog(user) {
+function withUserDetail(user, callback) {
+  if (userDetails[user]) {
+    callback(userDetails[user]);
+    return;
+  }
   $.ajax({
     type: 'GET',
     url: "/user/detail/",
@@ -40,15 +31,8 @@ function showUserDeleteDialog(user) {
       'user_id': user
     },
     success: function (response) {
-      const data = JSON.parse(response);
-      let type = data.fields.type === "a" ? 'Admin' : 'User';
-      $("#user-delete-id").html(user);
-      $("#user-delete-name").html(data.fields.name);
-      $("#user-delete-type").html(type);
-      $("#user-delete-email").html(data.fields.email);
-      $("#user-delete-phone").html(data.fields.phone);
-      $("#user-delete-dob").html(data.fields.dob);
-      $("#user-delete-address").html(data.fields.address);
+      userDetails[user] = JSON.parse(response);
+      callback(userDetails[user]);
     },
     error: function (response) {
       alert(response["responseJSON"]["error"]);
@@ -56,6 +40,35 @@ function showUserDeleteDialog(user) {
   })
 }
 
+function goToDetail(user) {
+  withUserDetail(user, function (data) {
+    const type = data?.fields?.type === '0' ? 'Admin' : 'User';
+
+    $("#user-detail-profile").attr("src", data.profile);
+    data?.fields?.name ? $("#user-detail-name").html(data.fields.name) : '';
+    $("#type").html(type);
+    data?.fields?.email ? $("#user-detail-email").html(data.fields.email) : '';
+    data?.fields?.phone ? $("#phone").html(data.fields.phone) : '';
+    data?.fields?.created_at ? $("#created_date").html(data.fields.created_at) : '';
+    data?.created_user_name ? $("#created_user").html(data.created_user_name) : '';
+    data?.fields?.updated_at ? $("#updated_date").html(data.fields.updated_at) : '';
+    data?.updated_user_name ? $("#updated_user").html(data.updated_user_name) : '';
+  });
+}
+
+function showUserDeleteDialog(user) {
+  withUserDetail(user, function (data) {
+    let type = data.fields.type === "0" ? 'Admin' : 'User';
+    $("#user-delete-id").html(user);
+    $("#user-delete-name").html(data.fields.name);
+    $("#user-delete-type").html(type);
+    $("#user-delete-email").html(data.fields.email);
+    $("#user-delete-phone").html(data.fields.phone);
+    $("#user-delete-dob").html(data.fields.dob);
+    $("#user-delete-address").html(data.fields.address);
+  });
+}
+
 function userDelete() {
   const id = $("#user-delete-id").html();
   $.ajax({
@@ -72,4 +85,4 @@ function userDelete() {
       alert(response["responseJSON"]["error"]);
     }
   })
-}
\ No newline at end of file
+}
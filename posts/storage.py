@@ -0,0 +1,243 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+HASH_CHUNK_SIZE = 64 * 1024
+EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+CONTENT_ADDRESSED_RE = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]{1,10}$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# uploads waiting for a background import are not public.
+PRIVATE_MEDIA_DIRS = ("imports/",)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def safe_extension(name):
+    """
+    lower case extension of an uploaded file name, "" when it is unusual.
+    Param name client file name.
+    Return extension with dot.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    return extension if EXTENSION_RE.match(extension) else ""
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    write a file under a temporary name and rename it into place, so readers
+    never see a partly written file.
+    Param path final file path.
+    Yield temporary path in the same directory.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        yield temp_path
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(temp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    file storage naming every file by the sha256 of its content.
+    The hash is taken while the upload streams to disk, the file is renamed
+    into place and a file already stored under the same hash is reused.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # the final name is only known after hashing, see _save.
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = safe_extension(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory), prefix=".upload-")
+        try:
+            if hasattr(content, "temporary_file_path"):
+                # large uploads are already on disk, hash them and move instead of copying.
+                os.close(fd)
+                with open(content.temporary_file_path(), "rb") as source:
+                    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, "wb") as destination:
+                    for chunk in content.chunks():
+                        digest.update(chunk)
+                        destination.write(chunk)
+            name = posixpath.join(directory, digest.hexdigest() + extension)
+            if not os.path.exists(self.path(name)):
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, self.path(name))
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        return name
+
+
+media_storage = ContentAddressedStorage()
+
+
+def media_etag(path, file_stat):
+    """
+    entity tag of a media file, the content hash for content addressed names.
+    Param path media path, file_stat os.stat result.
+    Return quoted etag.
+    """
+    match = CONTENT_ADDRESSED_RE.match(posixpath.basename(path))
+    if match:
+        return quote_etag(match.group(1))
+    return quote_etag("{:x}-{:x}".format(file_stat.st_mtime_ns, file_stat.st_size))
+
+
+def cache_control(path):
+    if CONTENT_ADDRESSED_RE.match(posixpath.basename(path)):
+        return IMMUTABLE_CACHE_CONTROL
+    return "public, max-age={}".format(getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600))
+
+
+def parse_range(header, size):
+    """
+    parse a single "bytes=" range header.
+    Multiple ranges are not supported and are answered with the whole file.
+    Param header Range header value, size file size.
+    Return (start, end) inclusive, None for the whole file, or False when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # suffix range, the last N bytes.
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    check the If-Range precondition of a range request.
+    Return True when the range may be served.
+    """
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(("\"", "W/")):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def read_range(path, start, length):
+    with open(path, "rb") as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(HASH_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload(path, full_path):
+    """
+    response handing the transfer to the front proxy, settings.MEDIA_SENDFILE
+    "x-accel-redirect" (nginx internal location MEDIA_ACCEL_REDIRECT_PREFIX)
+    or "x-sendfile" (apache, lighttpd). The proxy serves ranges itself.
+    Return HttpResponse or None when offloading is off.
+    """
+    backend = getattr(settings, "MEDIA_SENDFILE", "")
+    if backend == "x-accel-redirect":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = getattr(
+            settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/") + quote(path)
+        return response
+    if backend == "x-sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = full_path
+        return response
+    return None
+
+
+def file_response(request, full_path, file_stat, etag):
+    """
+    stream the whole file or the requested byte range.
+    Param full_path file path, file_stat os.stat result, etag file etag.
+    Return response.
+    """
+    byte_range = None
+    if request.META.get("HTTP_RANGE") and if_range_matches(request, etag, file_stat.st_mtime):
+        byte_range = parse_range(request.META["HTTP_RANGE"], file_stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */{}".format(file_stat.st_size)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(full_path, start, end - start + 1), status=206)
+        response["Content-Range"] = "bytes {}-{}/{}".format(start, end, file_stat.st_size)
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        # FileResponse uses the server's wsgi.file_wrapper (sendfile) when present.
+        response = FileResponse(open(full_path, "rb"))
+        response["Content-Length"] = str(file_stat.st_size)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve(request, path):
+    """
+    serve a media file with conditional GET, single byte ranges and long
+    caching of content addressed names, or hand it to the front proxy.
+    Param path media path below MEDIA_ROOT.
+    Return file response.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Media file not found")
+    if (not stat.S_ISREG(file_stat.st_mode) or posixpath.basename(path).startswith(".")
+            or posixpath.normpath(path).startswith(PRIVATE_MEDIA_DIRS)):
+        raise Http404("Media file not found")
+    etag = media_etag(path, file_stat)
+    response = get_conditional_response(request, etag=etag, last_modified=file_stat.st_mtime)
+    if response is None:
+        response = offload(path, full_path)
+        if response is None:
+            response = file_response(request, full_path, file_stat, etag)
+        if response.status_code != 416:
+            content_type, encoding = mimetypes.guess_type(full_path)
+            response["Content-Type"] = content_type or "application/octet-stream"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(file_stat.st_mtime)
+    response["Cache-Control"] = cache_control(path)
+    return response
@@ -0,0 +1,28 @@
+from django import template
+from django.utils.html import format_html_join
+
+from posts import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle_css(name):
+    """
+    stylesheet links of an asset bundle.
+    Param name bundle name of settings.ASSET_BUNDLES.
+    Return html.
+    """
+    urls = assets.bundle_urls(name, "css")
+    return format_html_join("\n", '<link href="{}" rel="stylesheet">', ((url,) for url in urls))
+
+
+@register.simple_tag
+def bundle_js(name):
+    """
+    script tags of an asset bundle.
+    Param name bundle name of settings.ASSET_BUNDLES.
+    Return html.
+    """
+    urls = assets.bundle_urls(name, "js")
+    return format_html_join("\n", '<script src="{}"></script>', ((url,) for url in urls))
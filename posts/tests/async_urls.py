@@ -0,0 +1,13 @@
+from django.urls import path
+
+from bulletinBoard.urls import urlpatterns as site_urlpatterns
+from posts import async_views
+
+# the site urls with the read views of ASYNC_VIEWS, matched first.
+urlpatterns = [
+    path("posts/", async_views.index, name="index"),
+    path("post/detail/", async_views.post_detail, name="post-detail"),
+    path("users/", async_views.userList, name="user-list"),
+    path("user/detail/", async_views.user_detail, name="user-detail"),
+    path("user/profile/", async_views.user_profile, name="user-profile"),
+] + site_urlpatterns
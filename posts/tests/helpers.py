@@ -0,0 +1,83 @@
+from django.test import RequestFactory
+
+from posts.helper import make_confirm_token
+from posts.models import Post, User
+from posts.query_budget import get_budget
+
+
+def seed_rows(creator, count):
+    """
+    bulk insert posts and users owned by creator for budget tests.
+    Param creator User, count rows per table.
+    """
+    Post.objects.bulk_create([
+        Post(
+            title="budget post {}".format(i),
+            description="budget description {}".format(i),
+            user=creator,
+            created_user_id=creator.id,
+            updated_user_id=creator.id
+        ) for i in range(count)
+    ], batch_size=1000)
+    User.objects.bulk_create([
+        User(
+            name="budget user {}".format(i),
+            email="budgetuser{}@gmail.com".format(i),
+            created_user_id=creator.id,
+            updated_user_id=creator.id
+        ) for i in range(count)
+    ], batch_size=1000)
+
+
+def confirm_token(user, form_name, **state):
+    """
+    confirm step token of a form as the confirm page renders it.
+    Param user posting User, form_name form and object, state pending values.
+    Return signed token.
+    """
+    request = RequestFactory().post("/")
+    request.user = user
+    return make_confirm_token(request, form_name, **state)
+
+
+def full_scans(connection, sql):
+    """
+    plan steps of a select which read a whole table, from EXPLAIN.
+    Param connection database connection, sql executed select with its literal params.
+    Return list of plan step descriptions.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            cursor.execute("EXPLAIN " + sql)
+            columns = [column[0] for column in cursor.description]
+            steps = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return ["{} type={} key={}".format(step["table"], step["type"], step["key"])
+                    for step in steps if step["type"] == "ALL"]
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [row[-1] for row in cursor.fetchall() if row[-1].startswith("SCAN ")]
+
+
+class QueryBudgetTestMixin:
+    """assertion helper for settings.QUERY_BUDGETS."""
+
+    def assertWithinQueryBudget(self, response):
+        """
+        assert the request of response stayed within its view budget.
+        A streamed body is read first, its queries count too.
+        Param response test client response.
+        """
+        if response.streaming:
+            b"".join(response.streaming_content)
+        request = response.wsgi_request
+        url_name = request.resolver_match.url_name
+        stats = getattr(request, "query_stats", None)
+        self.assertIsNotNone(stats, "QueryBudgetMiddleware is not installed")
+        budget = get_budget(url_name)
+        self.assertIsNotNone(budget, "no query budget for {}".format(url_name))
+        allowed = budget["queries"] + getattr(request, "query_budget_extra", 0)
+        self.assertLessEqual(
+            stats.count, allowed,
+            "{} ran {} queries, budget is {}:\n{}".format(
+                url_name, stats.count, allowed,
+                "\n".join(stats.sql) or "set QUERY_STATS_KEEP_SQL to list the queries"))
+        return stats
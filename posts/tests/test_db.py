@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.test import SimpleTestCase
+
+from posts.db.pool import PooledConnectionMixin, clear_pools
+
+
+class PooledSqliteWrapper(PooledConnectionMixin, sqlite_base.DatabaseWrapper):
+    """sqlite wrapper with the pooling mixin of the mysql backend."""
+
+    def is_usable(self):
+        # sqlite always reports usable, ping like the mysql backend does.
+        try:
+            self.connection.execute("SELECT 1")
+        except sqlite_base.Database.Error:
+            return False
+        return True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        """connection pool set up data"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(clear_pools)
+
+    def wrapper(self, **options):
+        settings_dict = dict(connection.settings_dict)
+        settings_dict.update({
+            "NAME": os.path.join(self.directory.name, "pool.sqlite3"),
+            "POOL_SIZE": 2,
+            "POOL_MAX_LIFETIME": 3600,
+            "CONN_HEALTH_CHECKS": True,
+        }, **options)
+        wrapper = PooledSqliteWrapper(settings_dict, alias="pool-test")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_closed_connection_is_reused(self):
+        """test close returns the connection to the pool for the next connect"""
+        # prepare
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        # execute
+        wrapper.close()
+        wrapper.ensure_connection()
+        # assertion
+        self.assertIs(wrapper.connection, raw)
+
+    def test_connection_lifetime(self):
+        """test connections older than the pool lifetime are not reused"""
+        # prepare
+        wrapper = self.wrapper(POOL_MAX_LIFETIME=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        # execute
+        wrapper.close()
+        wrapper.ensure_connection()
+        # assertion
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_health_check_replaces_broken_connection(self):
+        """test a dropped connection is replaced before the first query of a request"""
+        # prepare
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        raw.close()
+        wrapper.health_check_done = False
+        # execute
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            row = cursor.fetchone()
+        # assertion
+        self.assertEqual(row, (1,))
+        self.assertIsNot(wrapper.connection, raw)
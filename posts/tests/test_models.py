@@ -81,4 +81,39 @@ class UserModelTests(TestCase):
             self.assertRaises(
                 ValueError,
                 "Users must have an email address"
-            )
\ No newline at end of file
+            )
+
+class SoftDeleteManagerTests(TestCase):
+    """for alive and all_with_deleted managers test code."""
+    @classmethod
+    def setUpTestData(cls):
+        """set up live and soft deleted posts."""
+        cls.live = Post.objects.create(title="live post", description="live")
+        cls.deleted = Post.objects.create(title="deleted post", description="deleted")
+        cls.deleted.soft_delete(cls.live.id)
+
+    def test_soft_delete(self):
+        """soft delete sets flag, deleting user and date"""
+        post = Post.objects.get(pk=self.deleted.id)
+        self.assertTrue(post.is_deleted)
+        self.assertEqual(post.deleted_user_id, self.live.id)
+        self.assertIsNotNone(post.deleted_at)
+
+    def test_alive_manager(self):
+        """alive manager skips soft deleted rows"""
+        self.assertEqual(list(Post.alive.all()), [self.live])
+        self.assertFalse(Post.alive.filter(pk=self.deleted.id).exists())
+
+    def test_all_with_deleted_manager(self):
+        """all_with_deleted manager returns every row"""
+        self.assertEqual(Post.all_with_deleted.count(), 2)
+        self.assertEqual(list(Post.all_with_deleted.deleted()), [self.deleted])
+        self.assertEqual(list(Post.all_with_deleted.alive()), [self.live])
+
+    def test_user_managers(self):
+        """user keeps its auth manager next to the soft delete managers"""
+        user = User.objects.create_user(email="softdeletetester@gmail.com", password="12345")
+        user.soft_delete(user.id)
+        self.assertIsInstance(User.objects, UserManager)
+        self.assertFalse(User.alive.filter(pk=user.id).exists())
+        self.assertTrue(User.all_with_deleted.filter(pk=user.id).exists())
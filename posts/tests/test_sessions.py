@@ -0,0 +1,160 @@
+import datetime
+import io
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.checks import check_session_cache
+from posts.models import Post, User
+from posts.sessions import SessionStore
+
+
+class SessionStoreTest(TestCase):
+    def setUp(self):
+        """session store test set up data"""
+        cache.clear()
+        self.session = SessionStore()
+        self.session["login_username"] = "Member"
+        self.session.save()
+
+    def test_unchanged_session_not_written(self):
+        """test saving a session with the data it was loaded with writes nothing"""
+        # prepare
+        session = SessionStore(self.session.session_key)
+        session["login_username"] = "Member"
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        # assertion
+        self.assertTrue(session.modified)
+        self.assertEqual(len(queries), 0)
+
+    def test_changed_session_written(self):
+        """test a changed session is written to database and cache"""
+        # prepare
+        session = SessionStore(self.session.session_key)
+        session["login_username"] = "Admin"
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+            session.save()
+        # assertion
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("UPDATE")]), 1)
+        cache.clear()
+        self.assertEqual(SessionStore(self.session.session_key)["login_username"], "Admin")
+
+    def test_read_from_cache(self):
+        """test a cached session is read without a query"""
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            data = SessionStore(self.session.session_key)["login_username"]
+        # assertion
+        self.assertEqual(data, "Member")
+        self.assertEqual(len(queries), 0)
+
+    def test_read_falls_back_to_database(self):
+        """test a session missing from the cache is read from the database"""
+        # prepare
+        cache.clear()
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            data = SessionStore(self.session.session_key)["login_username"]
+        # assertion
+        self.assertEqual(data, "Member")
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            SessionStore(self.session.session_key)["login_username"]
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(SESSION_ENGINE="posts.sessions")
+    def test_logged_in_request_without_session_query(self):
+        """test a logged in page view neither reads nor writes the session table"""
+        # prepare
+        user = User.objects.create_user(email="member@gmail.com", password="member123")
+        user.type = "1"
+        user.save()
+        post = Post.objects.create(title="Post", description="Description", status="1",
+                                   user=user, created_user_id=user.id)
+        self.client.login(email="member@gmail.com", password="member123")
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-detail"), {"post_id": post.id})
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "django_session" in query["sql"]])
+
+
+class SessionCacheCheckTest(TestCase):
+    @override_settings(SESSION_ENGINE="posts.sessions", CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_cache_refused(self):
+        """test the cache-first engine on a per-process cache fails the system check"""
+        # execute
+        errors = check_session_cache(None)
+        # assertion
+        self.assertEqual([error.id for error in errors], ["posts.E001"])
+
+    @override_settings(SESSION_ENGINE="posts.sessions", CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache"}})
+    def test_shared_cache_allowed(self):
+        """test the cache-first engine on memcached passes the system check"""
+        # assertion
+        self.assertEqual(check_session_cache(None), [])
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+    def test_database_engine_allowed(self):
+        """test the database engine passes the system check on any cache"""
+        # assertion
+        self.assertEqual(check_session_cache(None), [])
+
+
+class PurgeSessionsTest(TestCase):
+    def setUp(self):
+        """purge sessions test set up data"""
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key="expired{}".format(i), session_data="",
+                                   expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(session_key="current", session_data="",
+                               expire_date=now + datetime.timedelta(days=1))
+
+    def test_clear_expired_in_batches(self):
+        """test expired sessions are deleted in batches of the given size"""
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            deleted = SessionStore.clear_expired(batch_size=2)
+        # assertion
+        self.assertEqual(deleted, 5)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("DELETE")]), 3)
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["current"])
+
+    def test_purge_sessions_command(self):
+        """test purge_sessions reports the deleted sessions"""
+        # prepare
+        out = io.StringIO()
+        # execute
+        call_command("purge_sessions", batch_size=4, stdout=out)
+        # assertion
+        self.assertIn("Deleted 5 expired sessions.", out.getvalue())
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_bench_sessions(self):
+        """test bench_sessions reports every engine"""
+        # prepare
+        user = User.objects.create_user(email="admin@gmail.com", password="admin123")
+        user.type = "0"
+        user.save()
+        Post.objects.create(title="Post", description="Description", status="1",
+                            user=user, created_user_id=user.id)
+        out = io.StringIO()
+        # execute
+        call_command("bench_sessions", requests=2, warmup=0, stdout=out)
+        # assertion
+        self.assertEqual(len(out.getvalue().splitlines()), 7)
+        self.assertIn("cached, write on change", out.getvalue())
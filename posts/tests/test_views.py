@@ -1,11 +1,43 @@
 #!/usr/bin/python
+import asyncio
 import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+from unittest import mock
 from django.utils import timezone
 from django.conf import settings
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
-
-from posts.models import Post, User
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.core.cache import cache
+
+from posts.models import CsvImportJob, Post, PostSearchTerm, User
+from posts import assets, last_login, list_cache
+from posts.forms import UserEditForm
+from posts.helper import handle_uploaded_file, save_temp
+from posts.import_jobs import (
+    ProgressWriter, claim_job, job_progress, release_upload, requeue_stale_jobs, run_job, store_upload
+)
+from posts.checks import check_list_cache
+from posts.csv_import import import_posts
+from posts.images import profile_url
+from posts.query_budget import QueryBudgetExceeded
+from posts.management.commands.bench_asgi import read_response
+from PIL import Image
+from posts.search import index_post, index_posts
+from prometheus_client import REGISTRY
+from posts.tests.helpers import QueryBudgetTestMixin, confirm_token, full_scans, seed_rows
 import re
 
 
@@ -68,6 +100,124 @@ class LoginViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
 
 
+class EmailBackendTest(TestCase):
+    def setUp(self):
+        """email backend test set up data"""
+        self.user = User.objects.create_user(email="backendtester@gmail.com", password="12345")
+        self.user.type = "0"
+        self.user.save()
+
+    def user_queries(self, queries):
+        return [query for query in queries if "posts_user" in query["sql"] and
+                query["sql"].startswith("SELECT")]
+
+    def test_login_one_user_query(self):
+        """test login checks email, soft delete and password with one user query"""
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("user_login"), {
+                "email": "backendtester@gmail.com", "password": "12345"})
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(self.user_queries(queries)), 1)
+
+    def test_failed_login_one_user_query(self):
+        """test failed login tells wrong password from unknown email with one user query"""
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("user_login"), {
+                "email": "backendtester@gmail.com", "password": "wrong"})
+        # assertion
+        self.assertEqual(len(self.user_queries(queries)), 1)
+        self.assertEqual(str(list(response.context["messages"])[0]), "Email and Password does not match.")
+
+    def test_page_reuses_request_user(self):
+        """test an authenticated page loads the user once"""
+        # prepare
+        self.client.login(email="backendtester@gmail.com", password="12345")
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-profile"))
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.user_queries(queries)), 1)
+
+    def test_deleted_user_logged_out(self):
+        """test a user soft deleted after login loses the session"""
+        # prepare
+        self.client.login(email="backendtester@gmail.com", password="12345")
+        self.user.soft_delete(self.user.id)
+        # execute
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+
+class LastLoginTest(TestCase):
+    def setUp(self):
+        """last_login test set up data"""
+        self.users = []
+        for i in range(2):
+            user = User.objects.create_user(email="lastlogin{}@gmail.com".format(i), password="12345")
+            self.users.append(user)
+        self.addCleanup(last_login._pending.clear)
+
+    def login_updates(self, email):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("user_login"), {"email": email, "password": "12345"})
+        return [query for query in queries if query["sql"].startswith("UPDATE \"posts_user\"")]
+
+    def test_last_login_sync(self):
+        """test last_login is written in the login request by default"""
+        # execute
+        updates = self.login_updates("lastlogin0@gmail.com")
+        # assertion
+        self.assertEqual(len(updates), 1)
+        self.assertIsNotNone(User.objects.get(pk=self.users[0].pk).last_login)
+
+    @override_settings(LAST_LOGIN_DEFERRED=True, LAST_LOGIN_FLUSH_INTERVAL=0)
+    def test_last_login_deferred(self):
+        """test deferred last_login is written for every login in one update"""
+        # execute
+        updates = self.login_updates("lastlogin0@gmail.com")
+        self.client.logout()
+        updates += self.login_updates("lastlogin1@gmail.com")
+        # assertion
+        self.assertEqual(updates, [])
+        self.assertIsNone(User.objects.get(pk=self.users[0].pk).last_login)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(last_login.flush(), 2)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("CASE", queries[0]["sql"])
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 2)
+
+    @override_settings(LAST_LOGIN_DEFERRED=True, LAST_LOGIN_FLUSH_INTERVAL=0, LAST_LOGIN_MAX_PENDING=2)
+    def test_last_login_flushed_when_full(self):
+        """test pending login times are written once the buffer is full"""
+        # execute
+        self.login_updates("lastlogin0@gmail.com")
+        self.client.logout()
+        updates = self.login_updates("lastlogin1@gmail.com")
+        # assertion
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(last_login._pending, {})
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 2)
+
+    @override_settings(LAST_LOGIN_DEFERRED=True, LAST_LOGIN_FLUSH_INTERVAL=0, LAST_LOGIN_BATCH_SIZE=1)
+    def test_last_login_batches(self):
+        """test flush writes one update per batch"""
+        # prepare
+        now = timezone.now()
+        last_login._pending.update({user.pk: now for user in self.users})
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            written = last_login.flush()
+        # assertion
+        self.assertEqual(written, 2)
+        self.assertEqual(len(queries), 2)
+
+
 class PostListViewTest(TestCase):
     def setUp(self):
         """post list view set up data"""
@@ -86,9 +236,7 @@ class PostListViewTest(TestCase):
             updated_at=timezone.now()
         )
         test_post.save()
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
+        index_post(test_post)
 
     def test_redirect_if_not_logged_in(self):
         """test redirect login in login without authenticated."""
@@ -134,7 +282,260 @@ class PostListViewTest(TestCase):
             reverse("index"), {"keyword": "xxxxxxxxxxxxxxx"})
         # assertion
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.context["page_obj"]), 1)
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    def test_form_post_search_ranked(self):
+        """test post search ranks title matches before description matches"""
+        # prepare
+        user = User.objects.get(email="postlisttester@gmail.com")
+        description_hit = Post.objects.create(
+            title="another post", description="mentions ranking once",
+            user=user, created_user_id=user.id)
+        title_hit = Post.objects.create(
+            title="ranking post", description="ranking twice",
+            user=user, created_user_id=user.id)
+        index_posts([description_hit, title_hit])
+        self.client.login(email="postlisttester@gmail.com", password="12345")
+        # execute
+        response = self.client.post(reverse("index"), {"keyword": "rank"})
+        # assertion
+        self.assertEqual([post.id for post in response.context["page_obj"]],
+                         [title_hit.id, description_hit.id])
+
+    def test_form_post_search_scope(self):
+        """test post search does not return other users posts for user type"""
+        # prepare
+        other = User.objects.create_user(
+            email="postlistother@gmail.com", password="12345")
+        other_post = Post.objects.create(
+            title="post of test other", description="other",
+            user=other, created_user_id=other.id)
+        index_post(other_post)
+        self.client.login(email="postlisttester@gmail.com", password="12345")
+        # execute
+        response = self.client.post(reverse("index"), {"keyword": "test"})
+        # assertion
+        self.assertEqual([post.title for post in response.context["page_obj"]],
+                         ["post of test"])
+
+    def test_form_post_search_deleted(self):
+        """test soft deleted post is removed from search index"""
+        # prepare
+        self.client.login(email="postlisttester@gmail.com", password="12345")
+        post = Post.objects.get(title="post of test")
+        # execute
+        self.client.get(reverse("post-delete"), {"post_id": post.id})
+        response = self.client.post(reverse("index"), {"keyword": "post"})
+        # assertion
+        self.assertEqual(len(response.context["page_obj"]), 0)
+        self.assertFalse(PostSearchTerm.objects.filter(post=post).exists())
+
+
+@override_settings(POST_LIST_PAGINATION="cursor")
+class PostListCursorViewTest(TestCase):
+    def setUp(self):
+        """post list cursor pagination set up data"""
+        test_user = User.objects.create_user(
+            email="postcursortester@gmail.com", password="12345")
+        test_user.type = "1"
+        test_user.save()
+        for i in range(12):
+            Post.objects.create(
+                title="cursor post {}".format(i),
+                description="cursor description",
+                status="1",
+                user=test_user,
+                created_user_id=test_user.id,
+                updated_user_id=test_user.id
+            )
+
+    def test_cursor_first_page(self):
+        """test first page has next token and no previous token"""
+        # prepare
+        self.client.login(email="postcursortester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("index"))
+        page_obj = response.context["page_obj"]
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["cursor_mode"])
+        self.assertEqual([post.title for post in page_obj],
+                         ["cursor post {}".format(i) for i in range(5)])
+        self.assertTrue(page_obj.has_next())
+        self.assertFalse(page_obj.has_previous())
+
+    def test_cursor_next_and_previous(self):
+        """test walking forward to the last page and back again"""
+        # prepare
+        self.client.login(email="postcursortester@gmail.com", password="12345")
+        # execute
+        first = self.client.get(reverse("index")).context["page_obj"]
+        second = self.client.get(
+            reverse("index"), {"cursor": first.next_token}).context["page_obj"]
+        last = self.client.get(
+            reverse("index"), {"cursor": second.next_token}).context["page_obj"]
+        back = self.client.get(
+            reverse("index"), {"cursor": last.previous_token}).context["page_obj"]
+        # assertion
+        self.assertEqual(second[0].title, "cursor post 5")
+        self.assertEqual(len(last), 2)
+        self.assertFalse(last.has_next())
+        self.assertEqual([post.id for post in back], [post.id for post in second])
+
+    def test_cursor_does_not_count(self):
+        """test cursor page never runs COUNT(*)"""
+        # prepare
+        self.client.login(email="postcursortester@gmail.com", password="12345")
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("index"))
+        # assertion
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries))
+
+    def test_cursor_tampered_token(self):
+        """test tampered token falls back to first page"""
+        # prepare
+        self.client.login(email="postcursortester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("index"), {"cursor": "bad-token"})
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_obj"][0].title, "cursor post 0")
+
+
+@override_settings(POST_LIST_PAGINATION="cursor", POST_LIST_CURSOR_ORDERING=("created_at", "id"))
+class PostListCompositeCursorViewTest(TestCase):
+    def setUp(self):
+        """post list cursor pagination on (created_at, id) set up data"""
+        test_user = User.objects.create_user(
+            email="postcompositetester@gmail.com", password="12345")
+        test_user.type = "1"
+        test_user.save()
+        today = datetime.date.today()
+        for i in range(7):
+            Post.objects.create(
+                title="composite post {}".format(i),
+                description="cursor description",
+                user=test_user,
+                created_user_id=test_user.id,
+                created_at=today - datetime.timedelta(days=i % 3)
+            )
+
+    def test_composite_cursor_walk(self):
+        """test composite cursor visits every post once"""
+        # prepare
+        self.client.login(email="postcompositetester@gmail.com", password="12345")
+        seen = []
+        token = None
+        # execute
+        while True:
+            params = {"cursor": token} if token else {}
+            page_obj = self.client.get(reverse("index"), params).context["page_obj"]
+            seen += [(post.created_at, post.id) for post in page_obj]
+            if not page_obj.has_next():
+                break
+            token = page_obj.next_token
+        # assertion
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(seen, sorted(seen))
+
+
+@override_settings(LIST_CACHE_ENABLED=True)
+class ListCacheTest(TestCase):
+    def setUp(self):
+        """list cache set up data"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="listcachetester@gmail.com", password="12345")
+        self.user.type = "1"
+        self.user.save()
+        self.post = Post.objects.create(
+            title="cached post", description="cached", user=self.user,
+            created_user_id=self.user.id)
+        self.client.login(email="listcachetester@gmail.com", password="12345")
+
+    def test_post_list_cache_hit(self):
+        """test repeat post list page skips count and page queries"""
+        # execute
+        first = self.client.get(reverse("index"))
+        second = self.client.get(reverse("index"))
+        # assertion
+        self.assertLess(second.wsgi_request.query_stats.count, first.wsgi_request.query_stats.count)
+        self.assertEqual([post.title for post in second.context["page_obj"]], ["cached post"])
+        self.assertEqual(second.context["page_obj"].paginator.num_pages, 1)
+
+    def test_post_list_cache_invalidated(self):
+        """test post save invalidates cached post list"""
+        # prepare
+        self.client.get(reverse("index"))
+        # execute
+        Post.objects.create(title="new post", description="new", user=self.user,
+                            created_user_id=self.user.id)
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+    def test_post_list_cache_invalidated_by_delete_view(self):
+        """test post delete view invalidates cached post list"""
+        # prepare
+        self.client.get(reverse("index"))
+        # execute
+        self.client.get(reverse("post-delete"), {"post_id": self.post.id})
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    def test_post_list_cache_scope(self):
+        """test cached post list is not shared between user scopes"""
+        # prepare
+        other = User.objects.create_user(email="listcacheother@gmail.com", password="12345")
+        other.type = "1"
+        other.save()
+        self.client.get(reverse("index"))
+        # execute
+        self.client.login(email="listcacheother@gmail.com", password="12345")
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    def test_user_list_cache_invalidated(self):
+        """test user save invalidates cached user list"""
+        # prepare
+        self.client.get(reverse("user-list"))
+        # execute
+        User.objects.create(name="cached user", email="listcacheuser@gmail.com",
+                            created_user_id=self.user.id)
+        response = self.client.get(reverse("user-list"))
+        # assertion
+        self.assertIn("listcacheuser@gmail.com", [user.email for user in response.context["page_obj"]])
+
+    def test_last_login_keeps_cache(self):
+        """test last_login update does not invalidate lists"""
+        # prepare
+        generation = list_cache.get_generation(list_cache.USERS)
+        # execute
+        self.client.login(email="listcachetester@gmail.com", password="12345")
+        # assertion
+        self.assertEqual(list_cache.get_generation(list_cache.USERS), generation)
+
+
+class ListCacheCheckTest(TestCase):
+    @override_settings(LIST_CACHE_ENABLED=True, CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_cache_refused(self):
+        """test the list cache on a per-process cache fails the system check"""
+        # execute
+        errors = check_list_cache(None)
+        # assertion
+        self.assertEqual([error.id for error in errors], ["posts.E002"])
+
+    @override_settings(LIST_CACHE_ENABLED=True, CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache"}})
+    def test_shared_cache_allowed(self):
+        """test the list cache on memcached passes the system check"""
+        # assertion
+        self.assertEqual(check_list_cache(None), [])
 
 
 class UserListViewTest(TestCase):
@@ -205,6 +606,38 @@ class UserListViewTest(TestCase):
             response, "posts/users_list.html"
         )
 
+    def test_user_list_creator_and_type_label(self):
+        """test user list annotates creator email and type label"""
+        # prepare
+        self.client.login(email="userlisttester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("user-list"))
+        row = [user for user in response.context["page_obj"]
+               if user.email == "userlisttester1@gmail.com"][0]
+        # assertion
+        self.assertEqual(row.created_user, "userlisttester@gmail.com")
+        self.assertEqual(row.type_label, "Admin")
+        self.assertEqual(row.type, "0")
+
+    def test_user_list_constant_queries(self):
+        """test user list query count does not grow with user table"""
+        # prepare
+        self.client.login(email="userlisttester@gmail.com", password="12345")
+        creator = User.objects.get(email="userlisttester@gmail.com")
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse("user-list"))
+        for i in range(30):
+            User.objects.create(
+                name="bulk{}".format(i),
+                email="userlistbulk{}@gmail.com".format(i),
+                created_user_id=creator.id
+            )
+        # execute
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse("user-list"))
+        # assertion
+        self.assertEqual(len(small), len(large))
+
 
 class PostCreateViewTest(TestCase):
     def setUp(self):
@@ -259,14 +692,12 @@ class PostCreateViewTest(TestCase):
         """test post create from confirm page"""
         # prepare
         self.client.login(email="postcreatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
+        token = confirm_token(User.objects.get(email="postcreatetester@gmail.com"), "post-create")
         # execute
         response = self.client.post(
             reverse('post-create'),
             {"_save": True, "title": "test title",
-             "description": "this is description"}
+             "description": "this is description", "confirm_token": token}
         )
         # assertion
         self.assertEqual(response.status_code, 302)
@@ -277,9 +708,6 @@ class PostCreateViewTest(TestCase):
         """test post cancel from post create"""
         # prepare
         self.client.login(email="postcreatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
         # execute
         self.client.get(reverse('post-create'))
         res_cancel = self.client.post(reverse("post-create"), {"_cancel": True, "title": "test title",
@@ -369,10 +797,8 @@ class UserCreateViewTest(TestCase):
         """test user create with file"""
         # prepare
         self.client.login(email="usercreatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session["profile"] = "user_default.png"
-        session.save()
+        token = confirm_token(User.objects.get(email="usercreatetester@gmail.com"), "user-create",
+                              profile="user_default.png")
         with open(str(settings.BASE_DIR)+"\\media\\test\\user_default.png", "rb") as profile:
             # execute
             response = self.client.post(
@@ -387,6 +813,7 @@ class UserCreateViewTest(TestCase):
                     "phone": "09123456",
                     "profile": profile,
                     "address": "Yangon",
+                    "confirm_token": token,
                 }
             )
             # assertion
@@ -396,9 +823,6 @@ class UserCreateViewTest(TestCase):
         """test user create from cancel"""
         # prepare
         self.client.login(email="usercreatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
         self.client.get(reverse('user-create'))
         with open(str(settings.BASE_DIR)+"\\media\\test\\user_default.png", "rb") as profile:
             # execute
@@ -424,10 +848,8 @@ class UserCreateViewTest(TestCase):
         """test user create from create"""
         # prepare
         self.client.login(email="usercreatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session["profile"] = "user_default.png"
-        session.save()
+        token = confirm_token(User.objects.get(email="usercreatetester@gmail.com"), "user-create",
+                              profile="user_default.png")
         with open(str(settings.BASE_DIR)+"\\media\\test\\user_default.png", "rb") as profile:
             # execute
             response = self.client.post(
@@ -442,6 +864,7 @@ class UserCreateViewTest(TestCase):
                     "phone": "09123456",
                     "profile": profile,
                     "address": "Yangon",
+                    "confirm_token": token,
                 }
             )
             # assertion
@@ -527,15 +950,13 @@ class PostUpdateViewTest(TestCase):
         """test post update after confirm"""
         # prepare
         self.client.login(email="postupdatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session['status'] = "0"
-        session.save()
+        token = confirm_token(User.objects.get(email="postupdatetester@gmail.com"),
+                              "post-update:{}".format(self.test_post.id), status=False)
         # execute
         response = self.client.post(
             reverse('post-update',  kwargs={'pk': self.test_post.id}),
             {"_save": True, "title": "update title",
-             "description": "this is update description"}
+             "description": "this is update description", "confirm_token": token}
         )
         # assertion
         self.assertEqual(response.status_code, 302)
@@ -546,9 +967,6 @@ class PostUpdateViewTest(TestCase):
         """test post cancel from confirm page"""
         # prepare
         self.client.login(email="postupdatetester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
         # execute
         self.client.get(
             reverse('post-update', kwargs={'pk': self.test_post.id}),)
@@ -598,6 +1016,145 @@ class PostDetail(TestCase):
         # assertion
         self.assertEqual(response.status_code, 200)
 
+    def test_post_detail_data(self):
+        """test post detail json layout and user names"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id})
+        data = json.loads(response.content)
+        # assertion
+        self.assertEqual(data["pk"], self.test_post.id)
+        self.assertEqual(data["fields"]["title"], "detail test")
+        self.assertEqual(data["fields"]["status"], 1)
+        self.assertEqual(data["created_user_name"], "postdetailtester@gmail.com")
+
+    @override_settings(QUERY_STATS_KEEP_SQL=True)
+    def test_post_detail_single_query(self):
+        """test post detail reads post and user names in one query"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id})
+        # assertion
+        post_queries = [sql for sql in response.wsgi_request.query_stats.sql if "posts_post" in sql]
+        self.assertEqual(len(post_queries), 1)
+
+    def test_post_detail_not_modified(self):
+        """test repeat post detail answered with 304"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        first = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id})
+        # execute
+        second = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id},
+            HTTP_IF_NONE_MATCH=first["ETag"])
+        # assertion
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_post_detail_changed(self):
+        """test post detail etag changes after update"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        first = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id})
+        Post.objects.filter(pk=self.test_post.id).update(title="changed")
+        # execute
+        second = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id},
+            HTTP_IF_NONE_MATCH=first["ETag"])
+        # assertion
+        self.assertEqual(second.status_code, 200)
+
+    def test_post_detail_if_modified_since_ignored(self):
+        """test post detail has no day precision Last-Modified to match"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        first = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id})
+        Post.objects.filter(pk=self.test_post.id).update(title="changed")
+        # execute
+        second = self.client.get(
+            reverse('post-detail'), {"post_id": self.test_post.id},
+            HTTP_IF_MODIFIED_SINCE="Fri, 31 Dec 9999 23:59:59 GMT")
+        # assertion
+        self.assertFalse(first.has_header("Last-Modified"))
+        self.assertEqual(second.status_code, 200)
+        self.assertIn("changed", second.content.decode())
+
+    def test_post_detail_missing(self):
+        """test missing post detail"""
+        # prepare
+        self.client.login(email="postdetailtester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse('post-detail'), {"post_id": 0})
+        # assertion
+        self.assertEqual(response.status_code, 404)
+
+class DetailBatchTest(TestCase):
+    def setUp(self):
+        """detail batch set up data"""
+        self.user = User.objects.create_user(
+            email="detailbatchtester@gmail.com", password="12345")
+        self.posts = [Post.objects.create(
+            title="batch detail {}".format(i),
+            description="batch",
+            user=self.user,
+            created_user_id=self.user.id,
+            updated_user_id=self.user.id
+        ) for i in range(5)]
+        self.client.login(email="detailbatchtester@gmail.com", password="12345")
+
+    @override_settings(QUERY_STATS_KEEP_SQL=True)
+    def test_post_detail_batch(self):
+        """test post details for a page in one query"""
+        # execute
+        ids = ",".join(str(post.id) for post in self.posts)
+        response = self.client.get(reverse("post-detail-batch"), {"ids": ids})
+        data = json.loads(response.content)
+        post_queries = [sql for sql in response.wsgi_request.query_stats.sql if "posts_post" in sql]
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(data.keys()), sorted(str(post.id) for post in self.posts))
+        self.assertEqual(data[str(self.posts[0].id)]["fields"]["title"], "batch detail 0")
+        self.assertEqual(data[str(self.posts[0].id)]["created_user_name"], "detailbatchtester@gmail.com")
+        self.assertEqual(len(post_queries), 1)
+
+    def test_post_detail_batch_too_many(self):
+        """test post details rejects more ids than a page"""
+        # execute
+        response = self.client.get(reverse("post-detail-batch"), {"ids": "1,2,3,4,5,6"})
+        # assertion
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_batch_invalid(self):
+        """test post details rejects invalid ids"""
+        # execute
+        response = self.client.get(reverse("post-detail-batch"), {"ids": "1,abc"})
+        # assertion
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_detail_batch(self):
+        """test user details for a page"""
+        # execute
+        response = self.client.get(reverse("user-detail-batch"), {"ids": str(self.user.id)})
+        data = json.loads(response.content)
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data[str(self.user.id)]["fields"]["email"], "detailbatchtester@gmail.com")
+
+    def test_post_list_prefetch_ids(self):
+        """test post list rows carry ids for prefetching"""
+        # execute
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertContains(response, 'data-post-id="{}"'.format(self.posts[0].id))
+
+
 class PostDeleteConfirmTest(TestCase):
     def setUp(self):
         """test post delete setup data"""
@@ -722,6 +1279,26 @@ class UserDetail(TestCase):
         # assertion
         self.assertEqual(response.status_code, 200)
 
+    @override_settings(QUERY_STATS_KEEP_SQL=True)
+    def test_user_detail_data(self):
+        """test user detail json with creator emails in one query"""
+        # prepare
+        self.client.login(email="userdetailtester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(
+            reverse("user-detail"), {"user_id": self.user.id})
+        data = json.loads(response.content)
+        user_queries = [sql for sql in response.wsgi_request.query_stats.sql
+                        if "posts_user" in sql and "django_session" not in sql]
+        # assertion
+        self.assertEqual(data["fields"]["email"], "tester1@gmail.com")
+        self.assertEqual(data["created_user_name"], "userdetailtester@gmail.com")
+        self.assertEqual(data["updated_user_name"], "userdetailtester@gmail.com")
+        self.assertEqual(data["profile"], "/media/path")
+        # one query for the logged in user, one for the detail.
+        self.assertEqual(len(user_queries), 2)
+        self.assertTrue(response.has_header("ETag"))
+
 class UserDeleteTest(TestCase):
     def setUp(self):
         """test user delete setup data"""
@@ -763,6 +1340,64 @@ class UserDeleteTest(TestCase):
         # assertion
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, "/users/")
+        self.assertTrue(User.objects.get(pk=self.user.id).is_deleted)
+
+
+class SoftDeleteViewTest(TestCase):
+    def setUp(self):
+        """soft deleted rows view test set up data"""
+        self.admin = User.objects.create_user(email="softdeleteadmin@gmail.com", password="12345")
+        self.admin.type = "0"
+        self.admin.save()
+        self.post = Post.objects.create(title="removed post", description="removed", user=self.admin,
+                                        created_user_id=self.admin.id)
+        self.post.soft_delete(self.admin.id)
+        self.client.login(email="softdeleteadmin@gmail.com", password="12345")
+
+    def test_post_detail_deleted(self):
+        """test detail of a soft deleted post is not found"""
+        # execute
+        response = self.client.get(reverse("post-detail"), {"post_id": self.post.id})
+        # assertion
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_update_deleted(self):
+        """test soft deleted post cannot be edited"""
+        # execute
+        response = self.client.get(reverse("post-update", kwargs={"pk": self.post.id}))
+        # assertion
+        self.assertEqual(response.status_code, 404)
+
+    def test_csv_download_skips_deleted(self):
+        """test csv download leaves soft deleted posts out"""
+        # prepare
+        Post.objects.create(title="kept post", description="kept", user=self.admin)
+        # execute
+        response = self.client.get(reverse("post-list-download"))
+        content = b"".join(response.streaming_content).decode()
+        # assertion
+        self.assertIn("kept post", content)
+        self.assertNotIn("removed post", content)
+
+    def test_login_deleted_user(self):
+        """test soft deleted user cannot log in"""
+        # prepare
+        self.client.logout()
+        self.admin.soft_delete(self.admin.id)
+        # execute
+        response = self.client.post(reverse("user_login"), {"email": "softdeleteadmin@gmail.com", "password": "12345"})
+        # assertion
+        self.assertEqual(str(list(get_messages(response.wsgi_request))[0]), "Email does not exist or deleted")
+
+    def test_admin_lists_live_rows(self):
+        """test admin change list leaves soft deleted posts out"""
+        # prepare
+        Post.objects.create(title="kept post", description="kept", user=self.admin)
+        # execute
+        response = self.client.get(reverse("admin:posts_post_changelist"))
+        # assertion
+        self.assertContains(response, "kept post")
+        self.assertNotContains(response, "removed post")
 
 
 class CsvDownloadTest(TestCase):
@@ -802,6 +1437,56 @@ class CsvDownloadTest(TestCase):
             reverse("post-list-download"))
         self.assertEqual(response.status_code, 200)
 
+    def test_csv_download_streaming(self):
+        """test csv download streams header and rows"""
+        self.client.login(
+            email="csvdownloadtester@gmail.com", password="12345")
+        response = self.client.get(
+            reverse("post-list-download"))
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["id", "title"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("detail test", lines[1])
+
+    @override_settings(CSV_EXPORT_CHUNK_SIZE=2)
+    def test_csv_download_streamed_queries_counted(self):
+        """test chunk queries of the streamed body count toward the request stats"""
+        # prepare
+        self.client.login(email="csvdownloadtester@gmail.com", password="12345")
+        user = User.objects.get(email="csvdownloadtester@gmail.com")
+        for i in range(4):
+            Post.objects.create(title="chunk post {}".format(i), description="chunk",
+                                user=user, created_user_id=user.id)
+        labels = {"view": "post-list-download"}
+        queries_before = REGISTRY.get_sample_value("bulletinboard_db_queries_sum", labels) or 0
+        # execute
+        response = self.client.get(reverse("post-list-download"))
+        counted = response.wsgi_request.query_stats.count
+        b"".join(response.streaming_content)
+        # assertion
+        stats = response.wsgi_request.query_stats
+        self.assertEqual(response.wsgi_request.query_budget_extra, 4)
+        self.assertEqual(stats.count, counted + 4)
+        self.assertEqual(REGISTRY.get_sample_value("bulletinboard_db_queries_sum", labels),
+                         queries_before + stats.count)
+
+    @override_settings(CSV_EXPORT_CHUNK_SIZE=2)
+    def test_csv_download_gzip(self):
+        """test gzip csv download across several chunks"""
+        user = User.objects.get(email="csvdownloadtester@gmail.com")
+        for i in range(4):
+            Post.objects.create(title="gzip {}".format(i), description="d",
+                                user=user, created_user_id=user.id)
+        self.client.login(
+            email="csvdownloadtester@gmail.com", password="12345")
+        response = self.client.get(
+            reverse("post-list-download"), {"gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn(".csv.gz", response["Content-Disposition"])
+        content = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+        self.assertEqual(len(content.splitlines()), 6)
+
 
 class UserPasswordResetTest(TestCase):
     def setUp(self):
@@ -940,6 +1625,252 @@ class CsvImportViewTest(TestCase):
             self.assertEqual(response.status_code, 302)
             self.assertEqual(response.url, reverse("index"))
 
+    @override_settings(CSV_IMPORT_BATCH_SIZE=2)
+    def test_csv_import_batches(self):
+        """test csv import inserts every row through batches and indexes them"""
+        # prepare
+        self.client.login(email="csvimporttester@gmail.com", password="12345")
+        rows = "title,description,status\n" + "".join(
+            "batch title {0},batch description {0},1\n".format(i) for i in range(5))
+        csv_file = SimpleUploadedFile("upload.csv", rows.encode("utf-8"), "text/csv")
+        # execute
+        response = self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.filter(title__startswith="batch title").count(), 5)
+        self.assertEqual(PostSearchTerm.objects.filter(term="batch").values("post").distinct().count(), 5)
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertTrue(messages[0].startswith("Imported 5 posts"))
+        self.assertIn("rows/s", messages[0])
+
+    @override_settings(CSV_IMPORT_BATCH_SIZE=2, QUERY_BUDGET_RAISE=True)
+    def test_csv_import_indexes_once(self):
+        """test csv import indexes every batch at once and is not refused by its budget"""
+        # prepare
+        self.client.login(email="csvimporttester@gmail.com", password="12345")
+        rows = "title,description,status\n" + "".join(
+            "batch title {0},batch description {0},1\n".format(i) for i in range(9))
+        csv_file = SimpleUploadedFile("upload.csv", rows.encode("utf-8"), "text/csv")
+        # execute
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        search_queries = [query["sql"].split()[0] for query in queries
+                          if "posts_postsearchterm" in query["sql"]]
+        self.assertEqual(search_queries, ["DELETE", "INSERT"])
+        self.assertEqual(PostSearchTerm.objects.filter(term="batch").count(), 9)
+
+    def test_csv_import_keeps_indexed_posts_once(self):
+        """test a post the importing user creates during the import keeps one set of terms"""
+        # prepare
+        user = User.objects.get(email="csvimporttester@gmail.com")
+        created = []
+
+        def create_post(rows):
+            # a post_create committed between two batches lands in the read back range.
+            if not created:
+                created.append(Post.objects.create(title="meanwhile", description="created meanwhile",
+                                                   user=user, created_user_id=user.id))
+                index_post(created[0])
+
+        rows = "title,description,status\nimported one,imported,1\nimported two,imported,1\n"
+        # execute
+        import_posts(io.BytesIO(rows.encode("utf-8")), user, 1, create_post)
+        # assertion
+        self.assertEqual(PostSearchTerm.objects.filter(post=created[0], term="meanwhile").count(), 1)
+        self.assertEqual(PostSearchTerm.objects.filter(term="imported").values("post").distinct().count(), 2)
+        self.assertEqual(PostSearchTerm.objects.filter(term="imported").count(), 2)
+
+    @override_settings(CSV_IMPORT_BATCH_SIZE=2)
+    def test_csv_import_malformed_row_rolls_back(self):
+        """test malformed row reports its line and imports nothing"""
+        # prepare
+        self.client.login(email="csvimporttester@gmail.com", password="12345")
+        rows = ("title,description,status\n"
+                "first,first description,1\n"
+                "second,second description,0\n"
+                "third,third description,1\n"
+                "fourth,broken,row,1\n")
+        csv_file = SimpleUploadedFile("upload.csv", rows.encode("utf-8"), "text/csv")
+        # execute
+        response = self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["err_message"], "Post upload csv must have 3 columns")
+        self.assertEqual(response.context["err_detail"], "Line 5: expected 3 columns, got 4")
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_csv_import_invalid_status(self):
+        """test csv import with non numeric status"""
+        # prepare
+        self.client.login(email="csvimporttester@gmail.com", password="12345")
+        rows = "title,description,status\nfirst,first description,active\n"
+        csv_file = SimpleUploadedFile("upload.csv", rows.encode("utf-8"), "text/csv")
+        # execute
+        response = self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+        # assertion
+        self.assertEqual(response.context["err_detail"], "Line 2: status 'active' is not a number")
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_csv_import_binary_file(self):
+        """test csv import with binary file"""
+        # prepare
+        self.client.login(email="csvimporttester@gmail.com", password="12345")
+        csv_file = SimpleUploadedFile("profile.png", b"\x89PNG\r\n\x1a\n\xff\xfe\x00", "image/png")
+        # execute
+        response = self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+        # assertion
+        self.assertEqual(response.context["err_message"], "Please choose csv format")
+
+
+@override_settings(CSV_IMPORT_BACKGROUND_MIN_BYTES=0, CSV_IMPORT_JOB_BACKEND="sync",
+                   MEDIA_ROOT=tempfile.gettempdir())
+class CsvImportJobViewTest(TestCase):
+    def setUp(self):
+        """test csv import job setup data"""
+        self.user = User.objects.create_user(
+            email="csvjobtester@gmail.com", password="12345")
+        self.client.login(email="csvjobtester@gmail.com", password="12345")
+
+    def upload(self, rows):
+        """upload csv rows"""
+        csv_file = SimpleUploadedFile("job.csv", rows.encode("utf-8"), "text/csv")
+        return self.client.post(reverse("csv-import"), {"csv_file": csv_file})
+
+    def test_csv_import_job_success(self):
+        """test upload creates a job and the progress endpoint reports it"""
+        # execute
+        response = self.upload("title,description,status\njob post,job description,1\n")
+        job = CsvImportJob.objects.get(user=self.user)
+        progress = json.loads(self.client.get(
+            reverse("csv-import-job", kwargs={"pk": job.id})).content)
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse("csv-import") + "?job={}".format(job.id))
+        self.assertEqual(progress["status"], "success")
+        self.assertTrue(progress["finished"])
+        self.assertEqual(progress["rows_processed"], 1)
+        self.assertTrue(Post.objects.filter(title="job post").exists())
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_csv_import_job_page(self):
+        """test csv import page shows the polled job"""
+        # prepare
+        self.upload("title,description,status\njob post,job description,1\n")
+        job = CsvImportJob.objects.get(user=self.user)
+        # execute
+        response = self.client.get(reverse("csv-import"), {"job": job.id})
+        # assertion
+        self.assertEqual(response.context["job"], job)
+        self.assertContains(response, reverse("csv-import-job", kwargs={"pk": job.id}))
+
+    def test_csv_import_job_failed(self):
+        """test malformed upload fails the job with line detail"""
+        # execute
+        self.upload("title,description,status\njob post,job description\n")
+        job = CsvImportJob.objects.get(user=self.user)
+        # assertion
+        self.assertEqual(job.status, CsvImportJob.STATUS_FAILED)
+        self.assertEqual(job.error_detail, "Line 2: expected 3 columns, got 2")
+        self.assertEqual(Post.objects.count(), 0)
+
+    def test_csv_import_job_other_user(self):
+        """test job progress is only visible to its owner"""
+        # prepare
+        self.upload("title,description,status\njob post,job description,1\n")
+        job = CsvImportJob.objects.get(user=self.user)
+        User.objects.create_user(email="csvjobother@gmail.com", password="12345")
+        self.client.login(email="csvjobother@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("csv-import-job", kwargs={"pk": job.id}))
+        # assertion
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CSV_IMPORT_BACKGROUND_MIN_BYTES=0, CSV_IMPORT_JOB_BACKEND="queue",
+                   MEDIA_ROOT=tempfile.gettempdir())
+class CsvImportJobCommandTest(TransactionTestCase):
+    def test_run_import_jobs(self):
+        """test queued jobs are processed by the worker command"""
+        # prepare
+        User.objects.create_user(email="csvjobworker@gmail.com", password="12345")
+        self.client.login(email="csvjobworker@gmail.com", password="12345")
+        for i in range(3):
+            rows = "title,description,status\nqueued {0},queued description,1\n".format(i)
+            self.client.post(reverse("csv-import"), {
+                "csv_file": SimpleUploadedFile("job.csv", rows.encode("utf-8"), "text/csv")})
+        self.assertEqual(CsvImportJob.objects.filter(status="pending").count(), 3)
+        # execute
+        call_command("run_import_jobs", "--once", "--workers", "1", stdout=io.StringIO())
+        # assertion
+        self.assertEqual(CsvImportJob.objects.filter(status="success").count(), 3)
+        self.assertEqual(Post.objects.filter(title__startswith="queued").count(), 3)
+
+    def test_run_import_jobs_requeues_stale(self):
+        """test a job without a recent heartbeat is requeued and imported, a slow live one is not"""
+        # prepare
+        user = User.objects.create_user(email="csvjobstale@gmail.com", password="12345")
+        long_ago = timezone.now() - datetime.timedelta(hours=2)
+        job = CsvImportJob.objects.create(
+            user=user, file_path=store_upload(SimpleUploadedFile(
+                "stale.csv", b"title,description,status\nstale post,stale description,1\n")),
+            status=CsvImportJob.STATUS_RUNNING, rows_processed=5,
+            started_at=long_ago, heartbeat_at=long_ago)
+        fresh = CsvImportJob.objects.create(
+            user=user, file_path="slow.csv", status=CsvImportJob.STATUS_RUNNING,
+            started_at=long_ago, heartbeat_at=timezone.now())
+        out = io.StringIO()
+        # execute
+        call_command("run_import_jobs", "--once", "--workers", "1", "--timeout", "3600", stdout=out)
+        # assertion
+        self.assertIn("Requeued 1 stale jobs.", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, CsvImportJob.STATUS_SUCCESS)
+        self.assertEqual(job.rows_processed, 1)
+        self.assertEqual(CsvImportJob.objects.get(pk=fresh.pk).status, CsvImportJob.STATUS_RUNNING)
+
+    def test_progress_written_outside_import_transaction(self):
+        """test progress is written to the job row by a connection of its own"""
+        # prepare
+        user = User.objects.create_user(email="csvjobprogress@gmail.com", password="12345")
+        job = CsvImportJob.objects.create(user=user, file_path="progress.csv",
+                                          status=CsvImportJob.STATUS_RUNNING, started_at=timezone.now())
+        progress = ProgressWriter(job.id, job.started_at)
+        stale = ProgressWriter(job.id, job.started_at - datetime.timedelta(hours=1))
+        # SQLite runs without one, the import transaction holds its only writer.
+        progress.connection = connections.create_connection("default")
+        stale.connection = connections.create_connection("default")
+        # execute
+        progress(1000)
+        stale(5)
+        progress.close()
+        stale.close()
+        # assertion
+        job.refresh_from_db()
+        self.assertEqual(job_progress(job)["rows_processed"], 1000)
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_requeued_job_rolls_back(self):
+        """test a worker whose job was requeued meanwhile rolls its import back"""
+        # prepare
+        user = User.objects.create_user(email="csvjoblost@gmail.com", password="12345")
+        job = CsvImportJob.objects.create(user=user, file_path=store_upload(SimpleUploadedFile(
+            "lost.csv", b"title,description,status\nlost post,lost description,1\n")))
+
+        def requeue_and_reclaim(rows):
+            requeue_stale_jobs(-60)
+            claim_job(job.id)
+
+        # execute
+        with mock.patch("posts.import_jobs.ProgressWriter.__call__", side_effect=requeue_and_reclaim):
+            run_job(job.id)
+        # assertion
+        job.refresh_from_db()
+        self.assertEqual(job.status, CsvImportJob.STATUS_RUNNING)
+        self.assertFalse(Post.objects.filter(title="lost post").exists())
+        self.assertTrue(os.path.exists(job.file_path))
+
 
 class UserEditViewTest(TestCase):
     def setUp(self):
@@ -1027,9 +1958,6 @@ class UserEditViewTest(TestCase):
         """test user edit form form cancel"""
         # prepare
         self.client.login(email="useredittester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session.save()
         self.client.get(reverse('user-update', kwargs={'pk': self.user.id}))
         with open(str(settings.BASE_DIR)+"\\media\\test\\user_default.png", "rb") as profile:
             # execute
@@ -1057,15 +1985,13 @@ class UserEditViewTest(TestCase):
         # prepare
         self.client.login(
             email="useredittester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = True
-        session["profile"] = "aaaaa.png"
-        session.save()
+        token = confirm_token(self.user, "user-update:{}".format(self.user.id), profile="aaaaa.png")
         # execute
         res = self.client.post(
             reverse('user-update', kwargs={'pk': self.user.id}),
             {
                 "_save": True,
+                "confirm_token": token,
                 "name": "test name",
                 "email": "useredittester@gmail.com",
                 "type": "0",
@@ -1082,15 +2008,13 @@ class UserEditViewTest(TestCase):
         # prepare
         self.client.login(
             email="useredittester@gmail.com", password="12345")
-        session = self.client.session
-        session["profile"] = ""
-        session["create_update_confirm_page_flag"] = True
-        session.save()
+        token = confirm_token(self.user, "user-update:{}".format(self.user.id), profile="")
         # execute
         response = self.client.post(
             reverse('user-update', kwargs={'pk': self.user.id}),
             {
                 "_save": True,
+                "confirm_token": token,
                 "name": "test name",
                 "email": "useredittester@gmail.com",
                 "type": "0",
@@ -1106,9 +2030,6 @@ class UserEditViewTest(TestCase):
         """test user edit with image"""
         # prepare
         self.client.login(email="useredittester@gmail.com", password="12345")
-        session = self.client.session
-        session["create_update_confirm_page_flag"] = False
-        session.save()
         with open(str(settings.BASE_DIR)+"\\media\\test\\user_default.png", "rb") as profile:
             # execute
             res = self.client.post(
@@ -1127,14 +2048,13 @@ class UserEditViewTest(TestCase):
             self.assertEqual(res.status_code, 200)
 
             # prepare
-            session["create_update_confirm_page_flag"] = True
-            session["profile"] = "user_default.png"
-            session.save()
+            token = confirm_token(self.user, "user-update:{}".format(self.user.id), profile="user_default.png")
             # execute
             res = self.client.post(
                 reverse('user-update', kwargs={'pk': self.user.id}),
                 {
                     "_save": True,
+                    "confirm_token": token,
                     "name": "test name",
                     "email": "useredittester@gmail.com",
                     "type": "0",
@@ -1145,4 +2065,789 @@ class UserEditViewTest(TestCase):
             # assertion
             self.assertEqual(res.status_code, 302)
             self.assertEqual(User.objects.count(), 1)
-            self.assertRedirects(res, reverse("user-list"))
\ No newline at end of file
+            self.assertRedirects(res, reverse("user-list"))
+
+
+class QueryBudgetViewTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        """query budget set up data"""
+        self.admin = User.objects.create_user(
+            email="querybudgettester@gmail.com", password="12345")
+        self.admin.type = "0"
+        self.admin.save()
+
+    def check_views(self):
+        """request each read view and assert its query budget"""
+        self.client.login(email="querybudgettester@gmail.com", password="12345")
+        post = Post.objects.order_by("id").first()
+        requests = [
+            (reverse("index"), {}),
+            (reverse("user-list"), {}),
+            (reverse("post-detail"), {"post_id": post.id}),
+            (reverse("user-detail"), {"user_id": self.admin.id}),
+            (reverse("user-profile"), {}),
+            (reverse("post-create"), {}),
+            (reverse("post-update", kwargs={"pk": post.id}), {}),
+            (reverse("user-update", kwargs={"pk": self.admin.id}), {}),
+            (reverse("csv-import"), {}),
+            (reverse("post-list-download"), {}),
+        ]
+        for url, params in requests:
+            with self.subTest(url=url):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinQueryBudget(response)
+        response = self.client.post(reverse("index"), {"keyword": "budget"})
+        self.assertWithinQueryBudget(response)
+        response = self.client.post(reverse("user-list"), {
+            "name": "budget", "email": "", "from_date": "", "to_date": ""})
+        self.assertWithinQueryBudget(response)
+
+    @override_settings(QUERY_STATS_KEEP_SQL=False)
+    def test_query_stats_without_sql(self):
+        """test request query stats count queries without keeping their sql"""
+        # prepare
+        self.client.login(email="querybudgettester@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("user-profile"))
+        # assertion
+        self.assertGreater(response.wsgi_request.query_stats.count, 0)
+        self.assertEqual(response.wsgi_request.query_stats.sql, [])
+
+    @override_settings(QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={"index": {"queries": 0}})
+    def test_budget_raise_only_safe_methods(self):
+        """test an unsafe request over budget is logged, a safe one raises"""
+        # prepare
+        self.client.login(email="querybudgettester@gmail.com", password="12345")
+        # execute
+        with self.assertLogs("posts.query_budget", "WARNING"):
+            response = self.client.post(reverse("index"), {"keyword": "budget"})
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("index"))
+
+    def test_views_within_budget_10_rows(self):
+        """test views stay within query budget with 10 rows"""
+        seed_rows(self.admin, 10)
+        self.check_views()
+
+    def test_views_within_budget_10000_rows(self):
+        """test views stay within query budget with 10,000 rows"""
+        seed_rows(self.admin, 10000)
+        self.check_views()
+
+
+class StaticAssetTest(TestCase):
+    def setUp(self):
+        """static asset test set up data"""
+        test_user = User.objects.create_user(
+            email="assettester@gmail.com", password="12345")
+        test_user.type = "0"
+        test_user.save()
+        self.client.login(email="assettester@gmail.com", password="12345")
+
+    def test_source_files_without_timestamp(self):
+        """test pages link local source files without per request query string"""
+        # execute
+        response = self.client.get(reverse("index"))
+        content = response.content.decode("utf-8")
+        # assertion
+        self.assertIn('href="/static/vendor/bootstrap/css/bootstrap.min.css"', content)
+        self.assertIn('src="/static/vendor/jquery/jquery.min.js"', content)
+        self.assertIn('href="/static/css/post_list.css"', content)
+        self.assertIn('href="/static/css/delete_dialog.css"', content)
+        self.assertNotIn("bootstrapcdn", content)
+        self.assertNotIn("googleapis", content)
+        self.assertIsNone(re.search(r"\.(css|js)\?", content))
+
+    @override_settings(ASSET_BUNDLES_ENABLED=True)
+    def test_bundles_enabled(self):
+        """test pages link one base and one page bundle"""
+        # execute
+        response = self.client.get(reverse("user-list"))
+        content = response.content.decode("utf-8")
+        # assertion
+        self.assertIn('href="/static/bundles/base.css"', content)
+        self.assertIn('src="/static/bundles/base.js"', content)
+        self.assertIn('href="/static/bundles/users_list.css"', content)
+        self.assertIn('src="/static/bundles/users_list.js"', content)
+        self.assertNotIn("/static/css/", content)
+        self.assertNotIn("/static/js/", content)
+
+    def test_minify(self):
+        """test css and js minification keeps strings and rewrites urls"""
+        # execute
+        css = assets.minify_css(assets.rewrite_css_urls(
+            'a { content: "x , y"; /* note */ background: url(\'../fonts/f.woff?#x\') ; }',
+            "vendor/lib/css/lib.css"))
+        js = assets.minify_js("var a = 'x // y';\n  // comment\n\n    var r = /a\\/b/g;\n"
+                              "/*\n * block\n */\nfunction f(x) {\n    return /\\/\\//.test(x); // slashes\n}\n")
+        # assertion
+        self.assertEqual(css, 'a{content:"x , y"; background:url("../vendor/lib/fonts/f.woff?#x")}')
+        self.assertEqual(js, "var a = 'x // y';\nvar r = /a\\/b/g;\nfunction f(x) {\n"
+                             "return /\\/\\//.test(x); // slashes\n}")
+
+    def test_build_and_serve_hashed_bundles(self):
+        """test built bundles are fingerprinted and served with immutable caching"""
+        # prepare
+        with tempfile.TemporaryDirectory() as root:
+            output = os.path.join(root, "bundles")
+            static_root = os.path.join(root, "collected")
+            with override_settings(
+                    ASSET_BUNDLES_OUTPUT=output,
+                    STATICFILES_DIRS=[("bundles", output)],
+                    STATIC_ROOT=static_root,
+                    STATICFILES_STORAGE="django.contrib.staticfiles.storage.ManifestStaticFilesStorage"):
+                call_command("build_assets", stdout=io.StringIO())
+                call_command("collectstatic", interactive=False, verbosity=0)
+                hashed = assets.staticfiles_storage.stored_name("bundles/base.css")
+                # execute
+                request = RequestFactory().get("/static/" + hashed)
+                response = assets.serve(request, hashed)
+                plain_response = assets.serve(request, "bundles/base.css")
+                with open(os.path.join(static_root, hashed), encoding="utf-8") as bundle:
+                    css = bundle.read()
+                # assertion
+                self.assertNotEqual(hashed, "bundles/base.css")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+                self.assertEqual(plain_response["Cache-Control"], "public, no-cache")
+                self.assertRegex(css, r"\.\./vendor/bootstrap/fonts/glyphicons-halflings-regular\.[0-9a-f]{12}\.woff2")
+
+
+class ProfileImageTest(TestCase):
+    def setUp(self):
+        """profile image test set up data"""
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        os.makedirs(os.path.join(self.media_root.name, "temp"))
+        self.user = User.objects.create_user(
+            email="imagetester@gmail.com", password="12345")
+        self.user.type = "0"
+        self.user.save()
+
+    def image_bytes(self, size, image_format="JPEG", **options):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (200, 30, 30)).save(buffer, image_format, **options)
+        return buffer.getvalue()
+
+    def test_profile_derivatives(self):
+        """test promoted profile is stripped and resized into derivatives"""
+        # prepare
+        exif = Image.Exif()
+        exif[0x010f] = "test camera"
+        with open(os.path.join(self.media_root.name, "temp", "photo.jpg"), "wb") as upload:
+            upload.write(self.image_bytes((1200, 800), exif=exif.tobytes()))
+        # execute
+        with self.settings(MEDIA_ROOT=self.media_root.name):
+            handle_uploaded_file("photo.jpg")
+            thumb_url = profile_url("photo.jpg", "thumb")
+            webp_url = profile_url("photo.jpg", "medium", webp=True)
+            self.user.profile = "photo.jpg"
+            self.user.save()
+            self.client.login(email="imagetester@gmail.com", password="12345")
+            response = self.client.get(reverse("user-profile"))
+        # assertion
+        with Image.open(os.path.join(self.media_root.name, "photo.jpg")) as original:
+            self.assertNotIn("exif", original.info)
+        with Image.open(os.path.join(self.media_root.name, "profiles", "photo_thumb.jpg")) as thumb:
+            self.assertEqual(thumb.size, (200, 133))
+        self.assertEqual(thumb_url, "/media/profiles/photo_thumb.jpg")
+        self.assertEqual(webp_url, "/media/profiles/photo_medium.webp")
+        self.assertEqual(response.context["profile"], "/media/profiles/photo_medium.jpg")
+
+    def test_profile_without_derivatives(self):
+        """test profiles stored before derivatives resolve to the original"""
+        # execute
+        with self.settings(MEDIA_ROOT=self.media_root.name):
+            # assertion
+            self.assertEqual(profile_url("/media/old.png", "medium"), "/media/old.png")
+            self.assertEqual(profile_url("/user_default.png", "thumb"), "/media/user_default.png")
+            self.assertEqual(profile_url("old.png", "medium", webp=True), "")
+
+    @override_settings(PROFILE_IMAGE_MAX_PIXELS=10000)
+    def test_reject_decompression_bomb(self):
+        """test profile with too many pixels is rejected"""
+        # prepare
+        upload = SimpleUploadedFile("big.png", self.image_bytes((200, 200), "PNG"), "image/png")
+        # execute
+        form = UserEditForm({"name": "a", "email": "a@a.com", "address": "a"}, {"profile": upload})
+        # assertion
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["profile"], ["Profile image is too large"])
+
+    def test_reject_not_image(self):
+        """test profile which is not an image is rejected"""
+        # prepare
+        upload = SimpleUploadedFile("fake.png", b"not an image", "image/png")
+        # execute
+        form = UserEditForm({"name": "a", "email": "a@a.com", "address": "a"}, {"profile": upload})
+        # assertion
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["profile"], ["Profile must be a jpeg, png, gif or webp image"])
+
+
+class MediaStorageTest(TestCase):
+    def setUp(self):
+        """media storage test set up data"""
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.user = User.objects.create_user(
+            email="storagetester@gmail.com", password="12345")
+
+    def test_save_temp_deduplicates(self):
+        """test identical uploads share one temp file named by content hash"""
+        # execute
+        with self.settings(MEDIA_ROOT=self.media_root.name):
+            first = save_temp(SimpleUploadedFile("me.PNG", b"same bytes"))
+            second = save_temp(SimpleUploadedFile("other.png", b"same bytes"))
+            third = save_temp(SimpleUploadedFile("me.png", b"other bytes"))
+        # assertion
+        self.assertEqual(first, hashlib.sha256(b"same bytes").hexdigest() + ".png")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.media_root.name, "temp"))), sorted([first, third]))
+
+    def test_promote_stored_content(self):
+        """test promoting content which is already stored keeps the stored file"""
+        # prepare
+        with open(os.path.join(self.media_root.name, "stored.png"), "wb") as stored:
+            stored.write(b"stored")
+        # execute
+        with self.settings(MEDIA_ROOT=self.media_root.name):
+            handle_uploaded_file("stored.png")
+        # assertion
+        with open(os.path.join(self.media_root.name, "stored.png"), "rb") as stored:
+            self.assertEqual(stored.read(), b"stored")
+
+    def test_csv_upload_per_job(self):
+        """test every import upload gets a file of its own, deleted with its job"""
+        # prepare
+        with self.settings(MEDIA_ROOT=self.media_root.name):
+            path = store_upload(SimpleUploadedFile("a.csv", b"title,description,status\n"))
+            same_path = store_upload(SimpleUploadedFile("b.csv", b"title,description,status\n"))
+        first = CsvImportJob.objects.create(user=self.user, file_path=path, status=CsvImportJob.STATUS_SUCCESS)
+        # execute
+        release_upload(first)
+        # assertion
+        self.assertNotEqual(path, same_path)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(same_path))
+
+
+class MediaServeTest(TestCase):
+    def setUp(self):
+        """media serve test set up data"""
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.content = b"0123456789"
+        self.name = hashlib.sha256(self.content).hexdigest() + ".png"
+        for name in (self.name, "plain.txt", "imports/upload.csv"):
+            os.makedirs(os.path.dirname(os.path.join(self.media_root.name, name)), exist_ok=True)
+            with open(os.path.join(self.media_root.name, name), "wb") as media_file:
+                media_file.write(self.content)
+        override = self.settings(MEDIA_ROOT=self.media_root.name, MEDIA_SENDFILE="")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_serve_content_addressed(self):
+        """test content addressed media is cached for a year with its hash as etag"""
+        # execute
+        response = self.client.get("/media/" + self.name)
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["ETag"], '"{}"'.format(self.name[:64]))
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_serve_not_modified(self):
+        """test matching If-None-Match answers 304"""
+        # prepare
+        etag = self.client.get("/media/plain.txt")["ETag"]
+        # execute
+        response = self.client.get("/media/plain.txt", HTTP_IF_NONE_MATCH=etag)
+        # assertion
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_serve_range(self):
+        """test byte ranges, suffix ranges, unsatisfiable ranges and If-Range"""
+        # execute
+        partial = self.client.get("/media/plain.txt", HTTP_RANGE="bytes=2-5")
+        suffix = self.client.get("/media/plain.txt", HTTP_RANGE="bytes=-3")
+        unsatisfiable = self.client.get("/media/plain.txt", HTTP_RANGE="bytes=20-")
+        stale = self.client.get("/media/plain.txt", HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"old"')
+        # assertion
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b"".join(partial.streaming_content), b"2345")
+        self.assertEqual(partial["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(suffix.streaming_content), b"789")
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], "bytes */10")
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_serve_accel_redirect(self):
+        """test transfer is handed to the front proxy"""
+        # execute
+        response = self.client.get("/media/" + self.name)
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.name)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Type"], "image/png")
+
+    def test_serve_private_and_missing(self):
+        """test import uploads, traversal and missing files are not served"""
+        # execute
+        private = self.client.get("/media/imports/upload.csv")
+        traversal = self.client.get("/media/../settings.py")
+        missing = self.client.get("/media/missing.png")
+        # assertion
+        self.assertEqual(private.status_code, 404)
+        self.assertEqual(traversal.status_code, 404)
+        self.assertEqual(missing.status_code, 404)
+
+
+class QueryPlanTest(TestCase):
+    def setUp(self):
+        """query plan test set up data"""
+        cache.clear()
+        self.admin = User.objects.create_user(email="planadmin@gmail.com", password="12345")
+        self.admin.type = "0"
+        self.admin.save()
+        self.member = User.objects.create_user(email="planuser@gmail.com", password="12345")
+        self.member.type = "1"
+        self.member.save()
+        seed_rows(self.admin, 2000)
+        User.objects.filter(email__startswith="budgetuser", id__gt=self.member.id + 1800).update(
+            created_user_id=self.member.id)
+
+    def assertNoFullScans(self, requests):
+        """
+        run requests, EXPLAIN every select they sent and fail on full table scans.
+        Param requests list of callables sending one request.
+        """
+        with CaptureQueriesContext(connection) as context:
+            for send in requests:
+                send()
+        selects = [query["sql"] for query in context.captured_queries
+                   if query["sql"].startswith("SELECT") and "django_session" not in query["sql"]]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(full_scans(connection, sql), [], sql)
+
+    def test_list_queries_use_indexes(self):
+        """test post and user list queries of admin and user roles avoid full scans"""
+        search = {"name": "", "email": "", "from_date": "2020-01-01", "to_date": "2030-01-01"}
+        for email in ("planadmin@gmail.com", "planuser@gmail.com"):
+            cache.clear()
+            self.client.login(email=email, password="12345")
+            self.assertNoFullScans([
+                lambda: self.client.get(reverse("index")),
+                lambda: self.client.get(reverse("index"), {"page": 3}),
+                lambda: self.client.get(reverse("user-list")),
+                lambda: self.client.post(reverse("user-list"), search),
+            ])
+
+    def test_login_query_uses_index(self):
+        """test login lookups avoid full scans"""
+        self.assertNoFullScans([
+            lambda: self.client.post(reverse("user_login"), {"email": "planuser@gmail.com", "password": "12345"}),
+        ])
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_seed_bulletinboard(self):
+        """test seed command creates users and posts with the requested mix"""
+        # execute
+        call_command("seed_bulletinboard", users=20, posts=50, admin_ratio=1, deleted_ratio=0,
+                     batch_size=15, stdout=io.StringIO())
+        # assertion
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(User.alive.filter(type="0").count(), 20)
+        self.assertEqual(Post.alive.count(), 50)
+        self.assertTrue(all(len(post.description) <= 255 for post in Post.objects.all()))
+        self.assertTrue(PostSearchTerm.objects.exists())
+
+    def test_seed_bulletinboard_creators(self):
+        """test seed command spreads seeded users over the seeded admins"""
+        # execute
+        call_command("seed_bulletinboard", users=40, posts=0, admin_ratio=0.25, deleted_ratio=0,
+                     stdout=io.StringIO())
+        # assertion
+        admins = set(User.objects.filter(type="0").values_list("id", flat=True))
+        creators = set(User.objects.values_list("created_user_id", flat=True))
+        self.assertTrue(creators <= admins)
+        self.assertGreater(len(creators), 1)
+
+    def test_seed_bulletinboard_deleted(self):
+        """test seed command soft deletes the requested share"""
+        # execute
+        call_command("seed_bulletinboard", users=10, posts=30, deleted_ratio=1, stdout=io.StringIO())
+        # assertion
+        self.assertEqual(Post.alive.count(), 0)
+        self.assertEqual(Post.all_with_deleted.deleted().count(), 30)
+        self.assertFalse(PostSearchTerm.objects.exists())
+
+    def test_bench_report(self):
+        """test bench writes a json report of every scenario"""
+        # prepare
+        call_command("seed_bulletinboard", users=10, posts=30, admin_ratio=1, deleted_ratio=0,
+                     stdout=io.StringIO())
+        output = os.path.join(tempfile.mkdtemp(), "bench.json")
+        # execute
+        call_command("bench", requests=2, warmup=0, import_rows=3, output=output, stderr=io.StringIO())
+        with open(output) as report_file:
+            report = json.load(report_file)
+        # assertion
+        self.assertEqual(report["rows"], {"users": 10, "posts": 30})
+        self.assertEqual(set(report["scenarios"]), {
+            "index", "index_search", "index_deep_page", "user_list",
+            "post_detail", "download_post_list_csv", "csv_import"})
+        for result in report["scenarios"].values():
+            self.assertEqual(result["requests"], 2)
+            self.assertGreater(result["queries"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+        self.assertEqual(Post.objects.count(), 30)
+
+    async def test_bench_asgi_read_response(self):
+        """test the load test client reads sized and chunked responses off one connection"""
+        # prepare
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello"
+                         b"HTTP/1.1 404 Not Found\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+                         b"3\r\nabc\r\n0\r\n\r\n")
+        # execute
+        first = await read_response(reader)
+        second = await read_response(reader)
+        # assertion
+        self.assertEqual(first, (200, True))
+        self.assertEqual(second, (404, False))
+
+
+class RequestProfilingTest(TestCase):
+    def setUp(self):
+        """request profiling test set up data"""
+        self.profile_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(REQUEST_PROFILE_DIR=self.profile_dir, REQUEST_PROFILE_KEEP=2)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.admin = User.objects.create_user(email="profileadmin@gmail.com", password="12345")
+        self.admin.type = "0"
+        self.admin.save()
+        self.member = User.objects.create_user(email="profileuser@gmail.com", password="12345")
+        self.member.type = "1"
+        self.member.save()
+
+    def test_profile_by_query_flag(self):
+        """test admin request with query flag writes a pstats profile"""
+        # prepare
+        self.client.login(email="profileadmin@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("user-list"), {"_profile": "1"})
+        # assertion
+        name = response["X-Profile-Name"]
+        self.assertIn("-user-list-", name)
+        stats = pstats.Stats(os.path.join(self.profile_dir, name))
+        self.assertTrue(any("render" in function for file_name, line, function in stats.stats))
+
+    def test_profile_by_header(self):
+        """test admin request with header writes a profile"""
+        # prepare
+        self.client.login(email="profileadmin@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("index"), HTTP_X_PROFILE="1")
+        # assertion
+        self.assertEqual(os.listdir(self.profile_dir), [response["X-Profile-Name"]])
+
+    def test_profile_not_requested_or_not_admin(self):
+        """test requests without flag or from non admins are not profiled"""
+        # execute
+        self.client.login(email="profileadmin@gmail.com", password="12345")
+        plain = self.client.get(reverse("index"))
+        self.client.login(email="profileuser@gmail.com", password="12345")
+        member = self.client.get(reverse("index"), {"_profile": "1"})
+        # assertion
+        self.assertFalse(plain.has_header("X-Profile-Name"))
+        self.assertFalse(member.has_header("X-Profile-Name"))
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_profile_rotation(self):
+        """test only the newest REQUEST_PROFILE_KEEP profiles are kept"""
+        # prepare
+        self.client.login(email="profileadmin@gmail.com", password="12345")
+        # execute
+        names = [self.client.get(reverse("index"), {"_profile": "1"})["X-Profile-Name"] for i in range(3)]
+        # assertion
+        self.assertEqual(sorted(os.listdir(self.profile_dir)), names[1:])
+
+    def test_profile_admin_page(self):
+        """test admin page lists and downloads profiles"""
+        # prepare
+        self.client.login(email="profileadmin@gmail.com", password="12345")
+        name = self.client.get(reverse("index"), {"_profile": "1"})["X-Profile-Name"]
+        # execute
+        response = self.client.get(reverse("request-profiles"))
+        download = self.client.get(reverse("request-profile-download", args=[name]))
+        # assertion
+        self.assertContains(response, name)
+        self.assertEqual(download["Content-Disposition"], 'attachment; filename="{}"'.format(name))
+        with open(os.path.join(self.profile_dir, name), "rb") as profile_file:
+            self.assertEqual(b"".join(download.streaming_content), profile_file.read())
+
+    def test_profile_admin_page_forbidden(self):
+        """test non admins cannot list or download profiles"""
+        # prepare
+        self.client.login(email="profileuser@gmail.com", password="12345")
+        # execute
+        response = self.client.get(reverse("request-profiles"))
+        download = self.client.get(reverse("request-profile-download", args=["settings.py"]))
+        # assertion
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(download.status_code, 404)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        """metrics test set up data"""
+        self.user = User.objects.create_user(email="metricstester@gmail.com", password="12345")
+        self.user.type = "0"
+        self.user.save()
+
+    def sample(self, name, labels):
+        """current value of one metric sample, 0 when not recorded yet"""
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_metrics(self):
+        """test latency, query, template and size metrics of a view"""
+        # prepare
+        self.client.login(email="metricstester@gmail.com", password="12345")
+        labels = {"view": "index"}
+        before = {name: self.sample(name, labels) for name in (
+            "bulletinboard_db_queries_sum", "bulletinboard_template_seconds_sum",
+            "bulletinboard_response_bytes_sum")}
+        count = self.sample("bulletinboard_request_latency_seconds_count", {"view": "index", "method": "GET"})
+        # execute
+        response = self.client.get(reverse("index"))
+        # assertion
+        self.assertEqual(self.sample("bulletinboard_request_latency_seconds_count",
+                                     {"view": "index", "method": "GET"}), count + 1)
+        self.assertGreater(self.sample("bulletinboard_db_queries_sum", labels),
+                           before["bulletinboard_db_queries_sum"])
+        self.assertGreater(self.sample("bulletinboard_template_seconds_sum", labels),
+                           before["bulletinboard_template_seconds_sum"])
+        self.assertEqual(self.sample("bulletinboard_response_bytes_sum", labels),
+                         before["bulletinboard_response_bytes_sum"] + len(response.content))
+
+    def test_event_metrics(self):
+        """test login and post create write paths count business events"""
+        # prepare
+        failed = self.sample("bulletinboard_events_total", {"event": "login_failed"})
+        succeeded = self.sample("bulletinboard_events_total", {"event": "login_succeeded"})
+        # execute
+        self.client.post(reverse("user_login"), {"email": "metricstester@gmail.com", "password": "wrong"})
+        self.client.post(reverse("user_login"), {"email": "metricstester@gmail.com", "password": "12345"})
+        # assertion
+        self.assertEqual(self.sample("bulletinboard_events_total", {"event": "login_failed"}), failed + 1)
+        self.assertEqual(self.sample("bulletinboard_events_total", {"event": "login_succeeded"}), succeeded + 1)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=True)
+    def test_metrics_endpoint(self):
+        """test metrics are exposed in prometheus text format"""
+        # execute
+        self.client.get(reverse("user_login"))
+        response = self.client.get(reverse("metrics"))
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b'bulletinboard_request_latency_seconds_bucket{le="0.005",method="GET",view="user_login"}',
+                      response.content)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_token(self):
+        """test metrics endpoint requires the bearer token when set"""
+        # execute
+        denied = self.client.get(reverse("metrics"))
+        allowed = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        # assertion
+        self.assertEqual(denied.status_code, 403)
+        self.assertEqual(allowed.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_metrics_endpoint_without_token(self):
+        """test metrics endpoint is not exposed without a token outside debug"""
+        # execute
+        response = self.client.get(reverse("metrics"))
+        # assertion
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_multiprocess(self):
+        """test counters of several worker processes are added up"""
+        # prepare
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp())
+        setup = "import django; django.setup(); from posts import metrics; "
+        # execute
+        for i in range(2):
+            subprocess.run([sys.executable, "-c", setup + "metrics.record_event('post_created')"],
+                           env=env, check=True, cwd=settings.BASE_DIR)
+        output = subprocess.run(
+            [sys.executable, "-c", setup + "from prometheus_client import generate_latest; "
+             "print(generate_latest(metrics.get_registry()).decode())"],
+            env=env, check=True, cwd=settings.BASE_DIR, capture_output=True, text=True).stdout
+        # assertion
+        self.assertIn('bulletinboard_events_total{event="post_created"} 2.0', output)
+
+
+class ConfirmTokenTest(TestCase):
+    def setUp(self):
+        """confirm token test set up data"""
+        self.user = User.objects.create_user(email="confirmtester@gmail.com", password="12345")
+        self.user.type = "0"
+        self.user.save()
+        self.posts = [Post.objects.create(title="tab post {}".format(i), description="tab", status=1,
+                                          user=self.user, created_user_id=self.user.id) for i in range(2)]
+        self.client.login(email="confirmtester@gmail.com", password="12345")
+
+    def session_writes(self, send):
+        """send a request and return the session table writes it made"""
+        with CaptureQueriesContext(connection) as context:
+            send()
+        return [query["sql"] for query in context.captured_queries
+                if "django_session" in query["sql"] and not query["sql"].startswith("SELECT")]
+
+    def test_form_pages_write_no_session(self):
+        """test form pages and confirm steps make no session writes"""
+        # prepare
+        post = self.posts[0]
+        sends = [
+            lambda: self.client.get(reverse("post-create")),
+            lambda: self.client.get(reverse("post-update", kwargs={"pk": post.id})),
+            lambda: self.client.get(reverse("user-create")),
+            lambda: self.client.get(reverse("user-update", kwargs={"pk": self.user.id})),
+            lambda: self.client.post(reverse("post-create"), {"_save": True, "title": "t", "description": "d"}),
+        ]
+        for send in sends:
+            # execute
+            writes = self.session_writes(send)
+            # assertion
+            self.assertEqual(writes, [])
+
+    def test_post_create_two_steps(self):
+        """test post create confirms with the token of the confirm page"""
+        # execute
+        confirm = self.client.post(reverse("post-create"), {"_save": True, "title": "two step", "description": "d"})
+        token = confirm.context["confirm_token"]
+        response = self.client.post(reverse("post-create"), {
+            "_save": True, "title": "two step", "description": "d", "confirm_token": token})
+        # assertion
+        self.assertTrue(confirm.context["create_update_confirm_page_flag"])
+        self.assertContains(confirm, 'name="confirm_token" value="{}"'.format(token))
+        self.assertRedirects(response, reverse("index"))
+        self.assertTrue(Post.objects.filter(title="two step").exists())
+
+    def test_tampered_or_foreign_token(self):
+        """test tampered tokens and tokens of other forms or users do not confirm"""
+        # prepare
+        other = User.objects.create_user(email="confirmother@gmail.com", password="12345")
+        tokens = [
+            confirm_token(self.user, "post-create")[:-1] + "x",
+            confirm_token(self.user, "post-update:{}".format(self.posts[0].id)),
+            confirm_token(other, "post-create"),
+        ]
+        for token in tokens:
+            # execute
+            response = self.client.post(reverse("post-create"), {
+                "_save": True, "title": "forged", "description": "d", "confirm_token": token})
+            # assertion
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context["create_update_confirm_page_flag"])
+        self.assertFalse(Post.objects.filter(title="forged").exists())
+
+    def test_post_update_in_two_tabs(self):
+        """test two posts edited in parallel tabs keep their own pending status"""
+        # prepare
+        first, second = self.posts
+        confirm_first = self.client.post(reverse("post-update", kwargs={"pk": first.id}), {
+            "_save": True, "title": "first", "description": "d", "status": "on"})
+        confirm_second = self.client.post(reverse("post-update", kwargs={"pk": second.id}), {
+            "_save": True, "title": "second", "description": "d"})
+        # execute
+        for post, confirm, title in ((first, confirm_first, "first"), (second, confirm_second, "second")):
+            self.client.post(reverse("post-update", kwargs={"pk": post.id}), {
+                "_save": True, "title": title, "description": "d",
+                "confirm_token": confirm.context["confirm_token"]})
+        # assertion
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.title, first.status), ("first", 1))
+        self.assertEqual((second.title, second.status), ("second", 0))
+
+
+@override_settings(ROOT_URLCONF="posts.tests.async_urls")
+class AsyncViewTest(TransactionTestCase):
+    def setUp(self):
+        """async view test set up data, committed for the executor connections"""
+        self.profile_dir = tempfile.mkdtemp()
+        self.admin = User.objects.create_user(email="asyncadmin@gmail.com", password="12345")
+        self.admin.name = "async admin"
+        self.admin.type = "0"
+        self.admin.save()
+        self.post = Post.objects.create(title="async post", description="served by async view",
+                                        user=self.admin, created_user_id=self.admin.id)
+        list_cache.invalidate_posts()
+        list_cache.invalidate_users()
+        self.async_client.force_login(self.admin)
+
+    async def test_async_index(self):
+        """test async post list renders and counts its executor queries"""
+        # execute
+        response = await self.async_client.get(reverse("index"))
+        # assertion
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "async post")
+        self.assertGreater(response.asgi_request.query_stats.count, 0)
+
+    async def test_async_user_list_and_profile(self):
+        """test async user list and profile pages render"""
+        # execute
+        user_list = await self.async_client.get(reverse("user-list"))
+        profile = await self.async_client.get(reverse("user-profile"))
+        # assertion
+        self.assertContains(user_list, "asyncadmin@gmail.com")
+        self.assertContains(profile, "async admin")
+
+    async def test_async_details(self):
+        """test async detail views answer json and 404"""
+        # execute
+        # AsyncClient of django 3.2 drops GET data, the query goes in the url.
+        post = await self.async_client.get("{}?post_id={}".format(reverse("post-detail"), self.post.id))
+        user = await self.async_client.get("{}?user_id={}".format(reverse("user-detail"), self.admin.id))
+        missing = await self.async_client.get(reverse("post-detail") + "?post_id=0")
+        # assertion
+        self.assertEqual(json.loads(post.content)["fields"]["title"], "async post")
+        self.assertEqual(json.loads(user.content)["fields"]["email"], "asyncadmin@gmail.com")
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_async_login_required(self):
+        """test anonymous request to an async view is redirected to login"""
+        # prepare
+        self.async_client.cookies.clear()
+        # execute
+        response = await self.async_client.get(reverse("index"))
+        # assertion
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    async def test_async_profile(self):
+        """test profiling an async view captures its executor work"""
+        # execute
+        with override_settings(REQUEST_PROFILE_DIR=self.profile_dir):
+            response = await self.async_client.get(reverse("index") + "?_profile=1")
+        # assertion
+        stats = pstats.Stats(os.path.join(self.profile_dir, response["X-Profile-Name"]))
+        self.assertTrue(any("render" in function for file_name, line, function in stats.stats))
@@ -1,20 +1,27 @@
+from django.conf import settings
 from django.urls import path, re_path
-from . import views
+from . import async_views, views
+
+# ASYNC_VIEWS (opt-in) serves the read views natively under ASGI.
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path("posts/", views.index, name="index"),
+    path("posts/", read_views.index, name="index"),
     path("post/create/", views.post_create, name="post-create"),
     path("post/<int:pk>/update/", views.post_update, name="post-update"),
     path("post/delete/", views.post_delete, name="post-delete"),
-    path("post/detail/", views.post_detail, name="post-detail"),
-    path("users/", views.userList, name="user-list"),
+    path("post/detail/", read_views.post_detail, name="post-detail"),
+    path("post/details/", views.post_detail_batch, name="post-detail-batch"),
+    path("users/", read_views.userList, name="user-list"),
     path("user/create/", views.user_create, name="user-create"),
     path("user/<int:pk>/update/", views.user_update, name="user-update"),
-    path("user/detail/", views.user_detail, name="user-detail"),
-    path("user/profile/", views.user_profile, name="user-profile"),
+    path("user/detail/", read_views.user_detail, name="user-detail"),
+    path("user/details/", views.user_detail_batch, name="user-detail-batch"),
+    path("user/profile/", read_views.user_profile, name="user-profile"),
     path("user/delete/", views.user_delete, name="user-delete"),
     path("post/list/download/", views.download_post_list_csv, name="post-list-download"),
     path("csv/import/", views.csv_import, name="csv-import"),
+    path("csv/import/job/<int:pk>/", views.csv_import_job, name="csv-import-job"),
     re_path(r"^accounts/login/$", views.user_login, name="user_login"),
     re_path(r"^accounts/register/$", views.signup, name="create_account"),
     re_path(r"^accounts/password_change/$", views.password_change, name="password_change")
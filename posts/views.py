@@ -2,22 +2,34 @@ from django.shortcuts import redirect, render
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password, check_password
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.core import serializers
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q
+from django.db.models import Q, OuterRef, Subquery, Value, Case, When, CharField
+from django.db.models.functions import Coalesce
+from django.conf import settings
 from datetime import datetime
 from posts.forms import PostForm, SearchUserForm, UserForm, UserEditForm, SignUpForm, CSVForm, PasswordResetForm, SeachPostForm
-from posts.models import Post, User
-from posts.helper import check_route, save_temp, handle_uploaded_file, remove_temp
+from posts.models import Post, User, CsvImportJob
+from posts.backends import UNKNOWN_EMAIL, WRONG_PASSWORD
+from posts.helper import make_confirm_token, read_confirm_token, save_temp, handle_uploaded_file, remove_temp
+from posts.images import profile_name, profile_url
+from posts.pagination import CursorPaginator
+from posts.search import search_posts, index_post, remove_post
+from posts.csv_import import import_posts, CsvImportError
+from posts.import_jobs import create_job, job_progress
+from posts.serializers import post_details, user_details, detail_response
+from posts import list_cache, metrics
 import csv
 import json
+import zlib
+
+LIST_PAGE_SIZE = 5
 
 
 @login_required
@@ -27,33 +39,53 @@ def index(request):
     Param request user id
     Return post_list data and view.
     """
+    return render(request, "posts/post_list.html", post_list_context(request))
+
+
+def post_list_context(request):
+    """
+    build the post list page of index and its async view.
+    Param request view request of a logged in user.
+    Return template context.
+    """
     post_list = []
-    user = get_object_or_404(User, pk=request.user.id)
+    user = request.user
     form = SeachPostForm()
     query = Q()
     if user.type == "1":
         query.add(Q(created_user_id__exact=user.id), Q.AND)
+    post_list = Post.alive.filter(query).select_related("user").order_by('id')
+    keyword = ""
     if (request.POST and request.POST["keyword"]):
         keyword = request.POST["keyword"]
         formData = {
             "keyword": keyword
         }
         form = SeachPostForm(initial=formData)
-        query.add(Q(title__icontains=keyword), Q.OR)
-        query.add(Q(description__icontains=keyword), Q.OR)
-
-    query.add(Q(deleted_user_id=None), Q.AND)
-    query.add(Q(deleted_at=None), Q.AND)
-    post_list = Post.objects.filter(query).order_by('id')
-    paginator = Paginator(post_list, 5)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+        post_list = search_posts(post_list, keyword)
+
+    # ranked search results keep page-number pagination.
+    cursor_mode = getattr(settings, "POST_LIST_PAGINATION", "page") == "cursor" and not keyword
+    search = {"keyword": keyword, "cursor_mode": cursor_mode}
+    if cursor_mode:
+        paginator = CursorPaginator(
+            post_list, LIST_PAGE_SIZE, getattr(settings, "POST_LIST_CURSOR_ORDERING", ("id",)))
+        cursor = request.GET.get("cursor")
+        page_obj = list_cache.get_or_set(
+            list_cache.page_key(list_cache.POSTS, user, search, cursor),
+            lambda: paginator.get_page(cursor))
+    else:
+        paginator = Paginator(post_list, LIST_PAGE_SIZE)
+        page_number = request.GET.get("page")
+        page_obj = list_cache.cached_page(
+            list_cache.page_key(list_cache.POSTS, user, search, page_number), paginator, page_number)
     context = {
         "form": form,
         "title": "Post List",
-        "page_obj": page_obj
+        "page_obj": page_obj,
+        "cursor_mode": cursor_mode
     }
-    return render(request, "posts/post_list.html", context)
+    return context
 
 
 @login_required
@@ -63,9 +95,19 @@ def userList(request):
     Param request user id
     Return user_list data and view.
     """
+    return render(request, "posts/users_list.html", user_list_context(request))
+
+
+def user_list_context(request):
+    """
+    build the user list page of userList and its async view.
+    Param request view request of a logged in user.
+    Return template context.
+    """
     form = SearchUserForm()
-    user = get_object_or_404(User, pk=request.user.id)
+    user = request.user
     query = Q()
+    search = {}
     if user.type == "1":
         query.add(Q(created_user_id__exact=user.id), Q.AND)
     if (request.POST):
@@ -80,6 +122,7 @@ def userList(request):
             "to_date": to_date
         }
         form = SearchUserForm(initial=formData)
+        search = formData
         if name:
             query.add(Q(name__icontains=name), Q.OR)
         if email:
@@ -89,26 +132,27 @@ def userList(request):
         if to_date:
             query.add(Q(created_at__lte=to_date), Q.AND)
 
-    query.add(Q(deleted_user_id=None), Q.AND)
-    query.add(Q(deleted_at=None), Q.AND)
-
-    user_list = User.objects.filter(query).order_by('id')
-
-    for user_data in user_list:
-        user_data.type = "Admin" if user_data.type == "0" else "User"
-        list_data = User.objects.filter(id=user_data.created_user_id)
-        user_data.created_user = list_data[0].email if len(
-            list_data) > 0 else ""
-
-    paginator = Paginator(user_list, 5)
+    creator_email = User.objects.filter(
+        pk=OuterRef("created_user_id")).values("email")[:1]
+    user_list = User.alive.filter(query).annotate(
+        created_user=Coalesce(Subquery(creator_email), Value("")),
+        type_label=Case(
+            When(type="0", then=Value("Admin")),
+            default=Value("User"),
+            output_field=CharField()
+        )
+    ).order_by('id')
+
+    paginator = Paginator(user_list, LIST_PAGE_SIZE)
     page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = list_cache.cached_page(
+        list_cache.page_key(list_cache.USERS, user, search, page_number), paginator, page_number)
     context = {
         "form": form,
         "title": "User List",
         "page_obj": page_obj
     }
-    return render(request, "posts/users_list.html", context)
+    return context
 
 def user_login(request):
     """
@@ -121,21 +165,20 @@ def user_login(request):
     if request.method == "POST":
         email = request.POST["email"]
         password = request.POST["password"]
-        email_user = User.objects.filter(
-            email=email, deleted_user_id=None, deleted_at=None)
-        if email_user:
-            authUser = authenticate(request, username=email, password=password)
-            if authUser:
-                login(request, authUser)
-                user = User.objects.get(email=email)
-                if user.name and hasattr(user, "name"):
-                    request.session["login_username"] = user.name
-                else:
-                    request.session["login_username"] = user.email
-                login_username = user.name
-                return redirect(request.POST.get("next", "/"))
+        # one user query checks the email, soft delete and password.
+        user = authenticate(request, username=email, password=password)
+        if user:
+            login(request, user)
+            metrics.record_event("login_succeeded")
+            if user.name and hasattr(user, "name"):
+                request.session["login_username"] = user.name
             else:
-                messages.info(request, f"Email and Password does not match.")
+                request.session["login_username"] = user.email
+            login_username = user.name
+            return redirect(request.POST.get("next", "/"))
+        metrics.record_event("login_failed")
+        if getattr(request, "login_failure", UNKNOWN_EMAIL) == WRONG_PASSWORD:
+            messages.info(request, f"Email and Password does not match.")
         else:
             messages.info(request, f"Email does not exist or deleted")
     return render(request, "registration/login.html", {"form": form, "title": "Login", "login_username": login_username})
@@ -148,17 +191,15 @@ def post_create(request):
     Param request post form data.
     Return post create view.
     """
-    user = get_object_or_404(User, pk=request.user.id)
+    user = request.user
     formData = None
     form = PostForm()
-    check_route("post", request.META.get("HTTP_REFERER"), request)
-    if request.session.get("create_update_confirm_page_flag") is None:
-        request.session["create_update_confirm_page_flag"] = False
+    confirm_token = ""
     if request.method == "POST":
         if "_save" in request.POST:
             form = PostForm(request.POST)
             if form.is_valid():
-                if request.session["create_update_confirm_page_flag"] == True:
+                if read_confirm_token(request, "post-create") is not None:
                     new_post = Post(
                         title=form.cleaned_data.get("title"),
                         description=form.cleaned_data.get("description"),
@@ -170,7 +211,9 @@ def post_create(request):
                         updated_at=timezone.now()
                     )
                     new_post.save()
-                    request.session["create_update_confirm_page_flag"] = False
+                    index_post(new_post)
+                    list_cache.invalidate_posts()
+                    metrics.record_event("post_created")
                     return HttpResponseRedirect(reverse("index"))
                 else:
                     formData = {
@@ -178,17 +221,17 @@ def post_create(request):
                         "description": form.cleaned_data.get("description")
                     }
                     form = PostForm(initial=formData)
-                    request.session["create_update_confirm_page_flag"] = True
+                    confirm_token = make_confirm_token(request, "post-create")
                     form.fields["title"].widget.attrs["readonly"] = True
                     form.fields["description"].widget.attrs["readonly"] = True
         else:
-            request.session["create_update_confirm_page_flag"] = False
             return HttpResponseRedirect(reverse("post-create"))
     context = {
         "title": "Post Create",
         "form": form,
         "operation": "create",
-        "create_update_confirm_page_flag": request.session["create_update_confirm_page_flag"]
+        "create_update_confirm_page_flag": bool(confirm_token),
+        "confirm_token": confirm_token
     }
     return render(request, "posts/posts_form.html", context)
 
@@ -200,24 +243,23 @@ def post_update(request, pk):
     Param request post form data.
     Return post update view.
     """
-    user = get_object_or_404(User, pk=request.user.id)
-    detail_post = get_object_or_404(Post, pk=pk)
+    user = request.user
+    detail_post = get_object_or_404(Post.alive, pk=pk)
     status = True if detail_post.status == 1 else False
-    check_route("post", request.META.get("HTTP_REFERER"), request)
     form = PostForm(initial={"title": detail_post.title,
                     "description": detail_post.description,
                              "status": status})
     status = detail_post.status
-    if request.session.get("create_update_confirm_page_flag") is None:
-        request.session["create_update_confirm_page_flag"] = False
+    confirm_token = ""
+    form_name = "post-update:{}".format(detail_post.id)
     if request.method == "POST":
         if "_save" in request.POST:
             form = PostForm(request.POST)
             if form.is_valid():
-                request.session["is_edit"] = True
-                if request.session["create_update_confirm_page_flag"] == True:
-                    status = 1 if request.session.get("status") == True else 0
-                    edit_post = get_object_or_404(Post, pk=detail_post.id)
+                confirm = read_confirm_token(request, form_name)
+                if confirm is not None:
+                    status = 1 if confirm.get("status") == True else 0
+                    edit_post = get_object_or_404(Post.alive, pk=detail_post.id)
                     edit_post.title = form.cleaned_data.get("title")
                     edit_post.description = form.cleaned_data.get(
                         "description")
@@ -226,7 +268,9 @@ def post_update(request, pk):
                     edit_post.updated_user_id = user.id
                     edit_post.updated_at = timezone.now()
                     edit_post.save()
-                    request.session["create_update_confirm_page_flag"] = False
+                    index_post(edit_post)
+                    list_cache.invalidate_posts()
+                    metrics.record_event("post_updated")
                     return HttpResponseRedirect(reverse("index"))
                 else:
                     status = form.cleaned_data.get("status")
@@ -236,13 +280,12 @@ def post_update(request, pk):
                         "status": status
                     }
                     form = PostForm(initial=formData)
-                    request.session["status"] = status
-                    request.session["create_update_confirm_page_flag"] = True
+                    # the disabled status checkbox is not posted back, the token carries it.
+                    confirm_token = make_confirm_token(request, form_name, status=status)
                     form.fields["title"].widget.attrs["readonly"] = True
                     form.fields["description"].widget.attrs["readonly"] = True
                     form.fields["status"].widget.attrs["disabled"] = True
         else:
-            request.session["create_update_confirm_page_flag"] = False
             return HttpResponseRedirect(reverse("post-update", kwargs={"pk": pk}))
 
     context = {
@@ -250,7 +293,8 @@ def post_update(request, pk):
         "detail_post": detail_post,
         "form": form,
         "operation": "edit",
-        "create_update_confirm_page_flag": request.session["create_update_confirm_page_flag"]
+        "create_update_confirm_page_flag": bool(confirm_token),
+        "confirm_token": confirm_token
     }
     return render(request, "posts/posts_form.html", context)
 
@@ -262,16 +306,8 @@ def post_detail(request):
     Param request post id.
     Return post detail view.
     """
-    post_id = request.GET["post_id"]
-    obj = Post.objects.get(pk=post_id)
-    created_user_name = obj.user.email
-    updated_user = User.objects.get(pk=obj.updated_user_id)
-    data = serializers.serialize("json", [obj, ])
-    struct = json.loads(data)
-    struct[0]["created_user_name"] = created_user_name
-    struct[0]["updated_user_name"] = updated_user.name
-    data = json.dumps(struct[0])
-    return HttpResponse(data)
+    detail = find_detail(post_details, request.GET.get("post_id", ""), "Post does not exist")
+    return detail_response(request, detail)
 
 
 @login_required
@@ -281,23 +317,60 @@ def user_detail(request):
     Param request user id.
     Return user detail view.
     """
-    user_id = request.GET["user_id"]
-    obj = User.objects.get(pk=user_id)
-    profile_url = ""
-    if obj.profile and hasattr(obj.profile, "url"):
-        profile_url = obj.profile.url
-        profile_url = "media/" + profile_url.split("/")[-1]
-    created_user = User.objects.get(
-        pk=obj.created_user_id) if obj.created_user_id != None else None
-    updated_user = User.objects.get(
-        pk=obj.updated_user_id) if obj.updated_user_id != None else None
-    data = serializers.serialize("json", [obj, ])
-    struct = json.loads(data)
-    struct[0]["created_user_name"] = created_user.email
-    struct[0]["updated_user_name"] = updated_user.email
-    struct[0]["profile"] = profile_url
-    data = json.dumps(struct[0])
-    return HttpResponse(data)
+    detail = find_detail(user_details, request.GET.get("user_id", ""), "User does not exist")
+    return detail_response(request, detail)
+
+
+def find_detail(load, pk, message):
+    """
+    load the detail of one post or user.
+    Param load post_details or user_details, pk requested id, message 404 message.
+    Return detail dict, raise Http404 when missing.
+    """
+    details = load([pk]) if pk.isdigit() else {}
+    if not details:
+        raise Http404(message)
+    return details[int(pk)]
+
+
+def parse_ids(value):
+    """
+    parse comma separated ids of a batch request.
+    Param value ids query string.
+    Return list of int ids, None when invalid or longer than a list page.
+    """
+    ids = [item for item in value.split(",") if item]
+    if not ids or len(ids) > LIST_PAGE_SIZE or not all(item.isdigit() for item in ids):
+        return None
+    return [int(item) for item in ids]
+
+
+@login_required
+def post_detail_batch(request):
+    """
+    View function for details of every post on a list page.
+    Param request comma separated post ids, at most one page.
+    Return post details keyed by id.
+    """
+    ids = parse_ids(request.GET.get("ids", ""))
+    if ids is None:
+        return HttpResponseBadRequest("ids must be 1 to {} post ids".format(LIST_PAGE_SIZE))
+    details = post_details(ids)
+    return detail_response(request, {str(pk): detail for pk, detail in details.items()})
+
+
+@login_required
+def user_detail_batch(request):
+    """
+    View function for details of every user on a list page.
+    Param request comma separated user ids, at most one page.
+    Return user details keyed by id.
+    """
+    ids = parse_ids(request.GET.get("ids", ""))
+    if ids is None:
+        return HttpResponseBadRequest("ids must be 1 to {} user ids".format(LIST_PAGE_SIZE))
+    details = user_details(ids)
+    return detail_response(request, {str(pk): detail for pk, detail in details.items()})
 
 
 @login_required
@@ -308,19 +381,19 @@ def user_create(request):
     Return user create view.
     """
     form = UserForm()
+    confirm_token = ""
+    pending_profile = ""
     try:
-        user = get_object_or_404(User, pk=request.user.id)
+        user = request.user
         formData = None
-        check_route("user", request.META.get("HTTP_REFERER"), request)
-        if request.session.get("create_update_confirm_page_flag") is None:
-            request.session["create_update_confirm_page_flag"] = False
 
         if request.method == "POST":
             if "_save" in request.POST:
                 form = UserForm(request.POST, request.FILES)
                 if form.is_valid():
-                    if request.session["create_update_confirm_page_flag"] == True:
-                        handle_uploaded_file(request.session.get("profile"))
+                    confirm = read_confirm_token(request, "user-create")
+                    if confirm is not None:
+                        handle_uploaded_file(confirm.get("profile"))
                         new_user = User(
                             name=form.cleaned_data.get("name"),
                             email=form.cleaned_data.get("email"),
@@ -330,20 +403,19 @@ def user_create(request):
                             phone=form.cleaned_data.get("phone"),
                             address=form.cleaned_data.get("address"),
                             dob=form.cleaned_data.get("dob"),
-                            profile=request.session.get("profile"),
+                            profile=confirm.get("profile"),
                             created_user_id=user.id,
                             updated_user_id=user.id,
                             created_at=timezone.now(),
                             updated_at=timezone.now()
                         )
                         new_user.save()
-                        request.session["create_update_confirm_page_flag"] = False
-                        remove_temp(request.session.get("profile"))
+                        metrics.record_event("user_created")
+                        remove_temp(confirm.get("profile"))
                         return HttpResponseRedirect(reverse("user-list"))
                     else:
                         if "profile" in request.FILES:
-                            profile = save_temp(request.FILES["profile"])
-                            request.session["profile"] = profile
+                            pending_profile = save_temp(request.FILES["profile"])
                             formData = {
                                 "name": form.cleaned_data.get("name"),
                                 "email": form.cleaned_data.get("email"),
@@ -355,7 +427,7 @@ def user_create(request):
                                 "dob": form.cleaned_data.get("dob")
                             }
                             form = UserForm(initial=formData)
-                            request.session["create_update_confirm_page_flag"] = True
+                            confirm_token = make_confirm_token(request, "user-create", profile=pending_profile)
                             form.fields["name"].widget.attrs["readonly"] = True
                             form.fields["email"].widget.attrs["readonly"] = True
                             form.fields["password"].widget.attrs["readonly"] = True
@@ -366,10 +438,8 @@ def user_create(request):
                             form.fields["dob"].widget.attrs["readonly"] = True
                             form.fields["profile"].widget.attrs["disabled"] = True
                         else:
-                            request.session["save_confirm_page"] = False
                             form.add_error("profile", "profile can't be blank")
             else:
-                request.session["create_update_confirm_page_flag"] = False
                 return HttpResponseRedirect(reverse("user-create"))
     except Exception as e:
         print(str(e))
@@ -378,7 +448,9 @@ def user_create(request):
         "title": "User Create",
         "form": form,
         "operation": "create",
-        "create_update_confirm_page_flag": request.session["create_update_confirm_page_flag"]
+        "create_update_confirm_page_flag": bool(confirm_token),
+        "confirm_token": confirm_token,
+        "pending_profile": pending_profile
     }
     return render(request, "posts/users_form.html", context)
 
@@ -390,13 +462,11 @@ def user_update(request, pk):
     Param request user post form and file data.
     Return user update view.
     """
-    req_user = get_object_or_404(User, pk=pk)
+    req_user = get_object_or_404(User.alive, pk=pk)
     profile = ""
 
-    if req_user.profile and hasattr(req_user.profile, "url"):
-        profile = req_user.profile.url
-        profile = "/media/" + profile.split("/")[-1]
-    check_route("user", request.META.get("HTTP_REFERER"), request)
+    if req_user.profile:
+        profile = profile_url(req_user.profile)
     formData = {
         "name": req_user.name,
         "email": req_user.email,
@@ -407,43 +477,43 @@ def user_update(request, pk):
         "profile": profile
     }
     form = UserEditForm(initial=formData)
-    if request.session.get("create_update_confirm_page_flag") is None:
-        request.session["create_update_confirm_page_flag"] = False
+    confirm_token = ""
+    pending_profile = ""
+    form_name = "user-update:{}".format(req_user.id)
     if request.method == "POST":
         if "_save" in request.POST:
             form = UserEditForm(request.POST, request.FILES)
             if form.is_valid():
-                if request.session.get("create_update_confirm_page_flag") == True:
+                confirm = read_confirm_token(request, form_name)
+                if confirm is not None:
                     try:
                         oldFileDir = str(profile)
-                        if oldFileDir != request.session.get("profile"):
-                            file_dir = request.session.get("profile")
-                            file_name = file_dir.split("/")[-1]
+                        new_profile = confirm.get("profile", "")
+                        if oldFileDir != new_profile:
+                            file_name = new_profile.split("/")[-1]
                             handle_uploaded_file(file_name)
                             remove_temp(file_name)
-                            request.session["profile"] = file_name
-                        user = get_object_or_404(User, pk=request.user.id)
+                            new_profile = file_name
+                        user = request.user
                         user.name = form.cleaned_data.get("name")
                         user.email = form.cleaned_data.get("email")
                         user.type = form.cleaned_data.get("type")
                         user.phone = form.cleaned_data.get("phone")
                         user.dob = form.cleaned_data.get("dob")
                         user.address = form.cleaned_data.get("address")
-                        user.profile = request.session.get("profile")
+                        user.profile = profile_name(new_profile)
                         user.updated_user_id = user.id
                         user.updated_at = timezone.now()
                         user.save()
-                        request.session["create_update_confirm_page_flag"] = False
+                        metrics.record_event("user_updated")
                         return HttpResponseRedirect(reverse("user-list"))
                     except Exception as error:
-                        request.session["create_update_confirm_page_flag"] = False
                         form.add_error(None, str(error))
                 else:
                     if "profile" in request.FILES:
-                        profile = save_temp(request.FILES["profile"])
-                        request.session["profile"] = "/media/temp/" + profile
+                        pending_profile = "/media/temp/" + save_temp(request.FILES["profile"])
                     else:
-                        request.session["profile"] = str(profile)
+                        pending_profile = str(profile)
                     formData = {
                         "name": form.cleaned_data.get("name"),
                         "email": form.cleaned_data.get("email"),
@@ -453,7 +523,7 @@ def user_update(request, pk):
                         "address": form.cleaned_data.get("address"),
                     }
                     form = UserEditForm(initial=formData)
-                    request.session["create_update_confirm_page_flag"] = True
+                    confirm_token = make_confirm_token(request, form_name, profile=pending_profile)
                     form.fields["name"].widget.attrs["readonly"] = True
                     form.fields["email"].widget.attrs["readonly"] = True
                     form.fields["type"].widget.attrs["readonly"] = True
@@ -462,15 +532,17 @@ def user_update(request, pk):
                     form.fields["address"].widget.attrs["readonly"] = True
                     form.fields["profile"].widget.attrs["disabled"] = True
         else:
-            request.session["create_update_confirm_page_flag"] = False
             return HttpResponseRedirect(reverse("user-update", kwargs={"pk": pk}))
     context = {
         "title": "Profile Edit",
         "id": req_user.id,
         "form": form,
         "old_profile":  req_user.profile,
-        "profile": profile,
-        "create_update_confirm_page_flag": request.session.get("create_update_confirm_page_flag")
+        "profile": profile_url(req_user.profile, "medium"),
+        "profile_webp": profile_url(req_user.profile, "medium", webp=True),
+        "create_update_confirm_page_flag": bool(confirm_token),
+        "confirm_token": confirm_token,
+        "pending_profile": pending_profile
     }
     return render(request, "posts/user_update.html", context)
 
@@ -482,11 +554,15 @@ def user_profile(request):
     Param request user id.
     Return user profile view.
     """
-    current_user = get_object_or_404(User, pk=request.user.id)
-    profile_url = ""
-    if current_user.profile and hasattr(current_user.profile, "url"):
-        profile_url = current_user.profile.url
-        profile_url = "/media/" + profile_url.split("/")[-1]
+    return render(request, "posts/user_profile.html", context=user_profile_context(request.user))
+
+
+def user_profile_context(current_user):
+    """
+    build the profile page of user_profile and its async view.
+    Param current_user logged in User.
+    Return template context.
+    """
     context = {
         "id": current_user.id,
         "name": current_user.name,
@@ -495,98 +571,146 @@ def user_profile(request):
         "phone": current_user.phone,
         "dob": current_user.dob,
         "address": current_user.address,
-        "profile": profile_url,
+        "profile": profile_url(current_user.profile, "medium"),
+        "profile_webp": profile_url(current_user.profile, "medium", webp=True),
         "title": "Post List"
     }
-    return render(request, "posts/user_profile.html", context=context)
+    return context
 
 
-@login_required
-def download_post_list_csv(request):
+CSV_EXPORT_COLUMNS = ["id", "title", "description", "status", "created_user_id",
+                      "updated_user_id", "deleted_user_id", "deleted_at", "created_at", "updated_at"]
+
+
+class Echo:
     """
-    View function for download post list csv.
-    Param request view reqest.
-    Return download post list page view.
+    file-like object whose write returns the value, used by csv.writer to stream rows.
     """
-    post_list = Post.objects.all()
-    response = HttpResponse(content_type="text/csv")
-    current_date_and_time = datetime.now()
-    file_name = str(current_date_and_time) + "post_list.csv"
-    response["Content-Disposition"] = "attachment; filename=" + file_name
-    writer = csv.writer(response)
-    writer.writerow(["id", "title", "description", "status", "created_user_id",
-                    "updated_user_id", "deleted_user_id", "deleted_at", "created_at", "updated_at"])
 
-    for post in post_list:
-        writer.writerow([post.id, post.title, post.description, post.status, post.created_user_id,
-                        post.updated_user_id, post.deleted_user_id, post.deleted_at, post.created_at, post.updated_at])
-    return response
+    def write(self, value):
+        return value
 
 
-def check_csv_row(data):
+def iter_post_csv_rows(chunk_size=2000, on_chunk=None):
     """
-    check csv rows and add data to csv arrays.
-    Param post list data.
-    Return csv data array to download.
+    read posts in primary key ordered chunks for csv export.
+    Param chunk_size rows per query, on_chunk optional callback before each query.
+    Return iterator of value tuples, header first.
     """
-    arr_csv = []
-    for row in data:
-        if len(row) != 3:
-            return False
-        arr_csv.append(row)
-    return arr_csv
+    yield CSV_EXPORT_COLUMNS
+    last_id = 0
+    while True:
+        if on_chunk:
+            on_chunk()
+        rows = list(Post.alive.filter(id__gt=last_id).order_by(
+            "id").values_list(*CSV_EXPORT_COLUMNS)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def gzip_stream(chunks):
+    """
+    gzip compress a stream of text chunks.
+    Param chunks iterator of str.
+    Return iterator of gzip bytes.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@login_required
+def download_post_list_csv(request):
+    """
+    View function for download post list csv.
+    Streams rows in chunks so memory stays flat for any table size.
+    Param request view reqest, gzip=1 for gzip compressed file.
+    Return streaming csv file download.
+    """
+    writer = csv.writer(Echo())
+    chunk_size = getattr(settings, "CSV_EXPORT_CHUNK_SIZE", 2000)
+    request.query_budget_extra = 0
+
+    def count_chunk():
+        # one query per chunk is allowed on top of the view budget.
+        request.query_budget_extra += 1
+
+    rows = (writer.writerow(row) for row in iter_post_csv_rows(chunk_size, count_chunk))
+    file_name = "post_list" + datetime.now().strftime("%Y%m%d%H%M%S") + ".csv"
+    if request.GET.get("gzip") == "1":
+        response = StreamingHttpResponse(gzip_stream(rows), content_type="application/gzip")
+        file_name += ".gz"
+    else:
+        response = StreamingHttpResponse(rows, content_type="text/csv")
+    response["Content-Disposition"] = "attachment; filename=" + file_name
+    return response
 
 
 @login_required
 def csv_import(request):
     """
     View csv import .
+    Small files are imported in the request, larger ones by a background job.
     Param request view reqest.
     Return import post list page view.
     """
     form = CSVForm()
     message = ""
+    detail = ""
+    job = None
     if request.method == "POST":
-        try:
-            form = CSVForm(request.POST, request.FILES)
-            if "csv_file" in request.FILES:
-                user = get_object_or_404(User, pk=request.user.id)
-                req_file = request.FILES["csv_file"]
-                csv_path = save_temp(req_file)
-                with open("media/temp/{}".format(csv_path)) as csv_file:
-                    csv_reader = csv.reader(csv_file, delimiter=",")
-                    valid_csv = check_csv_row(csv_reader)
-                    if valid_csv:
-                        for i, row in enumerate(valid_csv):
-                            if i != 0:
-                                csv_post = Post(
-                                    title=row[0],
-                                    description=row[1],
-                                    status=row[2],
-                                    user=user,
-                                    created_user_id=user.id,
-                                    updated_user_id=user.id,
-                                    created_at=timezone.now(),
-                                    updated_at=timezone.now()
-                                )
-                                csv_post.save()
-                        csv_file.close()
-                        remove_temp(csv_path)
-                        return HttpResponseRedirect(reverse("index"))
-                    else:
-                        message = "Post upload csv must have 3 columns"
-            else:
-                message = "Please choose a file"
-        except Exception as e:
-            message = "Please choose csv format"
+        form = CSVForm(request.POST, request.FILES)
+        if "csv_file" in request.FILES:
+            user = request.user
+            req_file = request.FILES["csv_file"]
+            # queries grow with the upload's batches and search terms, the
+            # "sync" job backend imports in the request too.
+            request.query_budget_exempt = True
+            if req_file.size >= getattr(settings, "CSV_IMPORT_BACKGROUND_MIN_BYTES", 0):
+                job = create_job(req_file, user)
+                metrics.record_event("csv_import_job_created")
+                return HttpResponseRedirect(reverse("csv-import") + "?job={}".format(job.id))
+            try:
+                result = import_posts(
+                    req_file.open("rb"), user, getattr(settings, "CSV_IMPORT_BATCH_SIZE", 1000))
+                list_cache.invalidate_posts()
+                metrics.record_csv_import(result.rows, "request")
+                messages.success(request, str(result))
+                return HttpResponseRedirect(reverse("index"))
+            except CsvImportError as error:
+                message = error.message
+                detail = error.detail_message()
+        else:
+            message = "Please choose a file"
+    elif request.GET.get("job", "").isdigit():
+        job = CsvImportJob.objects.filter(
+            pk=request.GET["job"], user_id=request.user.id).first()
     context = {
         "title": "Upload CSV File",
         "form": form,
-        "err_message": message
+        "err_message": message,
+        "err_detail": detail,
+        "job": job
     }
     return render(request, "posts/csv-import.html", context=context)
 
 
+@login_required
+def csv_import_job(request, pk):
+    """
+    View csv import job progress for polling.
+    Param pk job id.
+    Return job progress json.
+    """
+    job = get_object_or_404(CsvImportJob, pk=pk, user_id=request.user.id)
+    return HttpResponse(json.dumps(job_progress(job)))
+
+
 def signup(request):
     """
     View signup page.
@@ -606,6 +730,7 @@ def signup(request):
                 updated_at=timezone.now()
             )
             new_user.save()
+            metrics.record_event("user_signed_up")
             authUser = authenticate(request, username=form.cleaned_data.get(
                 "email"), password=form.cleaned_data.get("password"))
             if authUser:
@@ -629,10 +754,11 @@ def post_delete(request):
     Return post list page.
     """
     post_id = request.GET["post_id"]
-    delete_post = get_object_or_404(Post, pk=post_id)
-    delete_post.deleted_user_id = request.user.id
-    delete_post.deleted_at = timezone.now()
-    delete_post.save()
+    delete_post = get_object_or_404(Post.alive, pk=post_id)
+    delete_post.soft_delete(request.user.id)
+    remove_post(delete_post)
+    list_cache.invalidate_posts()
+    metrics.record_event("post_deleted")
     return HttpResponseRedirect(reverse("index"))
 
 
@@ -644,10 +770,10 @@ def user_delete(request):
     Return user list page.
     """
     user_id = request.GET["user_id"]
-    delete_user = get_object_or_404(User, pk=user_id)
-    delete_user.deleted_user_id = request.user.id
-    delete_user.deleted_at = timezone.now()
-    delete_user.save()
+    delete_user = get_object_or_404(User.alive, pk=user_id)
+    delete_user.soft_delete(request.user.id)
+    list_cache.invalidate_users()
+    metrics.record_event("user_deleted")
     return HttpResponseRedirect(reverse("user-list"))
 
 
@@ -664,10 +790,11 @@ def password_change(request):
         if reset_form.is_valid():
             password = reset_form.cleaned_data.get("password")
             new_password = reset_form.cleaned_data.get("new_password")
-            user = get_object_or_404(User, pk=request.user.id)
+            user = request.user
             if (check_password(password, user.password)):
                 user.password = make_password(new_password)
                 user.save()
+                metrics.record_event("password_changed")
                 messages.info(request, f"Password is successfully updated.")
                 return HttpResponseRedirect(reverse("user-list"))
             else: